@@ -1,7 +1,7 @@
 """
 API v1 路由
 """
-from . import generate, models, config
+from . import generate, models, config, render
 
-__all__ = ["generate", "models", "config"]
+__all__ = ["generate", "models", "config", "render"]
 
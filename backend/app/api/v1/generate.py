@@ -6,23 +6,78 @@ from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 from loguru import logger
 import json
+import time
+import uuid
+from typing import Union
 
-from app.models.request import GenerateRequest
+from app.models.request import ConstraintUpdateRequest, GenerateRequest
 from app.models.response import GenerateResponse, GenerateChunk
 from app.core.llm.factory import LLMFactory
+from app.core.llm.structured import PLAN_SCHEMA, STRUCTURE_SCHEMA, bind_schema
 from app.core.agents.planner import PlannerAgent
 from app.core.agents.structure_generator import StructureGeneratorAgent
+from app.core.agents.structure_stream import create_stream_parser
 from app.core.agents.text_optimizer import TextOptimizerAgent
 from app.core.agents.validator import ValidatorAgent
 from app.core.layout.engine import LayoutEngine
+from app.core.layout.constraints import LAYOUT_SESSIONS
 from app.core.layout.postprocessor import LayoutPostProcessor
+from app.core.layout.progressive import ProgressiveLayout
+from app.core.layout.bundling import bundle_edges
+from app.core.layout.lod import SUBDIAGRAM_STORE, collapse_structure
 from app.core.layout.theme import ThemeType
 from app.core.excalidraw.builder import ExcalidrawBuilder
 from app.core.excalidraw.parser import parse_code
-from app.core.excalidraw.optimizer import optimize_arrows
+from app.core.excalidraw.optimizer import optimize_arrow_elements
+from app.core.excalidraw.serializer import dumps_elements, dumps_scene
+from app.core.excalidraw.scene import to_scene
+from app.core.excalidraw.diff import diff_elements, load_scene
+from app.core.excalidraw.library import get_catalog
 
 router = APIRouter()
 
+PARTIAL_INTERVAL = 0.3  # 流式生成期间推送 partial 预览的最小间隔（秒）
+
+
+def _render_result(request: Union[GenerateRequest, ConstraintUpdateRequest], elements: list) -> dict:
+    """
+    按输出格式与响应模式生成最终结果：{"code": ...} 或 {"patch": ...}
+    
+    - outputFormat=scene 时输出完整的 .excalidraw 场景
+    - responseMode=patch 且当前场景可解析时，只返回相对当前场景的补丁（元素 ID 确定，可逐个对比）
+    """
+    scene = to_scene(elements) if request.output_format == "scene" else None
+    if request.response_mode == "patch":
+        current_scene = load_scene(request.current_code)
+        if current_scene is not None:
+            patch = diff_elements(current_scene, scene["elements"] if scene else elements)
+            if patch is not None:
+                return {"patch": patch}
+    return {"code": dumps_scene(scene) if scene else dumps_elements(elements)}
+
+
+def _remember_layout(
+    request: GenerateRequest,
+    layout_engine: LayoutEngine,
+    structure: dict,
+    layout_nodes: list
+) -> None:
+    """
+    保存布局会话（引擎及其约束求解器、后处理后的节点坐标），布局 ID 写入 layout_metrics
+
+    客户端随后只调整约束时调用 /generate/constraints，增量求解受影响的节点，不重跑布局
+    """
+    layout_id = uuid.uuid4().hex
+    LAYOUT_SESSIONS.put(layout_id, {
+        "engine": layout_engine,
+        "structure": structure,
+        "layout_nodes": [dict(node) for node in layout_nodes],
+        "chart_type": request.chart_type.value,
+        "edge_bundling": request.edge_bundling,
+        "use_library_icons": request.use_library_icons,
+    })
+    layout_engine.last_metrics["layout_id"] = layout_id
+
 
 @router.post("/generate", response_model=None)
 async def generate_chart(request: GenerateRequest):
@@ -35,13 +90,24 @@ async def generate_chart(request: GenerateRequest):
         # 创建 LLM 实例
         llm = LLMFactory.create_llm(request.config)
         
+        # 结构化输出（可选）：用 JSON Schema 约束规划与结构；提供商不支持时为 None，使用普通模式
+        plan_llm = structure_llm = None
+        if request.structured_output:
+            plan_llm = bind_schema(llm, request.config.type, "diagram_plan", PLAN_SCHEMA, "输出图表生成规划")
+            structure_llm = bind_schema(
+                llm, request.config.type, "diagram_structure", STRUCTURE_SCHEMA, "输出图表的节点和边"
+            )
+        
         # 创建智能体
-        planner = PlannerAgent(llm)
-        structure_generator = StructureGeneratorAgent(llm)
+        planner = PlannerAgent(llm, plan_llm)
+        structure_generator = StructureGeneratorAgent(llm, structure_llm)
         text_optimizer = TextOptimizerAgent(llm)
         layout_engine = LayoutEngine()
         layout_postprocessor = LayoutPostProcessor()
-        excalidraw_builder = ExcalidrawBuilder(theme_type=ThemeType.DEFAULT)
+        excalidraw_builder = ExcalidrawBuilder(
+            theme_type=ThemeType.DEFAULT,
+            icons=get_catalog() if request.use_library_icons else None
+        )
         validator = ValidatorAgent()
         
         # 1. 规划阶段
@@ -49,15 +115,13 @@ async def generate_chart(request: GenerateRequest):
         plan = await planner.plan(request.user_input, request.chart_type.value, request.current_code)
         logger.info(f"规划完成: {plan}")
         
-        # 2. 生成结构阶段
+        # 2. 生成结构阶段（输出逐块喂入增量解析器，节点 / 边一闭合即可用）
         logger.info("开始生成结构阶段")
-        accumulated_structure = ""
+        stream_parser = create_stream_parser(request.structure_format)
         
         if request.stream:
             # 流式响应
             async def generate_stream():
-                nonlocal accumulated_structure
-                
                 # 0. 发送规划结果（Analysis）
                 yield {
                     "event": "plan",
@@ -77,17 +141,44 @@ async def generate_chart(request: GenerateRequest):
                 }
                 
                 # 生成结构（只包含节点和边，不包含坐标）
+                # 新闭合的节点随到随放，每隔一段时间以 partial 事件推送预览
+                progressive = ProgressiveLayout(layout_engine._estimate_node_size)
+                last_partial = time.monotonic()
+                partial_edges = 0
+                added = 0
                 async for chunk in structure_generator.generate_structure(
                     request.user_input,
                     request.chart_type.value,
                     plan,
-                    request.image.dict() if request.image else None
+                    request.image.dict() if request.image else None,
+                    request.structure_format
                 ):
-                    accumulated_structure += chunk
                     yield {
                         "event": "chunk",
                         "data": json.dumps({"content": chunk})
                     }
+                    new_nodes, _ = stream_parser.feed(chunk)
+                    added += progressive.add(new_nodes)
+
+                    if time.monotonic() - last_partial < PARTIAL_INTERVAL:
+                        continue
+                    last_partial = time.monotonic()
+                    edges = progressive.edges(stream_parser.edges)
+                    if not added and len(edges) == partial_edges:
+                        continue
+                    added = 0
+                    partial_edges = len(edges)
+                    partial = stream_parser.structure()
+                    yield {
+                        "event": "partial",
+                        "data": json.dumps({
+                            "code": excalidraw_builder.build(
+                                partial, progressive.nodes(), edges, theme_type=ThemeType.DEFAULT
+                            ),
+                            "nodes": len(progressive.placed),
+                            "edges": len(edges)
+                        })
+                    }
                 
                 # 3. 解析结构进度
                 yield {
@@ -98,9 +189,14 @@ async def generate_chart(request: GenerateRequest):
                         "progress": 50
                     })
                 }
-                structure = structure_generator.parse_structure(accumulated_structure)
+                structure = structure_generator.finish_structure(stream_parser)
                 logger.info(f"结构解析完成: {len(structure.get('nodes', []))} 个节点, {len(structure.get('edges', []))} 条边")
                 
+                # 超大图按元素预算折叠为摘要节点（可选）
+                lod_stats = None
+                if request.lod_budget:
+                    structure, lod_stats = collapse_structure(structure, request.lod_budget, request.lod_method)
+                
                 # 4. 文本优化进度（可选）
                 yield {
                     "event": "progress",
@@ -124,11 +220,16 @@ async def generate_chart(request: GenerateRequest):
                         "progress": 70
                     })
                 }
+                if request.layout_constraints:
+                    optimized_structure = {**optimized_structure, **request.layout_constraints}
                 layout_nodes = layout_engine.layout(
                     optimized_structure,
-                    request.chart_type.value
+                    request.chart_type.value,
+                    request.layout_algorithm
                 )
                 logger.info(f"布局计算完成: {len(layout_nodes)} 个节点已定位")
+                if lod_stats:
+                    layout_engine.last_metrics["lod"] = lod_stats
                 
                 # 6. 布局后处理进度（宽高平衡、美观优化）
                 yield {
@@ -142,9 +243,17 @@ async def generate_chart(request: GenerateRequest):
                 layout_nodes = layout_postprocessor.process(
                     layout_nodes,
                     optimized_structure.get("edges", []),
-                    request.chart_type.value
+                    request.chart_type.value,
+                    layout_engine.last_metrics.get("algorithm")
                 )
                 logger.info(f"布局后处理完成: {len(layout_nodes)} 个节点已优化")
+                _remember_layout(request, layout_engine, optimized_structure, layout_nodes)
+                
+                # 连线合并与边捆绑（可选）
+                edges = optimized_structure.get("edges", [])
+                if request.edge_bundling:
+                    edges, bundling_stats = bundle_edges(layout_nodes, edges)
+                    layout_engine.last_metrics["bundling"] = bundling_stats
                 
                 # 7. 生成 Excalidraw JSON 进度（应用主题）
                 yield {
@@ -155,15 +264,15 @@ async def generate_chart(request: GenerateRequest):
                         "progress": 85
                     })
                 }
-                excalidraw_json = excalidraw_builder.build(
+                elements = excalidraw_builder.build_elements(
                     optimized_structure,
                     layout_nodes,
-                    optimized_structure.get("edges", []),
+                    edges,
                     theme_type=ThemeType.DEFAULT
                 )
                 
-                # 8. 箭头优化
-                optimized_code = optimize_arrows(excalidraw_json)
+                # 8. 箭头优化（元素列表在各阶段间直接传递，最后只序列化一次）
+                elements = optimize_arrow_elements(elements, reassign_ports=False)
                 
                 # 9. 验证进度
                 yield {
@@ -174,35 +283,40 @@ async def generate_chart(request: GenerateRequest):
                         "progress": 95
                     })
                 }
-                is_valid, errors = validator.validate(optimized_code)
+                is_valid, errors = validator.validate_elements(elements)
                 
                 # 发送最终结果
                 yield {
                     "event": "done",
                     "data": json.dumps({
-                        "code": optimized_code,
+                        **_render_result(request, elements),
                         "optimized": True,
                         "validation_passed": is_valid,
-                        "errors": errors if not is_valid else None
+                        "errors": errors if not is_valid else None,
+                        "layout_metrics": layout_engine.last_metrics
                     })
                 }
             
             return EventSourceResponse(generate_stream())
         else:
             # 非流式响应
-            accumulated_structure = ""
-            
             # 生成结构
             async for chunk in structure_generator.generate_structure(
                 request.user_input,
                 request.chart_type.value,
                 plan,
-                request.image.dict() if request.image else None
+                request.image.dict() if request.image else None,
+                request.structure_format
             ):
-                accumulated_structure += chunk
+                stream_parser.feed(chunk)
             
             # 解析结构
-            structure = structure_generator.parse_structure(accumulated_structure)
+            structure = structure_generator.finish_structure(stream_parser)
+            
+            # 超大图按元素预算折叠为摘要节点（可选）
+            lod_stats = None
+            if request.lod_budget:
+                structure, lod_stats = collapse_structure(structure, request.lod_budget, request.lod_method)
             
             # 文本优化
             optimized_structure = await text_optimizer.optimize(
@@ -210,46 +324,56 @@ async def generate_chart(request: GenerateRequest):
                 request.chart_type.value
             )
             
-            # 布局计算
+            # 布局计算（合并用户指定的固定点 / 对齐约束）
+            if request.layout_constraints:
+                optimized_structure = {**optimized_structure, **request.layout_constraints}
             layout_nodes = layout_engine.layout(
                 optimized_structure,
-                request.chart_type.value
+                request.chart_type.value,
+                request.layout_algorithm
             )
+            if lod_stats:
+                layout_engine.last_metrics["lod"] = lod_stats
             
             # 布局后处理（宽高平衡、美观优化）
             layout_nodes = layout_postprocessor.process(
                 layout_nodes,
                 optimized_structure.get("edges", []),
-                request.chart_type.value
+                request.chart_type.value,
+                layout_engine.last_metrics.get("algorithm")
             )
+            _remember_layout(request, layout_engine, optimized_structure, layout_nodes)
+            
+            # 连线合并与边捆绑（可选）
+            edges = optimized_structure.get("edges", [])
+            if request.edge_bundling:
+                edges, bundling_stats = bundle_edges(layout_nodes, edges)
+                layout_engine.last_metrics["bundling"] = bundling_stats
             
             # 生成 Excalidraw JSON（应用主题）
-            excalidraw_json = excalidraw_builder.build(
+            elements = excalidraw_builder.build_elements(
                 optimized_structure,
                 layout_nodes,
-                optimized_structure.get("edges", []),
+                edges,
                 theme_type=ThemeType.DEFAULT
             )
             
             # 箭头优化
-            optimized_code = optimize_arrows(excalidraw_json)
+            elements = optimize_arrow_elements(elements, reassign_ports=False)
             
             # 验证
-            is_valid, errors = validator.validate(optimized_code)
+            is_valid, errors = validator.validate_elements(elements)
             
-            # 解析元素数量
-            try:
-                elements = json.loads(optimized_code)
-                elements_count = len(elements) if isinstance(elements, list) else 0
-            except:
-                elements_count = 0
+            result = _render_result(request, elements)
             
             return GenerateResponse(
-                code=optimized_code,
-                elements_count=elements_count,
+                code=result.get("code"),
+                patch=result.get("patch"),
+                elements_count=len(elements),
                 optimized=True,
                 validation_passed=is_valid,
-                errors=errors if not is_valid else None
+                errors=errors if not is_valid else None,
+                layout_metrics=layout_engine.last_metrics
             )
     
     except Exception as e:
@@ -258,6 +382,97 @@ async def generate_chart(request: GenerateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/generate/constraints")
+async def update_layout_constraints(request: ConstraintUpdateRequest):
+    """
+    只调整布局约束（固定点 / 对齐 / 顺序），不重新生成结构、不重跑布局
+    
+    按布局 ID 取回上一次生成的约束求解器，只重新求解受影响的节点，再重新生成元素
+    """
+    session = LAYOUT_SESSIONS.get(request.layout_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"布局不存在或已过期: {request.layout_id}")
+    
+    try:
+        layout_engine = session["engine"]
+        start = time.perf_counter()
+        layout_nodes = layout_engine.update_constraints(
+            session["layout_nodes"],
+            add=request.add,
+            remove=request.remove,
+            pinned=request.pinned
+        )
+        session["layout_nodes"] = [dict(node) for node in layout_nodes]
+        layout_engine.last_metrics["constraint_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        structure = session["structure"]
+        edges = structure.get("edges", [])
+        if session["edge_bundling"]:
+            edges, bundling_stats = bundle_edges(layout_nodes, edges)
+            layout_engine.last_metrics["bundling"] = bundling_stats
+        elements = ExcalidrawBuilder(
+            theme_type=ThemeType.DEFAULT,
+            icons=get_catalog() if session["use_library_icons"] else None
+        ).build_elements(structure, layout_nodes, edges, theme_type=ThemeType.DEFAULT)
+        elements = optimize_arrow_elements(elements, reassign_ports=False)
+        is_valid, errors = ValidatorAgent().validate_elements(elements)
+        result = _render_result(request, elements)
+        
+        return GenerateResponse(
+            code=result.get("code"),
+            patch=result.get("patch"),
+            elements_count=len(elements),
+            optimized=True,
+            validation_passed=is_valid,
+            errors=errors if not is_valid else None,
+            layout_metrics=layout_engine.last_metrics
+        )
+    
+    except Exception as e:
+        logger.error("调整布局约束失败: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
 
 
-
+@router.get("/generate/expand/{summary_id}")
+async def expand_summary(summary_id: str):
+    """
+    展开 LOD 摘要节点
+    
+    返回被折叠子图的 Excalidraw 代码（子图仍超出预算时继续折叠，可逐层下钻），无需重新生成
+    """
+    subdiagram = SUBDIAGRAM_STORE.get(summary_id)
+    if subdiagram is None:
+        raise HTTPException(status_code=404, detail=f"摘要节点不存在或已过期: {summary_id}")
+    
+    try:
+        structure, lod_stats = collapse_structure(
+            {"type": subdiagram["type"], "nodes": subdiagram["nodes"], "edges": subdiagram["edges"]},
+            subdiagram["budget"],
+            subdiagram["method"]
+        )
+        chart_type = structure.get("type") or "flowchart"
+        layout_engine = LayoutEngine()
+        layout_nodes = layout_engine.layout(structure, chart_type)
+        if lod_stats:
+            layout_engine.last_metrics["lod"] = lod_stats
+        layout_nodes = LayoutPostProcessor().process(
+            layout_nodes,
+            structure.get("edges", []),
+            chart_type,
+            layout_engine.last_metrics.get("algorithm")
+        )
+        elements = ExcalidrawBuilder(theme_type=ThemeType.DEFAULT).build_elements(
+            structure,
+            layout_nodes,
+            structure.get("edges", []),
+            theme_type=ThemeType.DEFAULT
+        )
+        return {
+            "name": subdiagram["name"],
+            "code": dumps_elements(optimize_arrow_elements(elements, reassign_ports=False)),
+            "layout_metrics": layout_engine.last_metrics
+        }
+    
+    except Exception as e:
+        logger.error("展开摘要节点失败: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,34 @@
+"""
+渲染 API 端点 - 图表预览（SVG）
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from app.models.request import RenderRequest
+from app.core.excalidraw.diff import load_scene
+from app.core.excalidraw.svg import iter_svg_cached
+
+router = APIRouter()
+
+
+@router.post("/render/svg")
+async def render_svg(request: RenderRequest):
+    """
+    把 Excalidraw 代码渲染为 SVG（用于列表与对话历史的缩略图）
+    
+    同一场景的渲染结果按场景哈希缓存
+    """
+    elements = load_scene(request.code)
+    if elements is None:
+        raise HTTPException(status_code=400, detail="无法解析 Excalidraw 代码")
+    
+    try:
+        options = {"width": request.width}
+        if request.background:
+            options["background"] = request.background
+        return StreamingResponse(iter_svg_cached(elements, **options), media_type="image/svg+xml")
+    
+    except Exception as e:
+        logger.error("渲染 SVG 失败: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
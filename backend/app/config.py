@@ -23,6 +23,10 @@ class Settings(BaseSettings):
     DATA_DIR: Path = Path("data")
     CONFIG_FILE: Path = DATA_DIR / "llm-configs.json"
     
+    # 图标库（.excalidrawlib 文件目录，索引生成在 DATA_DIR/library 下）
+    # 相对于仓库根目录定位，与启动时的工作目录无关
+    LIBRARY_DIR: Path = Path(__file__).resolve().parents[2] / "frontend" / "public" / "libraries"
+    
     # LLM 配置
     DEFAULT_MAX_TOKENS: int = 4096
     DEFAULT_TEMPERATURE: float = 0.7
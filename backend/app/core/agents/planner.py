@@ -3,6 +3,7 @@
 """
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import Runnable
 from typing import Dict, Any, Optional
 import json
 import re
@@ -11,13 +12,20 @@ from loguru import logger
 from openai import InternalServerError, APIError
 from fastapi import HTTPException
 from app.core.excalidraw.structure_extractor import extract_structure_from_code, summarize_structure
+from app.core.llm.structured import chunk_text, structured_result
 
 
 class PlannerAgent:
     """规划智能体"""
     
-    def __init__(self, llm: BaseLanguageModel):
+    def __init__(self, llm: BaseLanguageModel, structured_llm: Optional[Runnable] = None):
+        """
+        Args:
+            llm: LLM 实例
+            structured_llm: 绑定了 PLAN_SCHEMA 的 LLM（结构化输出模式，见 app.core.llm.structured）
+        """
         self.llm = llm
+        self.structured_llm = structured_llm
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """你是一个专业的图表规划专家。你的任务是深度分析用户需求，充分揣测用户意图，然后制定详细的图表生成计划。
 
@@ -85,7 +93,7 @@ class PlannerAgent:
         Returns:
             规划结果
         """
-        chain = self.prompt | self.llm
+        chain = self.prompt | (self.structured_llm or self.llm)
         
         # 处理现有代码：先提取结构，再总结
         current_structure_context = ""
@@ -144,8 +152,15 @@ class PlannerAgent:
                 logger.error("规划阶段发生未知错误: %s", str(e), exc_info=True)
                 raise
         
+        # 结构化输出模式：响应本身就是符合 PLAN_SCHEMA 的对象
+        if self.structured_llm is not None:
+            plan = structured_result(response)
+            if plan:
+                return plan
+            logger.warning("结构化输出未得到有效规划，回退到文本提取")
+        
         # 解析 JSON 响应
-        content = response.content.strip()
+        content = chunk_text(response).strip()
         
         # 1. 移除 <think> 标签内容 (针对 DeepSeek R1 等思考模型)
         content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
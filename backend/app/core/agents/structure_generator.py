@@ -2,25 +2,39 @@
 结构生成智能体 - LLM 只生成逻辑结构，不包含坐标
 """
 from langchain_core.language_models import BaseLanguageModel
-from typing import Dict, Any, AsyncIterator, List, Set
+from langchain_core.runnables import Runnable
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Union
 import json
 import re
 from loguru import logger
-from app.utils.prompts_structure import get_structure_system_prompt, get_structure_user_prompt
+from app.utils.prompts_structure import (
+    get_structure_lines_system_prompt,
+    get_structure_system_prompt,
+    get_structure_user_prompt,
+)
+from app.core.agents.structure_stream import StructureLineParser, StructureStreamParser
+from app.core.llm.structured import chunk_text
 
 
 class StructureGeneratorAgent:
     """结构生成智能体"""
     
-    def __init__(self, llm: BaseLanguageModel):
+    def __init__(self, llm: BaseLanguageModel, structured_llm: Optional[Runnable] = None):
+        """
+        Args:
+            llm: LLM 实例
+            structured_llm: 绑定了 STRUCTURE_SCHEMA 的 LLM（结构化输出模式，见 app.core.llm.structured）
+        """
         self.llm = llm
+        self.structured_llm = structured_llm
     
     async def generate_structure(
         self,
         user_input: str,
         chart_type: str,
         plan: Dict[str, Any] = None,
-        image_data: Dict[str, Any] = None
+        image_data: Dict[str, Any] = None,
+        output_format: str = "json"
     ) -> AsyncIterator[str]:
         """
         生成图表结构（只包含节点和边，不包含坐标）
@@ -30,13 +44,20 @@ class StructureGeneratorAgent:
             chart_type: 图表类型
             plan: 规划结果
             image_data: 图片数据（可选）
+            output_format: 输出协议，json：单个 JSON 对象；lines：每行一个节点 / 边（T / N / E 行）
             
         Yields:
-            结构 JSON 片段
+            结构输出片段
         """
         # 构建提示词
-        system_prompt = get_structure_system_prompt()
-        user_prompt = get_structure_user_prompt(user_input, chart_type, plan)
+        structured = self.structured_llm is not None and output_format == "json"
+        if output_format == "lines":
+            system_prompt = get_structure_lines_system_prompt()
+        else:
+            system_prompt = get_structure_system_prompt()
+        if structured:
+            system_prompt += "\n\n（结构化输出模式：输出格式已由 JSON Schema 约束，直接输出结构对象，不需要思维链分析和代码块）"
+        user_prompt = get_structure_user_prompt(user_input, chart_type, plan, output_format)
         
         messages = [
             {"role": "system", "content": system_prompt},
@@ -55,18 +76,12 @@ class StructureGeneratorAgent:
                 }
             ]
         
-        # 流式生成
-        accumulated = ""
-        async for chunk in self.llm.astream(messages):
-            if hasattr(chunk, "content"):
-                content = chunk.content
-            elif isinstance(chunk, dict) and "content" in chunk:
-                content = chunk["content"]
-            else:
-                continue
-            
-            accumulated += content
-            yield content
+        # 流式生成（结构化输出模式下，Anthropic 的输出为工具参数的 JSON 片段）
+        llm = self.structured_llm if structured else self.llm
+        async for chunk in llm.astream(messages):
+            content = chunk_text(chunk)
+            if content:
+                yield content
     
     def parse_structure(self, structure_text: str) -> Dict[str, Any]:
         """
@@ -128,6 +143,10 @@ class StructureGeneratorAgent:
             else:
                 return self._create_fallback_structure()
 
+        return self._finalize_structure(structure)
+
+    def _finalize_structure(self, structure: Any) -> Dict[str, Any]:
+        """类型校验、字段兜底与规范化"""
         # 2. 基本类型校验
         if not isinstance(structure, dict):
             # 可能是列表？
@@ -154,6 +173,24 @@ class StructureGeneratorAgent:
 
         return structure
 
+    def finish_structure(self, parser: Union[StructureStreamParser, StructureLineParser]) -> Dict[str, Any]:
+        """
+        由增量解析结果得到最终结构（生成过程中已逐块解析，无需再扫描全文）
+
+        增量解析没有得到任何节点时（如输出格式异常），回退到对完整文本的 parse_structure
+
+        Args:
+            parser: 已喂入全部输出的增量解析器（JSON 或逐行协议）
+
+        Returns:
+            解析并规范化后的结构字典
+        """
+        parser.close()
+        if parser.nodes:
+            return self._finalize_structure(parser.structure())
+        logger.warning("增量解析未得到节点，回退到完整文本解析")
+        return self.parse_structure(parser.text())
+
     def _create_fallback_structure(self) -> Dict[str, Any]:
         """创建回退的空结构"""
         return {
@@ -0,0 +1,467 @@
+"""
+增量结构解析 - 边接收 LLM 输出边提取节点和边
+
+StructureGeneratorAgent 逐块输出结构 JSON。过去的做法是把所有块拼接起来，
+流式预览时每隔一段时间从头重新扫描，生成结束后再整体解析。
+StructureStreamParser 逐块喂入、只扫描一次：
+- 跳过 <think> 等思考标签的内容与代码块标记（标签可以跨块）
+- 跟踪字符串 / 转义 / 括号深度，"nodes" / "edges" 数组中的对象一闭合就解析并产出
+- 顶层的其他字段（如 "type"）同样在闭合时解析
+- 只缓存当前未闭合的对象，不需要整段文本；原始文本只在解析出第一个节点之前保留
+  （最多 FALLBACK_TEXT_MAX 个字符），用于增量解析失败时的回退
+
+支持 {"type", "nodes", "edges"} 对象，也支持直接输出节点数组。
+
+StructureLineParser 解析逐行输出协议（prompts_structure.get_structure_lines_system_prompt）：
+    T flowchart
+    N id|label|shape|group|key=value...
+    E from|to|label|key=value...
+N 行按位置解析，形状为空或不合法时使用默认形状，分组照常读取；
+末尾的 key=value 字段携带 kind / sets / props（ER 图、类图、韦恩图的语义）。
+每行到达即校验、产出，也接受每行一个 JSON 对象（NDJSON）。单行出错只丢弃该行，不会丢失整个结构。
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.excalidraw.parser import THINK_CLOSE, THINK_WORDS, repair_json
+
+
+MAX_TAG_LENGTH = 200
+ITEM_ARRAYS = ("nodes", "edges")
+STRUCTURE_FORMATS = ("json", "lines")
+NODE_SHAPES = ("rectangle", "ellipse", "diamond", "text")
+# 逐行协议末尾的 key=value 字段：节点 / 边上的字段，与放进 props 的字段（列表值用分号分隔）
+LINE_FIELDS = ("kind", "sets", "parent")
+LINE_PROPS = ("attributes", "methods", "pk", "stereotype")
+_LINE_LISTS = ("sets", "attributes", "methods", "pk")
+_LINE_FIELD = re.compile(r"(%s)\s*=(.*)" % "|".join(LINE_FIELDS + LINE_PROPS), re.DOTALL)
+_LIST_SEPARATOR = re.compile(r"[;；]")
+FALLBACK_TEXT_MAX = 256 * 1024  # 回退用原始文本的最大长度（字符）
+_WHITESPACE = " \t\r\n"
+_STRING_STOP = re.compile(r'["\\]')
+
+
+def _loads(text: str) -> Any:
+    """解析单个值，失败时用 repair_json 修复一次"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            return json.loads(repair_json(text)[0])
+        except json.JSONDecodeError:
+            return None
+
+
+def _split_line_fields(parts: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    拆出逐行协议中的 key=value 字段
+
+    Returns:
+        (其余的位置字段, 节点 / 边的附加字段；props 字段归入 "props")
+    """
+    positional: List[str] = []
+    extra: Dict[str, Any] = {}
+    for part in parts:
+        match = _LINE_FIELD.fullmatch(part)
+        if match is None:
+            positional.append(part)
+            continue
+        key, value = match.group(1), match.group(2).strip()
+        if key in _LINE_LISTS:
+            value = [item.strip() for item in _LIST_SEPARATOR.split(value) if item.strip()]
+        if not value:
+            continue
+        if key in LINE_PROPS:
+            extra.setdefault("props", {})[key] = value
+        else:
+            extra[key] = value
+    return positional, extra
+
+
+class _FallbackText:
+    """回退用的原始文本：解析出第一个节点后释放（之后不会再回退），长度不超过 FALLBACK_TEXT_MAX"""
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._size = 0
+        self._released = False
+
+    def add(self, chunk: str) -> None:
+        if self._released or self._size >= FALLBACK_TEXT_MAX:
+            return
+        part = chunk[:FALLBACK_TEXT_MAX - self._size]
+        self._chunks.append(part)
+        self._size += len(part)
+
+    def release(self) -> None:
+        self._chunks = []
+        self._size = 0
+        self._released = True
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+
+def _think_tag(tag: str) -> Optional[bool]:
+    """
+    判断 <...> 之间的内容是否为思考标签
+
+    Returns:
+        True：开始标签；False：闭合或自闭合标签；None：不是思考标签
+    """
+    tag = tag.strip().lower()
+    name = tag.lstrip("/").split(None, 1)[0].rstrip("/") if tag else ""
+    if not name or not any(word in name for word in THINK_WORDS):
+        return None
+    return not (tag.startswith("/") or tag.endswith("/"))
+
+
+class StructureStreamParser:
+    """逐块解析结构 JSON，完整的节点 / 边一闭合就产出"""
+
+    def __init__(self):
+        self.nodes: List[Dict[str, Any]] = []
+        self.edges: List[Dict[str, Any]] = []
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._raw = _FallbackText()
+        self._pending = ""  # 块末尾不完整的标签，与下一块拼接后再处理
+        self._in_think = False
+        self._reset()
+
+    def _reset(self) -> None:
+        """回到 JSON 开始之前的状态（之前的括号属于说明文字时调用）"""
+        self._depth = 0
+        self._root: Optional[str] = None
+        self._in_string = False
+        self._escaped = False
+        self._key: Optional[str] = None
+        self._key_buf: Optional[List[str]] = None
+        self._expect_value = False
+        self._array: Optional[str] = None
+        self._capture: Optional[List[str]] = None
+        self._capture_target: Optional[str] = None
+        self._capture_depth = 0
+        self._scalar = False
+
+    def feed(self, chunk: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        喂入一块输出
+
+        Returns:
+            (本块中新闭合的节点, 本块中新闭合的边)
+        """
+        if self.done or not chunk:
+            return [], []
+        self._raw.add(chunk)
+        node_count, edge_count = len(self.nodes), len(self.edges)
+        text = self._pending + chunk
+        self._pending = ""
+        self._scan(text)
+        if self.nodes:
+            self._raw.release()
+        return self.nodes[node_count:], self.edges[edge_count:]
+
+    def close(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """输出结束（对象都在闭合时产出，没有需要补充处理的内容）"""
+        self.done = True
+        return [], []
+
+    def structure(self) -> Dict[str, Any]:
+        """目前解析出的结构"""
+        fields = {k: v for k, v in self.fields.items() if k not in ITEM_ARRAYS}
+        return {**fields, "nodes": self.nodes, "edges": self.edges}
+
+    def text(self) -> str:
+        """尚未解析出节点时的原始输出（回退到整体解析时使用；已有节点时为空）"""
+        return self._raw.text()
+
+    def _has_content(self) -> bool:
+        return bool(self.nodes or self.edges or self.fields)
+
+    def _start_capture(self, target: str, depth: int, scalar: bool = False) -> None:
+        self._capture = []
+        self._capture_target = target
+        self._capture_depth = depth
+        self._scalar = scalar
+
+    def _finish_capture(self, tail: str) -> None:
+        self._capture.append(tail)
+        value = _loads("".join(self._capture).strip())
+        target = self._capture_target
+        self._capture = None
+        self._scalar = False
+        if target in ITEM_ARRAYS:
+            if isinstance(value, dict):
+                # 值为 null 的字段视为缺失（结构化输出的严格模式下，未填的可选字段为 null）
+                getattr(self, target).append({k: v for k, v in value.items() if v is not None})
+        elif value is not None:
+            self.fields[target] = value
+
+    def _scan(self, text: str) -> None:
+        n = len(text)
+        i = 0
+        cap_from = 0  # 当前捕获值在本块中的起始位置
+
+        while i < n:
+            if self._in_think:
+                close = THINK_CLOSE.search(text, i)
+                if close is None:
+                    # 闭合标签可能被切在块末尾，保留尾部
+                    self._pending = text[max(i, n - MAX_TAG_LENGTH):]
+                    return
+                self._in_think = False
+                i = close.end()
+                continue
+
+            c = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    if self._key_buf is not None:
+                        self._key_buf.append(c)
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(text, i)
+                stop = match.start() if match else n
+                if self._key_buf is not None:
+                    self._key_buf.append(text[i:stop])
+                if stop == n:
+                    break
+                if text[stop] == "\\":
+                    self._escaped = True
+                    if self._key_buf is not None:
+                        self._key_buf.append("\\")
+                else:
+                    self._in_string = False
+                    if self._key_buf is not None:
+                        # 键中的转义（如 \u0074）按 JSON 字符串解码
+                        raw = "".join(self._key_buf)
+                        key = _loads(f'"{raw}"') if "\\" in raw else raw
+                        self._key = key if isinstance(key, str) else raw
+                        self._key_buf = None
+                i = stop + 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._root == "{" and self._capture is None:
+                    if self._expect_value:
+                        self._start_capture(self._key, 1, scalar=True)
+                        cap_from = i
+                    else:
+                        self._key_buf = []
+                i += 1
+                continue
+
+            if self._depth == 0:
+                if c == "<":
+                    end = text.find(">", i + 1, i + MAX_TAG_LENGTH)
+                    if end < 0:
+                        if n - i < MAX_TAG_LENGTH:
+                            self._pending = text[i:]
+                            return
+                        i += 1
+                        continue
+                    opening = _think_tag(text[i + 1:end])
+                    if opening is None:
+                        i += 1
+                    else:
+                        self._in_think = opening
+                        i = end + 1
+                    continue
+                if c in "{[":
+                    self._root = c
+                    self._depth = 1
+                i += 1
+                continue
+
+            if c == "`":
+                # JSON 中途出现代码块标记：之前没有解析出任何内容说明那是说明文字里的括号，重新开始；
+                # 否则视为输出结束（结构被截断）
+                if not self._has_content():
+                    self._reset()
+                    i += 1
+                    continue
+                self._capture = None
+                self.done = True
+                return
+
+            if c in "{[":
+                if self._capture is None:
+                    if self._depth == 1 and self._root == "{" and self._expect_value:
+                        if c == "[" and self._key in ITEM_ARRAYS:
+                            self._array = self._key
+                        else:
+                            self._start_capture(self._key, 1)
+                            cap_from = i
+                        self._expect_value = False
+                    elif self._depth == 1 and self._root == "[" and c == "{":
+                        self._start_capture("nodes", 1)
+                        cap_from = i
+                    elif self._depth == 2 and self._array and c == "{":
+                        self._start_capture(self._array, 2)
+                        cap_from = i
+                self._depth += 1
+                i += 1
+                continue
+
+            if c in "}]":
+                if self._scalar and self._depth == 1:
+                    self._finish_capture(text[cap_from:i])
+                self._depth -= 1
+                i += 1
+                if self._capture is not None and not self._scalar and self._depth == self._capture_depth:
+                    self._finish_capture(text[cap_from:i])
+                if self._depth == 1:
+                    self._array = None
+                if self._depth == 0:
+                    if not self._has_content():
+                        self._reset()
+                        continue
+                    self.done = True
+                    return
+                continue
+
+            if self._depth == 1:
+                if c == ",":
+                    if self._scalar:
+                        self._finish_capture(text[cap_from:i])
+                    self._expect_value = False
+                elif c == ":":
+                    self._expect_value = True
+                elif c not in _WHITESPACE and self._expect_value and self._capture is None:
+                    self._start_capture(self._key, 1, scalar=True)
+                    cap_from = i
+            i += 1
+
+        if self._capture is not None:
+            self._capture.append(text[cap_from:])
+
+
+class StructureLineParser:
+    """逐行解析 T / N / E 协议（接口与 StructureStreamParser 相同）"""
+
+    def __init__(self):
+        self.nodes: List[Dict[str, Any]] = []
+        self.edges: List[Dict[str, Any]] = []
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self.skipped = 0  # 无法识别而被丢弃的行数
+        self._raw = _FallbackText()
+        self._line = ""  # 尚未收到换行的当前行
+        self._in_think = False
+
+    def feed(self, chunk: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        喂入一块输出，处理其中所有完整的行
+
+        Returns:
+            (本块中新解析的节点, 本块中新解析的边)
+        """
+        self._raw.add(chunk)
+        node_count, edge_count = len(self.nodes), len(self.edges)
+        lines = (self._line + chunk).split("\n")
+        self._line = lines.pop()
+        for line in lines:
+            self._consume(line)
+        if self.nodes:
+            self._raw.release()
+        return self.nodes[node_count:], self.edges[edge_count:]
+
+    def close(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """输出结束：处理最后一行（没有换行结尾时）"""
+        node_count, edge_count = len(self.nodes), len(self.edges)
+        if self._line:
+            self._consume(self._line)
+            self._line = ""
+        self.done = True
+        return self.nodes[node_count:], self.edges[edge_count:]
+
+    def structure(self) -> Dict[str, Any]:
+        """目前解析出的结构"""
+        return {**self.fields, "nodes": self.nodes, "edges": self.edges}
+
+    def text(self) -> str:
+        """尚未解析出节点时的原始输出（回退到整体解析时使用；已有节点时为空）"""
+        return self._raw.text()
+
+    def _consume(self, line: str) -> None:
+        line = line.strip()
+        if self._in_think:
+            close = THINK_CLOSE.search(line)
+            if close is None:
+                return
+            self._in_think = False
+            line = line[close.end():].strip()
+        if line.startswith("<") and ">" in line:
+            opening = _think_tag(line[1:line.index(">")])
+            if opening is not None:
+                rest = line[line.index(">") + 1:]
+                close = THINK_CLOSE.search(rest) if opening else None
+                if opening and close is None:
+                    self._in_think = True
+                    return
+                line = rest[close.end():].strip() if close else rest.strip()
+        if not line or line.startswith("```"):
+            return
+
+        if line.startswith("{"):
+            self._consume_json(_loads(line))
+            return
+
+        kind, _, body = line.partition(" ")
+        parts = [part.strip() for part in body.split("|")]
+        if kind == "T" and parts[0]:
+            self.fields["type"] = parts[0]
+        elif kind == "N" and parts[0]:
+            rest, extra = _split_line_fields(parts[1:])
+            # 位置字段：文本|形状|分组。文本中误用了竖线时，以后面第一个合法形状为界把前面的部分拼回文本
+            shape_at = next((k for k in range(2, len(rest)) if rest[k] in NODE_SHAPES), None)
+            if shape_at is not None and rest[1] and rest[1] not in NODE_SHAPES:
+                rest = ["|".join(rest[:shape_at])] + rest[shape_at:]
+            label, shape, group = (rest + ["", "", ""])[:3]
+            if shape and shape not in NODE_SHAPES and not group and len(rest) == 2:
+                # 省略了形状、直接写分组（N id|文本|分组）
+                shape, group = "", shape
+            node: Dict[str, Any] = {"id": parts[0]}
+            if label:
+                node["label"] = label.replace("\\n", "\n")
+            node["shape"] = shape if shape in NODE_SHAPES else "rectangle"
+            if group:
+                node["group"] = group
+            node.update(extra)
+            self.nodes.append(node)
+        elif kind == "E" and len(parts) >= 2 and parts[0] and parts[1]:
+            rest, extra = _split_line_fields(parts[2:])
+            edge: Dict[str, Any] = {"from": parts[0], "to": parts[1]}
+            label = "|".join(rest)
+            if label:
+                edge["label"] = label.replace("\\n", "\n")
+            edge.update(extra)
+            self.edges.append(edge)
+        else:
+            self.skipped += 1
+            logger.debug(f"结构逐行解析: 跳过无法识别的行: {line[:80]!r}")
+
+    def _consume_json(self, value: Any) -> None:
+        if not isinstance(value, dict):
+            self.skipped += 1
+        elif "from" in value and "to" in value:
+            self.edges.append(value)
+        elif "id" in value:
+            self.nodes.append(value)
+        elif isinstance(value.get("type"), str):
+            self.fields["type"] = value["type"]
+        else:
+            self.skipped += 1
+
+
+def create_stream_parser(output_format: str = "json"):
+    """按结构输出格式（STRUCTURE_FORMATS）创建增量解析器"""
+    if output_format == "lines":
+        return StructureLineParser()
+    return StructureStreamParser()
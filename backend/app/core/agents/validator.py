@@ -1,9 +1,14 @@
 """
 验证智能体 - 验证生成的代码
 """
-import json
 from typing import Dict, Any, List, Tuple
 
+from app.core.excalidraw.scene_stream import iter_scene_elements
+
+
+# _validate_element 检查的字段
+_VALIDATED_FIELDS = frozenset({"type", "x", "y", "text", "start", "end", "children"})
+
 
 class ValidatorAgent:
     """验证智能体"""
@@ -20,17 +25,26 @@ class ValidatorAgent:
         """
         errors = []
         
-        # 1. JSON 格式验证
+        # 1. JSON 格式与数组验证：流式读取，只解码校验用到的字段（跳过 files、points 等大字段）
         try:
-            elements = json.loads(code)
-        except json.JSONDecodeError as e:
+            elements = list(iter_scene_elements(code, _VALIDATED_FIELDS))
+        except ValueError as e:
             errors.append(f"JSON 格式错误: {str(e)}")
             return False, errors
         
-        # 2. 数组验证
-        if not isinstance(elements, list):
-            errors.append("代码必须是数组格式")
-            return False, errors
+        return self.validate_elements(elements)
+    
+    def validate_elements(self, elements: List[Dict[str, Any]]) -> Tuple[bool, List[str]]:
+        """
+        验证元素列表（生成流水线内部使用，省去 JSON 解析）
+        
+        Args:
+            elements: Excalidraw 元素列表
+            
+        Returns:
+            (是否有效, 错误列表)
+        """
+        errors = []
         
         # 3. 元素验证
         for i, element in enumerate(elements):
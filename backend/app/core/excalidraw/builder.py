@@ -1,19 +1,40 @@
 """
 Excalidraw JSON 生成器 - 从布局结果生成完整的 Excalidraw JSON
 """
-import json
-import uuid
-from typing import Dict, Any, List, Optional
+import hashlib
+from typing import Dict, Any, Iterator, List, Optional, TYPE_CHECKING
 from loguru import logger
 from app.core.layout.theme import Theme, ThemeType
+from app.core.excalidraw.ports import assign_ports
+from app.core.excalidraw.serializer import dumps_elements
+
+if TYPE_CHECKING:
+    from app.core.excalidraw.library import LibraryCatalog
+
+
+ICON_LABEL_SPACE = 28  # 图标节点底部留给标签的高度
+
+
+def _element_id(prefix: str, *parts: Any) -> str:
+    """由逻辑 ID 派生的确定性元素 ID：同一结构重复生成得到相同的 ID，便于增量对比与缓存"""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=6)
+    return f"{prefix}-{digest.hexdigest()}"
 
 
 class ExcalidrawBuilder:
     """Excalidraw JSON 生成器"""
     
-    def __init__(self, theme_type: ThemeType = ThemeType.DEFAULT):
+    _TEMPLATES: Dict[tuple, Dict[str, Any]] = {}  # (元素类型, 主题) -> 固定样式
+    
+    def __init__(self, theme_type: ThemeType = ThemeType.DEFAULT, icons: Optional["LibraryCatalog"] = None):
+        """
+        Args:
+            theme_type: 主题类型
+            icons: 图标目录（可选）；提供时标签匹配到图标的节点（如 S3、Kafka）绘制为图标
+        """
         self.theme_type = theme_type
         self.theme = Theme.get_theme(theme_type)
+        self.icons = icons
     
     def _determine_shape(self, node: Dict[str, Any]) -> str:
         """根据节点类型或标签确定形状"""
@@ -22,7 +43,7 @@ class ExcalidrawBuilder:
         shape = node.get("shape", "").lower()
 
         # 如果已经指定了有效形状，直接使用
-        if shape in ["rectangle", "ellipse", "diamond"]:
+        if shape in ["rectangle", "ellipse", "diamond", "line"]:
             return shape
 
         # 根据标签推断
@@ -55,15 +76,48 @@ class ExcalidrawBuilder:
             theme_type: 主题类型（可选）
             
         Returns:
-            Excalidraw JSON 字符串
+            Excalidraw JSON 字符串（紧凑格式）
+        """
+        return dumps_elements(self.build_elements(structure, layout_nodes, edges, theme_type))
+
+    def build_elements(
+        self,
+        structure: Dict[str, Any],
+        layout_nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        theme_type: Optional[ThemeType] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        从结构和布局生成 Excalidraw 元素列表（不序列化，供后续阶段直接使用）
+        
+        Args:
+            structure: 图表结构
+            layout_nodes: 带坐标的节点列表
+            edges: 边列表
+            theme_type: 主题类型（可选）
+            
+        Returns:
+            Excalidraw 元素列表
+        """
+        return list(self.iter_elements(structure, layout_nodes, edges, theme_type))
+
+    def iter_elements(
+        self,
+        structure: Dict[str, Any],
+        layout_nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        theme_type: Optional[ThemeType] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        逐个生成 Excalidraw 元素（先节点后箭头），整体 O(N + E log E)
+        
+        节点按 ID 建索引，箭头直接查表；各形状的固定样式按主题预先生成模板，
+        每个元素只需浅拷贝模板再填入坐标和文本。
         """
         # 使用指定的主题或默认主题
-        if theme_type:
-            theme = Theme.get_theme(theme_type)
-        else:
-            theme = self.theme
+        theme_type = theme_type or self.theme_type
+        theme = Theme.get_theme(theme_type)
         
-        elements = []
         node_id_map = {}  # 原始 ID -> Excalidraw ID
         
         # 1. 创建节点元素
@@ -83,12 +137,36 @@ class ExcalidrawBuilder:
                 width = max(width, 120)
                 height = max(height, 120)
 
-            # 生成 Excalidraw ID
-            excalidraw_id = f"node-{uuid.uuid4().hex[:8]}"
+            # 生成 Excalidraw ID（由节点 ID 确定）
+            excalidraw_id = _element_id("node", node_id)
             node_id_map[node_id] = excalidraw_id
+            template = self._template(shape, theme_type)
+            
+            # 标签匹配到图标库中的图标：透明容器（承载标签与箭头绑定）+ 图标元素
+            icon = None
+            if self.icons is not None and shape not in ("line", "text") \
+                    and not node.get("record") and not node.get("collapsed"):
+                icon = self.icons.find(label)
+            if icon is not None:
+                yield from self._icon_elements(excalidraw_id, icon, label, x, y, width, height, template)
+                continue
             
             # 根据形状类型创建元素
-            if shape == "text":
+            if shape == "line":
+                # 布局引擎生成的辅助线（如鱼骨图的主骨/大骨），不带标签
+                element = {
+                    "id": excalidraw_id,
+                    "type": "line",
+                    "x": float(x),
+                    "y": float(y),
+                    "width": float(width),
+                    "height": float(height),
+                    "points": node.get("points", [[0, 0], [width, height]]),
+                    **template,
+                }
+                if "strokeWidth" in node:
+                    element["strokeWidth"] = node["strokeWidth"]
+            elif shape == "text":
                 # 文本元素
                 element = {
                     "id": excalidraw_id,
@@ -96,33 +174,10 @@ class ExcalidrawBuilder:
                     "x": float(x),
                     "y": float(y),
                     "text": label,
-                    "fontSize": 20,
-                    "strokeColor": theme.get("text", "#000000")
+                    **template,
                 }
             else:
                 # 形状元素（带标签）
-                shape_color = Theme.get_shape_color(shape, self.theme_type if not theme_type else theme_type)
-                corner_radius = theme.get("cornerRadius", 0)
-                
-                # 特殊处理：韦恩图的集合圆圈需要半透明
-                fill_style = "hachure"
-                stroke_width = theme.get("lineWidth", 2)
-                
-                # 如果是 LayoutEngine 标记为 transparent 的（针对韦恩图集合）
-                if node.get("backgroundColor") == "transparent":
-                    shape_color = "#00000000" # 完全透明背景，或者使用半透明色
-                    # 为了让韦恩图好看，我们使用半透明填充
-                    # Excalidraw 没有直接的 rgba 背景色支持得很好，通常通过 fillStyle 控制
-                    # 这里我们给一个半透明的描边色作为背景色模拟，或者直接不填充
-                    fill_style = "solid" 
-                    # 实际上 Excalidraw 的 backgroundColor 支持 hex alpha
-                    # 给几个好看的半透明色
-                    colors = ["#ff000020", "#00ff0020", "#0000ff20", "#ffff0020"]
-                    # 根据 ID hash 选一个颜色，避免每次都一样
-                    color_idx = abs(hash(node_id)) % len(colors)
-                    shape_color = colors[color_idx]
-                    stroke_width = 3
-
                 element = {
                     "id": excalidraw_id,
                     "type": shape,
@@ -130,146 +185,250 @@ class ExcalidrawBuilder:
                     "y": float(y),
                     "width": float(width),
                     "height": float(height),
-                    "backgroundColor": shape_color,
-                    "strokeColor": theme.get("primary", "#1976d2"),
-                    "strokeWidth": stroke_width,
-                    "fillStyle": fill_style,
-                    "label": {
-                        "text": label,
-                        "fontSize": 16,
-                        "strokeColor": theme.get("text", "#000000"),
-                        "textAlign": "center",
-                        "verticalAlign": "middle"
-                    }
+                    **template,
+                    "label": {"text": label, **template["label"]},
                 }
                 
-                # 应用圆角（如果支持）
-                if corner_radius > 0 and shape in ["rectangle"]:
-                    element["roundness"] = {"type": min(corner_radius // 2, 3)}
+                # 如果是 LayoutEngine 标记为 transparent 的（针对韦恩图集合）
+                if node.get("backgroundColor") == "transparent":
+                    # Excalidraw 的 backgroundColor 支持 hex alpha，给几个好看的半透明色，实心填充
+                    colors = ["#ff000020", "#00ff0020", "#0000ff20", "#ffff0020"]
+                    # 根据 ID 的稳定哈希选一个颜色（内置 hash 对 str 按进程加盐，重启后颜色会变，补丁中出现多余的 changed）
+                    digest = hashlib.blake2b(str(node_id).encode("utf-8"), digest_size=2).digest()
+                    element["backgroundColor"] = colors[int.from_bytes(digest, "big") % len(colors)]
+                    element["fillStyle"] = "solid"
+                    element["strokeWidth"] = 3
+
+                # LOD 摘要节点：虚线边框，customData 记录摘要 ID 供前端展开
+                if node.get("collapsed"):
+                    element["strokeStyle"] = "dashed"
+                    element["customData"] = {"lodId": node_id, "collapsed": node["collapsed"]}
+
+                # 记录节点（ER 实体 / 类）：标签作为表头置顶，分栏另外绘制
+                if node.get("record"):
+                    element["label"]["verticalAlign"] = "top"
+                    element["label"]["text"] = "\n".join(node["record"]["header"])
             
-            elements.append(element)
+            yield element
+            if node.get("record"):
+                yield from self._build_record_sections(node, x, y, width, theme)
         
         # 2. 创建箭头/连线元素
         # 对于韦恩图，不生成箭头，因为韦恩图是通过空间重叠来表达关系的
-        if structure.get("type") == "venn":
-            return json.dumps(elements, ensure_ascii=False, indent=2)
+        # 鱼骨图的关系由布局引擎生成的骨线表达，同样不生成箭头
+        if structure.get("type") in ("venn", "fishbone"):
+            return
 
+        # 收集可绘制的连线，统一分配端口（同一侧的多条连线分散开）
+        nodes_by_id = {n.get("id"): n for n in layout_nodes}
+        drawable = []
+        links = []
         for edge in edges:
             from_id = edge.get("from")
             to_id = edge.get("to")
-            edge_label = edge.get("label", "")
-            
-            if from_id not in node_id_map or to_id not in node_id_map:
-                continue
-            
-            from_excalidraw_id = node_id_map[from_id]
-            to_excalidraw_id = node_id_map[to_id]
-            
-            # 找到对应的节点元素以计算箭头位置
-            from_node = next((n for n in layout_nodes if n.get("id") == from_id), None)
-            to_node = next((n for n in layout_nodes if n.get("id") == to_id), None)
-            
-            if not from_node or not to_node:
+            from_node = nodes_by_id.get(from_id)
+            to_node = nodes_by_id.get(to_id)
+            if from_id not in node_id_map or to_id not in node_id_map or not from_node or not to_node:
                 continue
-            
-            # 计算箭头起点和终点（节点边缘中心）
-            from_x = from_node.get("x", 0)
-            from_y = from_node.get("y", 0)
-            from_w = from_node.get("width", 200)
-            from_h = from_node.get("height", 80)
-            
-            to_x = to_node.get("x", 0)
-            to_y = to_node.get("y", 0)
-            to_w = to_node.get("width", 200)
-            to_h = to_node.get("height", 80)
-            
-            # 计算连接点（简化版：使用节点中心）
-            from_center_x = from_x + from_w / 2
-            from_center_y = from_y + from_h / 2
-            to_center_x = to_x + to_w / 2
-            to_center_y = to_y + to_h / 2
-            
-            # 计算箭头位置和尺寸
-            dx = to_center_x - from_center_x
-            dy = to_center_y - from_center_y
-            
-            # 起点：从节点边缘开始
-            start_x, start_y = self._get_edge_point(
-                from_x, from_y, from_w, from_h,
-                to_center_x, to_center_y
-            )
-            
-            # 终点：到节点边缘
-            end_x, end_y = self._get_edge_point(
-                to_x, to_y, to_w, to_h,
-                from_center_x, from_center_y
-            )
-            
-            # 创建箭头元素（使用主题颜色）
-            # 优先使用 elbow (折线) 样式，对于流程图更整洁
-            arrow_type = "elbow" 
-            
+            # 捆绑的边经过途经点：两端分别朝向第一个 / 最后一个途经点
+            waypoints = edge.get("waypoints") or []
+            drawable.append((edge, waypoints))
+            links.append((
+                self._port_box(from_node),
+                self._port_box(to_node),
+                tuple(waypoints[0]) if waypoints else None,
+                tuple(waypoints[-1]) if waypoints else None,
+            ))
+        ports = assign_ports(links)
+
+        # 创建箭头元素（使用主题颜色）
+        arrow_template = self._template("arrow", theme_type)
+        label_template = self._template("arrow_label", theme_type)
+        occurrences: Dict[tuple, int] = {}  # 重边按出现次序区分 ID
+        for (edge, waypoints), ((start_x, start_y), (end_x, end_y)) in zip(drawable, ports):
+            edge_label = edge.get("label", "")
+            pair = (edge.get("from"), edge.get("to"))
+            occurrences[pair] = occurrences.get(pair, 0) + 1
             arrow = {
-                "id": f"arrow-{uuid.uuid4().hex[:8]}",
+                "id": _element_id("arrow", pair[0], pair[1], occurrences[pair]),
                 "type": "arrow",
                 "x": float(start_x),
                 "y": float(start_y),
                 "width": float(end_x - start_x),
                 "height": float(end_y - start_y),
-                "strokeColor": theme.get("lineColor", theme.get("primary", "#1976d2")),
-                "strokeWidth": theme.get("lineWidth", 2),
-                "endArrowhead": "arrow",
-                # 设置线条样式为折线
-                "strokeStyle": "solid",
-                "roundness": { "type": 2 }, # 稍微圆角
+                **arrow_template,
                 "start": {
-                    "id": from_excalidraw_id
+                    "id": node_id_map[edge.get("from")]
                 },
                 "end": {
-                    "id": to_excalidraw_id
+                    "id": node_id_map[edge.get("to")]
                 }
             }
             
+            if waypoints:
+                arrow["points"] = [[0.0, 0.0]] + [
+                    [float(px - start_x), float(py - start_y)] for px, py in waypoints
+                ] + [[float(end_x - start_x), float(end_y - start_y)]]
+            if edge.get("bidirectional"):
+                arrow["startArrowhead"] = "arrow"
+            
             # 如果有标签，添加标签
             if edge_label:
-                arrow["label"] = {
-                    "text": edge_label,
-                    "fontSize": 14,
-                    "strokeColor": theme.get("lineColor", theme.get("primary", "#1976d2"))
-                }
+                arrow["label"] = {"text": edge_label, **label_template}
             
-            elements.append(arrow)
-        
-        return json.dumps(elements, ensure_ascii=False, indent=2)
+            yield arrow
     
-    def _get_edge_point(
+    def _icon_elements(
         self,
-        node_x: float, node_y: float, node_w: float, node_h: float,
-        target_x: float, target_y: float
-    ) -> tuple:
-        """计算节点边缘上的连接点 (Snap-to-grid 风格)"""
-        center_x = node_x + node_w / 2
-        center_y = node_y + node_h / 2
+        excalidraw_id: str,
+        icon: int,
+        label: str,
+        x: float,
+        y: float,
+        width: float,
+        height: float,
+        template: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """图标节点：透明容器（标签置底）+ 缩放到节点框上部、居中的图标元素（编为一组）"""
+        yield {
+            "id": excalidraw_id,
+            "type": "rectangle",
+            "x": float(x),
+            "y": float(y),
+            "width": float(width),
+            "height": float(height),
+            "strokeColor": "transparent",
+            "backgroundColor": "transparent",
+            "label": {"text": label, **template["label"], "verticalAlign": "bottom"},
+            "customData": {"icon": self.icons.name(icon)},
+        }
         
-        dx = target_x - center_x
-        dy = target_y - center_y
+        elements, icon_w, icon_h = self.icons.item(icon)
+        area_h = max(height - ICON_LABEL_SPACE, height / 2)
+        scale = min(width / icon_w, area_h / icon_h)
+        offset_x = x + (width - icon_w * scale) / 2
+        offset_y = y + (area_h - icon_h * scale) / 2
+        group = f"{excalidraw_id}-icon"
+        for index, el in enumerate(elements):
+            item = {
+                **el,
+                "id": f"{group}-{index}",
+                "x": float(offset_x + el.get("x", 0) * scale),
+                "y": float(offset_y + el.get("y", 0) * scale),
+                "width": float(el.get("width", 0) * scale),
+                "height": float(el.get("height", 0) * scale),
+                "groupIds": [group],
+            }
+            if "points" in el:
+                item["points"] = [[px * scale, py * scale] for px, py in el["points"]]
+            if "fontSize" in el:
+                item["fontSize"] = el["fontSize"] * scale
+            yield item
+    
+    @classmethod
+    def _template(cls, kind: str, theme_type: ThemeType) -> Dict[str, Any]:
+        """
+        某类元素在某主题下的固定样式（按 (类型, 主题) 缓存）
         
-        # 优先选择 上下左右 四个中点
+        模板只被浅拷贝，其中的嵌套对象（roundness 等）在元素间共享，不能原地修改；
+        形状的 label 样式在使用时展开到新的字典中。
+        """
+        key = (kind, theme_type)
+        template = cls._TEMPLATES.get(key)
+        if template is not None:
+            return template
         
-        # 水平方向为主
-        if abs(dx) > abs(dy):
-            if dx > 0:
-                # 右边缘中点
-                return (node_x + node_w, center_y)
-            else:
-                # 左边缘中点
-                return (node_x, center_y)
+        theme = Theme.get_theme(theme_type)
+        line_color = theme.get("lineColor", theme.get("primary", "#1976d2"))
+        if kind == "line":
+            template = {
+                "strokeColor": line_color,
+                "strokeWidth": theme.get("lineWidth", 2),
+            }
+        elif kind == "text":
+            template = {
+                "fontSize": 20,
+                "strokeColor": theme.get("text", "#000000"),
+            }
+        elif kind == "arrow":
+            template = {
+                "strokeColor": line_color,
+                "strokeWidth": theme.get("lineWidth", 2),
+                "endArrowhead": "arrow",
+                # 设置线条样式
+                "strokeStyle": "solid",
+                "roundness": {"type": 2},  # 稍微圆角
+            }
+        elif kind == "arrow_label":
+            template = {
+                "fontSize": 14,
+                "strokeColor": line_color,
+            }
         else:
-            # 垂直方向为主
-            if dy > 0:
-                # 下边缘中点
-                return (center_x, node_y + node_h)
-            else:
-                # 上边缘中点
-                return (center_x, node_y)
+            template = {
+                "backgroundColor": Theme.get_shape_color(kind, theme_type),
+                "strokeColor": theme.get("primary", "#1976d2"),
+                "strokeWidth": theme.get("lineWidth", 2),
+                "fillStyle": "hachure",
+                "label": {
+                    "fontSize": 16,
+                    "strokeColor": theme.get("text", "#000000"),
+                    "textAlign": "center",
+                    "verticalAlign": "middle",
+                },
+            }
+            # 应用圆角（如果支持）
+            corner_radius = theme.get("cornerRadius", 0)
+            if corner_radius > 0 and kind in ["rectangle"]:
+                template["roundness"] = {"type": min(corner_radius // 2, 3)}
+        
+        cls._TEMPLATES[key] = template
+        return template
+    
+    def _build_record_sections(
+        self,
+        node: Dict[str, Any],
+        x: float,
+        y: float,
+        width: float,
+        theme: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """绘制记录节点的分栏：每栏一条分隔线 + 一个左对齐的多行文本"""
+        record = node["record"]
+        elements = []
+        top = y + record["header_height"]
+        for index, (lines, height) in enumerate(zip(record["sections"], record["section_heights"])):
+            elements.append({
+                "id": _element_id("line", node.get("id"), index),
+                "type": "line",
+                "x": float(x),
+                "y": float(top),
+                "width": float(width),
+                "height": 0.0,
+                "points": [[0, 0], [float(width), 0]],
+                "strokeColor": theme.get("primary", "#1976d2"),
+                "strokeWidth": 1,
+            })
+            if lines:
+                elements.append({
+                    "id": _element_id("text", node.get("id"), index),
+                    "type": "text",
+                    "x": float(x + 10),
+                    "y": float(top + 6),
+                    "text": "\n".join(lines),
+                    "fontSize": 16,
+                    "textAlign": "left",
+                    "strokeColor": theme.get("text", "#000000"),
+                })
+            top += height
+        return elements
 
+    def _port_box(self, node: Dict[str, Any]) -> tuple:
+        """端口分配使用的节点框 (节点 ID, x, y, 宽, 高)"""
+        return (
+            node.get("id"),
+            node.get("x", 0),
+            node.get("y", 0),
+            node.get("width", 200),
+            node.get("height", 80),
+        )
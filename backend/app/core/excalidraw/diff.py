@@ -0,0 +1,73 @@
+"""
+场景差异 - 修改模式下只返回相对于当前场景的补丁
+
+ExcalidrawBuilder 的元素 ID 由逻辑节点/边 ID 确定，同一节点在多次生成中 ID 不变，
+因此可以按 ID 对比前后两个场景：
+- added:   新场景中新增的元素（完整元素）
+- removed: 旧场景中被删除的元素 ID
+- changed: ID 相同但内容变化的元素（完整元素）
+- order:   仅当「删除 + 原位替换 + 追加新增」得到的顺序与新场景不一致时给出完整的 ID 顺序（z 轴顺序）
+
+单个节点的修改只会产生少量 changed / added 元素，响应从整个场景缩小到几 KB。
+"""
+import json
+from typing import AbstractSet, Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.excalidraw.parser import parse_code
+from app.core.excalidraw.scene_stream import iter_scene_elements
+
+
+def load_scene(
+    code: Optional[str],
+    fields: Optional[AbstractSet[str]] = None,
+    max_elements: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    解析客户端提交的当前场景（元素数组或完整的 .excalidraw 场景）；无法解析时返回 None（调用方回退到完整响应）
+
+    场景中的 files 等字段不会被解析；fields / max_elements 见 scene_stream.iter_scene_elements
+    """
+    if not code or not code.strip():
+        return None
+    try:
+        return list(iter_scene_elements(code, fields, max_elements))
+    except ValueError:
+        pass
+    try:
+        elements = json.loads(parse_code(code))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(elements, list):
+        return None
+    return [el for el in elements if isinstance(el, dict)]
+
+
+def diff_elements(
+    old: List[Dict[str, Any]],
+    new: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    计算从 old 到 new 的补丁，O(n)
+
+    Returns:
+        补丁 {added, removed, changed[, order]}；任一场景中存在缺失或重复的 ID 时返回 None
+    """
+    old_by_id = {el.get("id"): el for el in old}
+    new_by_id = {el.get("id"): el for el in new}
+    if None in old_by_id or None in new_by_id or len(old_by_id) != len(old) or len(new_by_id) != len(new):
+        logger.warning("场景中存在缺失或重复的元素 ID，无法生成补丁")
+        return None
+
+    added = [el for el in new if el["id"] not in old_by_id]
+    removed = [el["id"] for el in old if el["id"] not in new_by_id]
+    changed = [el for el in new if el["id"] in old_by_id and old_by_id[el["id"]] != el]
+
+    patch: Dict[str, Any] = {"added": added, "removed": removed, "changed": changed}
+    # 客户端按「删除、原位替换、追加新增」应用补丁，顺序不一致时附带完整顺序
+    applied_order = [el["id"] for el in old if el["id"] in new_by_id] + [el["id"] for el in added]
+    new_order = [el["id"] for el in new]
+    if applied_order != new_order:
+        patch["order"] = new_order
+    return patch
@@ -0,0 +1,248 @@
+"""
+Excalidraw 图标库 - 把 .excalidrawlib 中的图标用于节点替换
+
+frontend/public/libraries 下的库文件共数 MB（aws-architecture-icons 就有 3.9 MB），
+不能在每个请求中解析。这里只在库文件变化时解析一次，生成磁盘索引：
+- library.bin：每个图标的元素（已去掉版本号、随机种子等无关字段，坐标平移到原点）紧凑 JSON 依次拼接
+- library-index.json：库文件签名、每个图标的 (偏移, 长度, 名称, 来源, 宽, 高)、关键词 -> 图标下标
+
+索引在应用启动时加载（库文件有变化时重新生成），运行时 mmap library.bin，按偏移只解码用到的图标（带 LRU 缓存）。
+
+关键词：图标名称与图标内的短文本（全称）。
+节点标签（去掉 AWS、Amazon 等厂商前缀后）整体是关键词时命中；否则标签中的关键词词组须覆盖标签的大部分词，
+"Order Service"、"Web Server" 这类只有一个通用词相同的标签不替换，保持普通形状。
+"""
+import json
+import mmap
+import os
+import re
+import tempfile
+from contextlib import suppress
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+
+INDEX_VERSION = 2
+DECODED_CAPACITY = 128  # 已解码图标的缓存数量
+MAX_KEYWORD_LENGTH = 40
+MIN_MATCH_SCORE = 0.6  # 关键词词组覆盖标签词数的最低比例
+# 匹配前去掉的厂商前缀（"AWS Lambda"、"Amazon S3" 按 "lambda"、"s3" 匹配）
+_VENDOR_WORDS = frozenset({"aws", "amazon", "azure", "microsoft", "gcp", "google"})
+# 库文件中的元素：去掉与图标外观无关的字段，减小索引体积
+_DROP_FIELDS = (
+    "version", "versionNonce", "index", "updated", "seed", "boundElements",
+    "link", "locked", "frameId", "isDeleted", "groupIds", "containerId", "id",
+    "startBinding", "endBinding",
+)
+_DRAWABLE = ("rectangle", "ellipse", "diamond", "line", "arrow", "text", "draw", "freedraw")
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """关键词规范化：小写、合并空白"""
+    return " ".join(str(text).lower().split())
+
+
+def _items(path: Path) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+    """读取库文件中的 (名称, 元素列表)，兼容 v1（library）与 v2（libraryItems）格式"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = []
+    for item in data.get("libraryItems") or data.get("library") or []:
+        if isinstance(item, dict):
+            items.append((item.get("name"), item.get("elements") or []))
+        elif isinstance(item, list):
+            items.append((None, item))
+    return items
+
+
+def _compact(name: Optional[str], elements: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float, float, List[str]]:
+    """清理元素并平移到原点，返回 (元素, 宽, 高, 图标内的文本)"""
+    elements = [el for el in elements if el.get("type") in _DRAWABLE and not el.get("isDeleted")]
+    texts = [str(el.get("text", "")) for el in elements if el.get("type") == "text"]
+    # 与图标名称相同的文本是图标的标题，替换节点时由节点标签代替
+    if name:
+        elements = [
+            el for el in elements
+            if not (el.get("type") == "text" and normalize(el.get("text", "")) == normalize(name))
+        ]
+    if not elements:
+        return [], 0.0, 0.0, texts
+
+    min_x = min(el.get("x", 0) for el in elements)
+    min_y = min(el.get("y", 0) for el in elements)
+    max_x = max(el.get("x", 0) + el.get("width", 0) for el in elements)
+    max_y = max(el.get("y", 0) + el.get("height", 0) for el in elements)
+    compact = []
+    for el in elements:
+        el = {k: v for k, v in el.items() if k not in _DROP_FIELDS}
+        if el["type"] == "draw":
+            el["type"] = "line"  # 旧版库中的手绘线条
+        el["x"] = el.get("x", 0) - min_x
+        el["y"] = el.get("y", 0) - min_y
+        compact.append(el)
+    return compact, max_x - min_x, max_y - min_y, texts
+
+
+def _signature(library_dir: Path) -> Dict[str, List[int]]:
+    return {
+        path.name: [path.stat().st_size, int(path.stat().st_mtime)]
+        for path in sorted(library_dir.glob("*.excalidrawlib"))
+    }
+
+
+def build_index(library_dir: Path, index_dir: Path) -> Dict[str, Any]:
+    """解析所有库文件，写出 library.bin 与 library-index.json"""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    items: List[List[Any]] = []
+    keywords: Dict[str, List[int]] = {}
+    offset = 0
+
+    # 临时文件名唯一（多个进程可能同时生成索引），写完后用 os.replace 原子替换
+    bin_fd, tmp_bin = tempfile.mkstemp(dir=index_dir, prefix="library.bin.", suffix=".tmp")
+    index_fd, tmp_index = tempfile.mkstemp(dir=index_dir, prefix="library-index.json.", suffix=".tmp")
+    try:
+        with os.fdopen(bin_fd, "wb") as out:
+            for path in sorted(library_dir.glob("*.excalidrawlib")):
+                try:
+                    entries = _items(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"跳过无法解析的库文件 {path.name}: {e}")
+                    continue
+                for name, elements in entries:
+                    compact, width, height, texts = _compact(name, elements)
+                    if not compact or not width or not height:
+                        continue
+                    payload = json.dumps(compact, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    out.write(payload)
+                    item_index = len(items)
+                    items.append([offset, len(payload), name, path.stem, width, height])
+                    offset += len(payload)
+
+                    for keyword in ([name] if name else []) + texts:
+                        keyword = normalize(keyword)
+                        if 2 <= len(keyword) <= MAX_KEYWORD_LENGTH:
+                            keywords.setdefault(keyword, [])
+                            if item_index not in keywords[keyword]:
+                                keywords[keyword].append(item_index)
+
+        index = {
+            "version": INDEX_VERSION,
+            "sources": _signature(library_dir),
+            "items": items,
+            "keywords": keywords,
+        }
+        with os.fdopen(index_fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_bin, index_dir / "library.bin")
+        os.replace(tmp_index, index_dir / "library-index.json")
+    except BaseException:
+        for tmp in (tmp_bin, tmp_index):
+            with suppress(OSError):
+                os.unlink(tmp)
+        raise
+    logger.info(f"图标库索引已生成: {len(items)} 个图标, {len(keywords)} 个关键词, {offset} 字节")
+    return index
+
+
+class LibraryCatalog:
+    """图标目录：按关键词查找图标，按需解码"""
+
+    def __init__(self, library_dir: Path, index_dir: Path):
+        self.library_dir = Path(library_dir)
+        self.index_dir = Path(index_dir)
+        self._index: Optional[Dict[str, Any]] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._decoded: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+
+    def _load(self) -> Dict[str, Any]:
+        """加载索引；库文件有变化（或索引不存在）时重新生成"""
+        if self._index is not None:
+            return self._index
+        index_file = self.index_dir / "library-index.json"
+        index = None
+        if self.library_dir.is_dir():
+            if index_file.exists():
+                with open(index_file, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("version") != INDEX_VERSION or index.get("sources") != _signature(self.library_dir):
+                    index = None
+            if index is None:
+                index = build_index(self.library_dir, self.index_dir)
+        else:
+            logger.warning(f"图标库目录不存在: {self.library_dir}")
+            index = {"items": [], "keywords": {}}
+
+        bin_file = self.index_dir / "library.bin"
+        if index["items"] and bin_file.exists() and bin_file.stat().st_size:
+            with open(bin_file, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = index
+        return index
+
+    def load(self) -> None:
+        """加载索引（必要时生成），应用启动时调用，避免首个请求同步解析库文件"""
+        self._load()
+
+    def find(self, label: str) -> Optional[int]:
+        """
+        按节点标签查找图标下标，没有足够匹配的图标时返回 None
+
+        标签整体（或去掉厂商前缀后整体）是关键词时直接命中；否则取标签中连续、且是关键词的词组，
+        按其覆盖标签词数的比例打分，低于 MIN_MATCH_SCORE 不替换。
+        """
+        index = self._load()
+        if not index["items"] or not label:
+            return None
+        keywords = index["keywords"]
+        text = normalize(label)
+        if text in keywords:
+            return keywords[text][0]
+        tokens = [token for token in _WORD.findall(text) if token not in _VENDOR_WORDS]
+        best, best_score = None, 0.0
+        for start in range(len(tokens)):
+            # 从 start 起最长的关键词词组
+            for end in range(len(tokens), start, -1):
+                phrase = " ".join(tokens[start:end])
+                if phrase in keywords:
+                    score = (end - start) / len(tokens)
+                    if score > best_score:
+                        best, best_score = keywords[phrase][0], score
+                    break
+        return best if best_score >= MIN_MATCH_SCORE else None
+
+    def item(self, item_index: int) -> Tuple[List[Dict[str, Any]], float, float]:
+        """解码图标：(元素列表（原点在左上角）, 宽, 高)"""
+        index = self._load()
+        _, _, _, _, width, height = index["items"][item_index]
+        elements = self._decoded.get(item_index)
+        if elements is None:
+            offset, length = index["items"][item_index][:2]
+            elements = json.loads(self._mmap[offset:offset + length].decode("utf-8"))
+            self._decoded[item_index] = elements
+            while len(self._decoded) > DECODED_CAPACITY:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(item_index)
+        return elements, width, height
+
+    def name(self, item_index: int) -> str:
+        index = self._load()
+        _, _, name, source = index["items"][item_index][:4]
+        return name or f"{source}#{item_index}"
+
+
+_CATALOG: Optional[LibraryCatalog] = None
+
+
+def get_catalog() -> LibraryCatalog:
+    """进程级图标目录（索引在应用启动时加载，见 app.main）"""
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = LibraryCatalog(settings.LIBRARY_DIR, settings.DATA_DIR / "library")
+    return _CATALOG
@@ -3,15 +3,19 @@ Excalidraw 箭头优化器
 基于 lib/optimizeArrows.js 的逻辑
 """
 import json
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
+from app.core.excalidraw.ports import assign_ports
+from app.core.excalidraw.serializer import dumps_elements
 
-def optimize_arrows(code: str) -> str:
+
+def optimize_arrows(code: str, reassign_ports: bool = True) -> str:
     """
     优化箭头连接点
     
     Args:
         code: Excalidraw 代码字符串
+        reassign_ports: 是否重新分配箭头端口（ExcalidrawBuilder 的输出已分配过，可跳过）
         
     Returns:
         优化后的代码字符串
@@ -20,41 +24,70 @@ def optimize_arrows(code: str) -> str:
         elements = json.loads(code)
         if not isinstance(elements, list):
             return code
-        
-        # 创建元素 ID 映射
-        element_map = {el["id"]: el for el in elements if "id" in el}
-        
-        # 优化每个箭头/线条，并验证所有元素
-        optimized_elements = []
-        for element in elements:
-            # 验证 text 元素
-            if element.get("type") == "text":
-                text_value = element.get("text")
-                if text_value is None or text_value == '':
-                    # 跳过无效的 text 元素
-                    continue
-                # 确保 text 是字符串
-                if not isinstance(text_value, str):
-                    element["text"] = str(text_value)
-            
-            if element.get("type") in ["arrow", "line"]:
-                optimized = _optimize_arrow(element, element_map)
-                optimized_elements.append(optimized)
-            else:
-                optimized_elements.append(element)
-        
-        return json.dumps(optimized_elements, ensure_ascii=False, indent=2)
+        return dumps_elements(optimize_arrow_elements(elements, reassign_ports))
     
     except Exception as e:
         # 如果优化失败，返回原始代码
         return code
 
 
-def _optimize_arrow(arrow: Dict[str, Any], element_map: Dict[str, Any]) -> Dict[str, Any]:
-    """优化单个箭头"""
-    optimized = arrow.copy()
+def optimize_arrow_elements(
+    elements: List[Dict[str, Any]],
+    reassign_ports: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    优化箭头连接点（直接处理元素列表，不经过 JSON）
+    
+    Args:
+        elements: Excalidraw 元素列表
+        reassign_ports: 是否重新分配箭头端口
+        
+    Returns:
+        优化后的元素列表（过滤掉无效的 text 元素）
+    """
+    # 创建元素 ID 映射
+    element_map = {el["id"]: el for el in elements if "id" in el}
+    
+    # 优化每个箭头/线条，并验证所有元素
+    optimized_elements = []
+    bound_arrows = []
+    for element in elements:
+        # 验证 text 元素
+        if element.get("type") == "text":
+            text_value = element.get("text")
+            if text_value is None or text_value == '':
+                # 跳过无效的 text 元素
+                continue
+            # 确保 text 是字符串
+            if not isinstance(text_value, str):
+                element["text"] = str(text_value)
+        
+        if element.get("type") in ["arrow", "line"]:
+            optimized = element.copy()
+            optimized_elements.append(optimized)
+            ends = _bound_elements(optimized, element_map)
+            if ends:
+                bound_arrows.append((optimized, ends))
+        else:
+            optimized_elements.append(element)
     
-    # 获取绑定的元素
+    # 所有绑定箭头一次性分配端口
+    if reassign_ports and bound_arrows:
+        _assign_arrow_ports(bound_arrows)
+    
+    # 修复宽度为 0 的问题
+    for element in optimized_elements:
+        if element.get("type") in ["arrow", "line"] and element.get("width") == 0:
+            element["width"] = 1
+    
+    return optimized_elements
+
+
+def _bound_elements(
+    arrow: Dict[str, Any],
+    element_map: Dict[str, Any]
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """箭头两端绑定的元素（任意一端未绑定时返回 None）"""
     start_ele = None
     end_ele = None
     
@@ -63,141 +96,45 @@ def _optimize_arrow(arrow: Dict[str, Any], element_map: Dict[str, Any]) -> Dict[
     if "end" in arrow and "id" in arrow["end"]:
         end_ele = element_map.get(arrow["end"]["id"])
     
-    # 如果两个元素都绑定，计算最佳连接点
     if start_ele and end_ele:
-        start_edge = _get_start_edge_center(start_ele, end_ele)
-        end_edge = _get_end_edge_center(end_ele, start_ele)
-        
-        optimized["x"] = start_edge[0]
-        optimized["y"] = start_edge[1]
-        optimized["width"] = end_edge[0] - start_edge[0]
-        optimized["height"] = end_edge[1] - start_edge[1]
-    
-    # 修复宽度为 0 的问题
-    if optimized.get("width") == 0:
-        optimized["width"] = 1
-    
-    return optimized
+        return start_ele, end_ele
+    return None
 
 
-def _get_start_edge_center(start_ele: Dict[str, Any], end_ele: Dict[str, Any]) -> Tuple[float, float]:
-    """计算起点边缘中心"""
-    start_x = start_ele.get("x", 0)
-    start_y = start_ele.get("y", 0)
-    start_w = start_ele.get("width", 100)
-    start_h = start_ele.get("height", 100)
-    
-    end_x = end_ele.get("x", 0)
-    end_y = end_ele.get("y", 0)
-    
-    dx = start_x - end_x
-    dy = start_y - end_y
-    abs_dx = abs(dx)
-    abs_dy = abs(dy)
-    
-    # 水平对齐
-    if dy == 0:
-        if dx < 0:
-            return (start_x + start_w, start_y + start_h / 2)
-        elif dx > 0:
-            return (start_x, start_y + start_h / 2)
-    
-    # 垂直对齐
-    if dx == 0:
-        if dy < 0:
-            return (start_x + start_w / 2, start_y + start_h)
-        elif dy > 0:
-            return (start_x + start_w / 2, start_y)
-    
-    # 左上
-    if dx < 0 and dy < 0:
-        if abs_dx > abs_dy:
-            return (start_x + start_w, start_y + start_h / 2)
-        else:
-            return (start_x + start_w / 2, start_y + start_h)
-    
-    # 右上
-    if dx > 0 and dy < 0:
-        if abs_dx > abs_dy:
-            return (start_x, start_y + start_h / 2)
-        else:
-            return (start_x + start_w / 2, start_y + start_h)
-    
-    # 左下
-    if dx < 0 and dy > 0:
-        if abs_dx > abs_dy:
-            return (start_x + start_w, start_y + start_h / 2)
-        else:
-            return (start_x + start_w / 2, start_y)
-    
-    # 右下
-    if dx > 0 and dy > 0:
-        if abs_dx > abs_dy:
-            return (start_x, start_y + start_h / 2)
-        else:
-            return (start_x + start_w / 2, start_y)
-    
-    # 默认：右边缘
-    return (start_x + start_w, start_y + start_h / 2)
-
+def _box(element: Dict[str, Any]) -> tuple:
+    return (
+        element.get("id"),
+        element.get("x", 0),
+        element.get("y", 0),
+        element.get("width", 100),
+        element.get("height", 100),
+    )
 
-def _get_end_edge_center(end_ele: Dict[str, Any], start_ele: Dict[str, Any]) -> Tuple[float, float]:
-    """计算终点边缘中心"""
-    end_x = end_ele.get("x", 0)
-    end_y = end_ele.get("y", 0)
-    end_w = end_ele.get("width", 100)
-    end_h = end_ele.get("height", 100)
-    
-    start_x = start_ele.get("x", 0)
-    start_y = start_ele.get("y", 0)
-    
-    dx = end_x - start_x
-    dy = end_y - start_y
-    abs_dx = abs(dx)
-    abs_dy = abs(dy)
-    
-    # 水平对齐
-    if dy == 0:
-        if dx < 0:
-            return (end_x + end_w, end_y + end_h / 2)
-        elif dx > 0:
-            return (end_x, end_y + end_h / 2)
-    
-    # 垂直对齐
-    if dx == 0:
-        if dy < 0:
-            return (end_x + end_w / 2, end_y + end_h)
-        elif dy > 0:
-            return (end_x + end_w / 2, end_y)
-    
-    # 左上
-    if dx < 0 and dy < 0:
-        if abs_dx > abs_dy:
-            return (end_x + end_w, end_y + end_h / 2)
-        else:
-            return (end_x + end_w / 2, end_y + end_h)
-    
-    # 右上
-    if dx > 0 and dy < 0:
-        if abs_dx > abs_dy:
-            return (end_x, end_y + end_h / 2)
-        else:
-            return (end_x + end_w / 2, end_y + end_h)
-    
-    # 左下
-    if dx < 0 and dy > 0:
-        if abs_dx > abs_dy:
-            return (end_x + end_w, end_y + end_h / 2)
-        else:
-            return (end_x + end_w / 2, end_y)
-    
-    # 右下
-    if dx > 0 and dy > 0:
-        if abs_dx > abs_dy:
-            return (end_x, end_y + end_h / 2)
-        else:
-            return (end_x + end_w / 2, end_y)
-    
-    # 默认：左边缘
-    return (end_x, end_y + end_h / 2)
 
+def _assign_arrow_ports(bound_arrows: List[Tuple[Dict[str, Any], Tuple[Dict[str, Any], Dict[str, Any]]]]) -> None:
+    """为绑定箭头分配端口；带途经点的箭头保持途经点的绝对位置不变"""
+    links = []
+    routes = []
+    for arrow, (start_ele, end_ele) in bound_arrows:
+        points = arrow.get("points") or []
+        # 途经点（绝对坐标）
+        route = [
+            (arrow.get("x", 0) + px, arrow.get("y", 0) + py) for px, py in points[1:-1]
+        ] if len(points) > 2 else []
+        routes.append(route)
+        links.append((
+            _box(start_ele),
+            _box(end_ele),
+            route[0] if route else None,
+            route[-1] if route else None,
+        ))
+    
+    for (arrow, _), route, ((start_x, start_y), (end_x, end_y)) in zip(bound_arrows, routes, assign_ports(links)):
+        arrow["x"] = start_x
+        arrow["y"] = start_y
+        arrow["width"] = end_x - start_x
+        arrow["height"] = end_y - start_y
+        if route:
+            arrow["points"] = [[0.0, 0.0]] + [
+                [px - start_x, py - start_y] for px, py in route
+            ] + [[end_x - start_x, end_y - start_y]]
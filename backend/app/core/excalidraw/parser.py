@@ -1,264 +1,357 @@
 """
 Excalidraw 代码解析器
+
+LLM 输出的元素数组经常夹带思考标签、markdown 代码块、未转义的引号或被截断。
+这里不再对全文反复执行正则替换，而是：
+1. strip_wrappers：单遍扫描去掉思考标签（<think>、<reasoning> 等）、HTML 注释与代码块标记
+2. repair_json：单遍状态机词法扫描，同时完成
+   - 转义字符串中多余的引号与控制字符
+   - 补全缺失的逗号 / 值，删除多余的逗号
+   - 数组中出现的裸键值对补上 {（如 `},"id":"x",...`）；对象中应为键的位置出现的容器整个丢弃
+   - 按括号栈闭合未闭合的字符串与容器（字符串内的括号不计入）
+   - 记录顶层数组中最后一个完整元素的位置，修复结果仍无法解析时回退到该前缀
+整个过程 O(n)。
 """
 import json
 import re
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
+from loguru import logger
 
-def parse_code(code: str) -> str:
+
+# 思考 / 推理类标签名中包含的关键字（<think>、<thinking>、<reasoning>、<redacted_reasoning> 等）
+THINK_WORDS = ("think", "reason", "thought", "analysis", "redacted")
+_MAX_TAG_LENGTH = 200
+_WRAPPER_START = re.compile(r"<|```")
+THINK_CLOSE = re.compile(r"</\s*[\w-]*(?:think|reason|thought|analysis|redacted)[\w-]*\s*>", re.IGNORECASE)
+# JSON 起点：优先取「[ 后跟 { 或 ]」「{ 后跟 " 或 }」，避免命中说明文字里的括号
+_JSON_START = re.compile(r"\[\s*[{\]]|\{\s*[\"}]")
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_BARE_KEY = re.compile(r"[A-Za-z_$][\w$-]*[ \t\r\n]*:")
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = ' \t\r\n,:{}[]"'
+_CLOSERS = {"{": "}", "[": "]"}
+_VALID_ESCAPES = '"\\/bfnrt'
+_UNICODE_ESCAPE = re.compile(r"u[0-9a-fA-F]{4}")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+
+VALID_ELEMENT_TYPES = {"rectangle", "ellipse", "diamond", "text", "line", "arrow"}
+
+
+def strip_wrappers(text: str) -> str:
     """
-    解析和清理 Excalidraw 代码
-    
-    Args:
-        code: 原始代码字符串
-        
-    Returns:
-        清理后的代码字符串
+    去掉思考标签及其内容、HTML 注释和 markdown 代码块标记（单遍扫描）
+
+    未闭合的思考标签只去掉标签本身（与截断的输出兼容）
     """
-    if not code or not isinstance(code, str):
-        return "[]"
-    
-    # 1. 移除 LLM 思考/推理标签及其内容
-    # 移除常见的思考标签: <thinking>, <reasoning>, <think> 等
-    code = re.sub(r'<thinking>[\s\S]*?</thinking>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<reasoning>[\s\S]*?</reasoning>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<redacted_reasoning[^>]*>[\s\S]*?</think>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<redacted_reasoning[^>]*/>', '', code, flags=re.IGNORECASE)  # 自闭合标签
-    code = re.sub(r'<thought>[\s\S]*?</thought>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<analysis>[\s\S]*?</analysis>', '', code, flags=re.IGNORECASE)
-    # 移除未闭合的 redacted_reasoning 标签（只有开始标签，没有闭合）
-    code = re.sub(r'<[^>]*redacted[^>]*>', '', code, flags=re.IGNORECASE)
-    # 移除任何包含 thinking/reasoning 的 XML/HTML 标签
-    code = re.sub(r'<[^>]*reasoning[^>]*>[\s\S]*?</[^>]*>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<[^>]*thinking[^>]*>[\s\S]*?</[^>]*>', '', code, flags=re.IGNORECASE)
-    # 移除自闭合的思考标签
-    code = re.sub(r'<[^>]*reasoning[^>]*/>', '', code, flags=re.IGNORECASE)
-    code = re.sub(r'<[^>]*thinking[^>]*/>', '', code, flags=re.IGNORECASE)
-    # 移除 HTML 注释
-    code = re.sub(r'<!--[\s\S]*?-->', '', code)
-    
-    # 1.5. 移除 JSON 开始前的任何标签或非 JSON 内容
-    json_start_match = re.search(r'[\[{]', code)
-    if json_start_match:
-        json_start_index = json_start_match.start()
-        # 如果 JSON 开始前有内容，检查是否包含标签
-        if json_start_index > 0:
-            before_json = code[:json_start_index]
-            # 如果包含 '<' 或 '>'，很可能是标签，移除它
-            if '<' in before_json or '>' in before_json:
-                code = code[json_start_index:]
-    
-    # 2. 移除 markdown 代码块包装
-    code = re.sub(r'^```(?:json|javascript|js)?\s*\n?', '', code, flags=re.MULTILINE)
-    code = re.sub(r'\n?```\s*$', '', code, flags=re.MULTILINE)
-    code = code.strip()
-    
-    # 3. 移除数组前的非 JSON 内容
-    # 找到第一个 '[' 或 '{' 的位置
-    first_bracket = code.find('[')
-    first_brace = code.find('{')
-    json_start = -1
-    
-    if first_bracket != -1 and first_brace != -1:
-        json_start = min(first_bracket, first_brace)
-    elif first_bracket != -1:
-        json_start = first_bracket
-    elif first_brace != -1:
-        json_start = first_brace
-    
-    if json_start > 0:
-        code = code[json_start:]
-    
-    # 4. 提取 JSON 数组
-    array_match = re.search(r'\[[\s\S]*\]', code)
-    if array_match:
-        code = array_match.group(0)
-    else:
-        # 如果找不到数组，尝试找 JSON 对象并包装成数组
-        object_match = re.search(r'\{[\s\S]*\}', code)
-        if object_match:
-            code = '[' + object_match.group(0) + ']'
-    
-    # 3. 修复常见的格式错误
-    # 移除对象后面的孤立字符串（如: },"string",）
-    code = re.sub(r'\},\s*"([^"]+)",\s*"id"', r'}, {"id"', code)
-    # 移除对象后面的孤立字符串（如: },"string"）
-    code = re.sub(r'\},\s*"([^"]+)"\s*\]', r'}]', code)
-    # 修复不完整的对象（如: "id":"value","type":"line" 缺少前面的 {）
-    code = re.sub(r',\s*"id"\s*:\s*"([^"]+)"\s*,\s*"type"\s*:\s*"line"', r', {"id": "\1", "type": "line"}', code)
-    
-    # 4. 修复未转义的引号
-    code = fix_unescaped_quotes(code)
-    
-    # 5. 尝试修复不完整的 JSON
-    code = fix_incomplete_json(code)
-    
-    # 6. 验证 JSON 并过滤无效元素类型
-    try:
-        parsed = json.loads(code)
-        # 确保返回的是数组
-        if isinstance(parsed, list):
-            # 过滤掉不支持的元素类型
-            # 有效类型: rectangle, ellipse, diamond, text, line, arrow
-            valid_types = {'rectangle', 'ellipse', 'diamond', 'text', 'line', 'arrow'}
-            filtered = []
-            for element in parsed:
-                if not isinstance(element, dict):
-                    continue
-                element_type = element.get('type')
-                if element_type and element_type in valid_types:
-                    # 特殊验证：text 元素必须有有效的 text 属性
-                    if element_type == 'text':
-                        text_value = element.get('text')
-                        if text_value is None or text_value == '':
-                            # 如果 text 为空或 None，跳过这个元素
-                            print(f"Warning: Skipping text element with missing or empty text property")
-                            continue
-                        # 确保 text 是字符串类型
-                        if not isinstance(text_value, str):
-                            element['text'] = str(text_value) if text_value is not None else ''
-                    filtered.append(element)
-                else:
-                    # 记录警告但不中断处理
-                    print(f"Warning: Skipping unsupported element type: {element_type}")
-            return json.dumps(filtered, ensure_ascii=False)
+    out: List[str] = []
+    lower = text.lower()
+    n = len(text)
+    has_close = True  # 后文是否还有思考标签的闭合标签（找不到一次后不再查找）
+    i = 0
+    while i < n:
+        match = _WRAPPER_START.search(text, i)
+        if match is None:
+            out.append(text[i:])
+            break
+        j = match.start()
+        out.append(text[i:j])
+
+        if text.startswith("```", j):
+            # 代码块标记连同语言名（```json）一起去掉
+            k = j + 3
+            while k < n and (text[k].isalnum() or text[k] in "_-"):
+                k += 1
+            i = k
+            continue
+        if text.startswith("<!--", j):
+            end = text.find("-->", j + 4)
+            i = n if end < 0 else end + 3
+            continue
+
+        end = text.find(">", j + 1, j + _MAX_TAG_LENGTH)
+        tag = lower[j + 1:end].strip() if end > 0 else ""
+        name = tag.lstrip("/").split(None, 1)[0].rstrip("/") if tag else ""
+        if not name or not any(word in name for word in THINK_WORDS):
+            out.append("<")
+            i = j + 1
+            continue
+        if tag.startswith("/") or tag.endswith("/") or not has_close:
+            i = end + 1
+            continue
+        close = THINK_CLOSE.search(text, end + 1)
+        if close is None:
+            has_close = False
+            i = end + 1
         else:
-            return "[]"
-    except json.JSONDecodeError as e:
-        # 如果仍然无效，尝试提取有效的部分
-        try:
-            # 找到最后一个完整的对象
-            last_complete_pos = find_last_complete_object(code)
-            if last_complete_pos > 0:
-                code = code[:last_complete_pos] + ']'
-                parsed = json.loads(code)
-                return json.dumps(parsed, ensure_ascii=False)
-        except:
-            pass
-        # 如果仍然无效，返回空数组
-        return "[]"
+            i = close.end()
+    return "".join(out)
+
+
+def find_json_start(text: str) -> int:
+    """JSON 值的起始位置，找不到时返回 -1"""
+    match = _JSON_START.search(text)
+    if match is not None:
+        return match.start()
+    positions = [p for p in (text.find("["), text.find("{")) if p >= 0]
+    return min(positions) if positions else -1
 
 
-def fix_unescaped_quotes(json_string: str) -> str:
+def _skip_whitespace(text: str, i: int) -> int:
+    n = len(text)
+    while i < n and text[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+def _next_is_key(text: str, i: int) -> bool:
+    """i 处（跳过空白后）是否为对象的下一个键（带引号或裸键）、对象结束或输入结束"""
+    i = _skip_whitespace(text, i)
+    return i >= len(text) or text[i] in '"}' or _BARE_KEY.match(text, i) is not None
+
+
+def repair_json(text: str, start: int = 0) -> Tuple[str, Optional[str]]:
     """
-    修复 JSON 字符串中未转义的引号
-    
-    Args:
-        json_string: JSON 字符串
-        
+    从 start 处开始单遍修复一个 JSON 值（数组或对象），其后的内容被忽略
+
     Returns:
-        修复后的字符串
+        (首选结果, 备选结果)：修复后的完整 JSON 文本，与截止到顶层数组中最后一个完整元素的前缀（已闭合）。
+        最后一个元素被截断时前缀为首选；没有完整元素时备选为 None
     """
-    result = ''
-    in_string = False
-    escape_next = False
-    
-    for i, char in enumerate(json_string):
-        if escape_next:
-            result += char
-            escape_next = False
+    out: List[str] = []
+    stack: List[str] = []
+    # 上一个输出的语法单元：open / comma / colon / key / value
+    last = "open"
+    # 要丢弃的容器：栈深度 -> (容器在 out 中的起点, 容器之前的 last)
+    drops: Dict[int, Tuple[int, str]] = {}
+    checkpoint = 0
+    n = len(text)
+    i = start
+
+    def begin_item() -> None:
+        # 值或键开始之前补上逗号（缺失的逗号、或延迟输出的逗号）；键后直接跟值时补上冒号
+        if last in ("value", "comma") and stack:
+            out.append(",")
+        elif last == "key":
+            out.append(":")
+
+    while i < n:
+        c = text[i]
+        if c in _WHITESPACE:
+            i += 1
             continue
-        
-        if char == '\\':
-            result += char
-            escape_next = True
+
+        if c == '"':
+            is_key = bool(stack) and stack[-1] == "{" and last in ("open", "comma", "value")
+            in_object_value = bool(stack) and stack[-1] == "{" and not is_key
+            begin_item()
+            quote_at = len(out)
+            out.append('"')
+            j = i + 1
+            closed = False
+            while True:
+                match = _STRING_SPECIAL.search(text, j)
+                if match is None:
+                    out.append(text[j:])
+                    j = n
+                    break
+                k = match.start()
+                out.append(text[j:k])
+                ch = text[k]
+                if ch == "\\":
+                    if k + 1 >= n:
+                        j = n
+                        break
+                    if text[k + 1] in _VALID_ESCAPES:
+                        out.append(text[k:k + 2])
+                        j = k + 2
+                    elif _UNICODE_ESCAPE.match(text, k + 1):
+                        out.append(text[k:k + 6])
+                        j = k + 6
+                    else:
+                        # 无效的转义：反斜杠本身转义，后一个字符照常处理（可能是控制字符）
+                        out.append("\\\\")
+                        j = k + 1
+                elif ch == '"':
+                    # 后面紧跟 : , } ] 或输入结束时才是结束引号，否则视为未转义的引号；
+                    # 对象中的值后跟逗号时，逗号后还须是下一个键（"say "yes", then" 中的逗号属于文本）
+                    after = _skip_whitespace(text, k + 1)
+                    if after >= n or text[after] in ":}]" or (
+                        text[after] == "," and (not in_object_value or _next_is_key(text, after + 1))
+                    ):
+                        out.append('"')
+                        j = k + 1
+                        closed = True
+                        break
+                    out.append('\\"')
+                    j = k + 1
+                else:
+                    out.append(_CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+                    j = k + 1
+            if not closed:
+                out.append('"')
+            i = j
+            if not stack:
+                last = "value"
+                break
+            if is_key:
+                last = "key"
+            elif stack[-1] == "[" and closed and text.startswith(":", _skip_whitespace(text, i)):
+                # 数组中出现 "key": ... ，说明对象缺少开头的 {
+                out[quote_at] = '{"'
+                stack.append("{")
+                last = "key"
+            else:
+                last = "value"
             continue
-        
-        if char == '"':
-            if not in_string:
-                # 开始字符串
-                in_string = True
-                result += char
+
+        if c in "{[":
+            if stack and stack[-1] == "{" and last in ("open", "comma", "value"):
+                # 对象中应为键的位置出现容器（如 `"text":"a", [1,2]`），闭合时整个丢弃
+                drops[len(stack) + 1] = (len(out), last)
             else:
-                # 可能是结束引号或未转义的引号
-                # 检查下一个非空白字符
-                next_chars = json_string[i+1:].lstrip()
-                if next_chars and next_chars[0] in [':', ',', '}', ']', '']:
-                    # 这是结束引号
-                    in_string = False
-                    result += char
-                else:
-                    # 这是未转义的引号，需要转义
-                    result += '\\"'
+                begin_item()
+            out.append(c)
+            stack.append(c)
+            last = "open"
+            i += 1
+            continue
+
+        if c in "}]":
+            i += 1
+            if not stack:
+                break
+            if c != _CLOSERS[stack[-1]] and ("{" if c == "}" else "[") not in stack:
+                continue  # 多余的闭合括号
+            while stack:
+                drop = drops.pop(len(stack), None)
+                opener = stack.pop()
+                if opener == "{" and last == "key":
+                    out.append(":null")
+                elif last == "colon":
+                    out.append("null")
+                out.append(_CLOSERS[opener])
+                last = "value"
+                if drop is not None:
+                    del out[drop[0]:]
+                    last = drop[1]
+                if _CLOSERS[opener] == c:
+                    break
+            if not stack:
+                break
+            if stack == ["["]:
+                checkpoint = len(out)
+            continue
+
+        if c == ",":
+            if last in ("value", "key"):
+                if last == "key":
+                    out.append(":null")
+                last = "comma"  # 延迟输出，后面紧跟闭合括号时丢弃
+            i += 1
+            continue
+
+        if c == ":":
+            if last == "key":
+                out.append(":")
+                last = "colon"
+            i += 1
+            continue
+
+        # 数字、true / false / null 或无法识别的裸词
+        j = i
+        while j < n and text[j] not in _DELIMITERS:
+            j += 1
+        token = text[i:j]
+        i = j
+        if not stack:
+            continue
+        if stack[-1] == "{" and last in ("open", "comma", "value"):
+            begin_item()
+            out.append(json.dumps(token, ensure_ascii=False))  # 裸键
+            last = "key"
+            continue
+        begin_item()
+        if token in ("true", "false", "null") or _NUMBER.fullmatch(token):
+            out.append(token)
         else:
-            result += char
-    
-    return result
+            out.append("null")
+        last = "value"
 
+    # 输入结束：补全悬空的键值，闭合所有容器
+    truncated = len(stack) > 1
+    if drops:
+        depth = min(drops)
+        mark, last = drops[depth]
+        del out[mark:]
+        del stack[depth - 1:]
+    if stack:
+        if last == "key" and stack[-1] == "{":
+            out.append(":null")
+        elif last == "colon":
+            out.append("null")
+        out.extend(_CLOSERS[opener] for opener in reversed(stack))
 
-def fix_incomplete_json(json_string: str) -> str:
-    """
-    修复不完整的 JSON（如缺少闭合括号等）
-    
-    Args:
-        json_string: JSON 字符串
-        
-    Returns:
-        修复后的字符串
-    """
-    # 统计括号和方括号
-    open_braces = json_string.count('{')
-    close_braces = json_string.count('}')
-    open_brackets = json_string.count('[')
-    close_brackets = json_string.count(']')
-    
-    # 添加缺失的闭合括号
-    result = json_string
-    if open_braces > close_braces:
-        result += '}' * (open_braces - close_braces)
-    if open_brackets > close_brackets:
-        result += ']' * (open_brackets - close_brackets)
-    
-    return result
-
-
-def find_last_complete_object(json_string: str) -> int:
+    repaired = "".join(out)
+    if not checkpoint:
+        return repaired, None
+    prefix = "".join(out[:checkpoint]) + "]"
+    # 顶层数组的最后一个元素被截断时，丢弃它比补出缺少字段的元素更安全
+    return (prefix, repaired) if truncated else (repaired, prefix)
+
+
+def _load_elements(text: str) -> Optional[list]:
+    start = find_json_start(text)
+    if start < 0:
+        return None
+    for candidate in repair_json(text, start):
+        if candidate is None:
+            continue
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            # 单个元素，或 {"elements": [...]} 形式的场景
+            parsed = parsed["elements"] if isinstance(parsed.get("elements"), list) else [parsed]
+        if isinstance(parsed, list):
+            return parsed
+    return None
+
+
+def parse_code(code: str) -> str:
     """
-    找到最后一个完整对象的位置
-    
+    解析和清理 Excalidraw 代码
+
     Args:
-        json_string: JSON 字符串
-        
+        code: 原始代码字符串
+
     Returns:
-        最后一个完整对象结束的位置，如果找不到返回 0
+        清理后的代码字符串（只包含受支持类型元素的 JSON 数组）
     """
-    depth = 0
-    in_string = False
-    escape_next = False
-    last_complete_pos = 0
-    
-    for i, char in enumerate(json_string):
-        if escape_next:
-            escape_next = False
-            continue
-        
-        if char == '\\':
-            escape_next = True
-            continue
-        
-        if char == '"':
-            in_string = not in_string
+    if not code or not isinstance(code, str):
+        return "[]"
+
+    elements = _load_elements(strip_wrappers(code))
+    if elements is None:
+        return "[]"
+
+    filtered = []
+    for element in elements:
+        if not isinstance(element, dict):
             continue
-        
-        if in_string:
+        element_type = element.get("type")
+        if not isinstance(element_type, str) or element_type not in VALID_ELEMENT_TYPES:
+            logger.warning(f"跳过不支持的元素类型: {element_type}")
             continue
-        
-        if char == '{':
-            depth += 1
-        elif char == '}':
-            depth -= 1
-            if depth == 0:
-                # 找到一个完整的对象
-                last_complete_pos = i + 1
-        elif char == '[':
-            depth += 1
-        elif char == ']':
-            depth -= 1
-            if depth == 0:
-                # 找到数组结束
-                last_complete_pos = i + 1
-                break
-    
-    return last_complete_pos
-
+        if element_type == "text":
+            # text 元素必须有有效的 text 属性
+            text_value = element.get("text")
+            if text_value is None or text_value == "":
+                logger.warning("跳过缺少 text 属性的 text 元素")
+                continue
+            if not isinstance(text_value, str):
+                element["text"] = str(text_value)
+        filtered.append(element)
+    return json.dumps(filtered, ensure_ascii=False)
@@ -0,0 +1,79 @@
+"""
+端口分配 - 把同一节点同一侧的多条连线分散到不同的连接点
+
+原先每条箭头都连到所在边的正中点，高出入度节点的箭头会叠在一起。这里一次性处理所有连线：
+1. 每个端点按「节点中心 -> 朝向点」的主方向选择上/下/左/右一侧（朝向点为对端节点中心或途经点）
+2. 按 (节点, 侧) 分组，组内按朝向点相对该侧法线的角度排序（避免相邻连线交叉）
+3. 在该侧上均匀分布连接点：k 条连线依次位于边长的 1/(k+1) ... k/(k+1) 处（k=1 时即中点）
+
+总复杂度 O(E log E)。ExcalidrawBuilder 与 optimize_arrows 共用这一步，不再各自计算端点。
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+
+Box = Tuple[Any, float, float, float, float]  # (节点键, x, y, 宽, 高)
+Point = Tuple[float, float]
+
+
+def _side(box: Box, toward: Point) -> str:
+    """朝向点所在的一侧（主方向），与原先中点连接的选边规则一致"""
+    _, x, y, w, h = box
+    dx = toward[0] - (x + w / 2)
+    dy = toward[1] - (y + h / 2)
+    if abs(dx) > abs(dy):
+        return "right" if dx > 0 else "left"
+    return "bottom" if dy > 0 else "top"
+
+
+def _angle(box: Box, side: str, toward: Point) -> float:
+    """朝向点相对该侧法线的角度，沿该侧从左到右（或从上到下）单调递增"""
+    _, x, y, w, h = box
+    dx = toward[0] - (x + w / 2)
+    dy = toward[1] - (y + h / 2)
+    if side in ("top", "bottom"):
+        return math.atan2(dx, abs(dy))
+    return math.atan2(dy, abs(dx))
+
+
+def _port(box: Box, side: str, fraction: float) -> Point:
+    _, x, y, w, h = box
+    if side == "top":
+        return (x + w * fraction, y)
+    if side == "bottom":
+        return (x + w * fraction, y + h)
+    if side == "left":
+        return (x, y + h * fraction)
+    return (x + w, y + h * fraction)
+
+
+def assign_ports(
+    links: List[Tuple[Box, Box, Optional[Point], Optional[Point]]]
+) -> List[Tuple[Point, Point]]:
+    """
+    为一组连线分配起止连接点
+
+    Args:
+        links: [(起点节点框, 终点节点框, 起点朝向, 终点朝向)]，
+               朝向为 None 时取对端节点中心（带途经点的连线传入第一个 / 最后一个途经点）
+
+    Returns:
+        与 links 一一对应的 [(起点, 终点)]
+    """
+    groups: Dict[Tuple[Any, str], List[Tuple[float, int, int]]] = {}
+    for i, (source, target, toward_source, toward_target) in enumerate(links):
+        toward_source = toward_source or (target[1] + target[3] / 2, target[2] + target[4] / 2)
+        toward_target = toward_target or (source[1] + source[3] / 2, source[2] + source[4] / 2)
+        source_side = _side(source, toward_source)
+        target_side = _side(target, toward_target)
+        groups.setdefault((source[0], source_side), []).append((_angle(source, source_side, toward_source), i, 0))
+        groups.setdefault((target[0], target_side), []).append((_angle(target, target_side, toward_target), i, 1))
+
+    result: List[List[Point]] = [[(0.0, 0.0), (0.0, 0.0)] for _ in links]
+    for (_, side), members in groups.items():
+        members.sort()
+        count = len(members)
+        for rank, (_, i, end) in enumerate(members):
+            box = links[i][end]
+            result[i][end] = _port(box, side, (rank + 1) / (count + 1))
+    return [(start, end) for start, end in result]
@@ -0,0 +1,214 @@
+"""
+原生场景输出 - 把 skeleton 元素转换为完整的 .excalidraw 场景
+
+ExcalidrawBuilder 输出的是 ExcalidrawElementSkeleton（label 对象、start/end 绑定），
+浏览器需要先调用 convertToExcalidrawElements 测量文本、生成绑定文本，大图时很慢。
+这里在服务端完成同样的解析：
+- 形状 / 箭头的 label -> 独立的 text 元素（containerId 指向容器，容器 boundElements 反向引用）
+- 箭头 start/end -> startBinding / endBinding，被连接的形状记录 boundElements
+- 补全 seed / versionNonce（由元素 ID 确定）、points 等必需字段
+- 外层包装为 {type: "excalidraw", version: 2, elements, appState, files}
+
+客户端收到后可直接加载，不再经过转换。
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.layout.text_metrics import LINE_HEIGHT, measure_text
+from app.core.layout.theme import Theme, ThemeType
+
+
+SCENE_SOURCE = "smart-excalidraw"
+FONT_FAMILY = 1  # Virgil（手写体）
+LABEL_PADDING = 5  # 顶部对齐的容器文本与边框的间距
+BINDING_GAP = 1.0
+UPDATED = 1  # 固定的 updated 时间戳：同一结构多次生成得到相同的场景（便于补丁与缓存）
+
+_BASE = {
+    "angle": 0,
+    "strokeColor": "#1e1e1e",
+    "backgroundColor": "transparent",
+    "fillStyle": "solid",
+    "strokeWidth": 2,
+    "strokeStyle": "solid",
+    "roughness": 1,
+    "opacity": 100,
+    "groupIds": [],
+    "frameId": None,
+    "roundness": None,
+    "version": 1,
+    "isDeleted": False,
+    "boundElements": None,
+    "updated": UPDATED,
+    "link": None,
+    "locked": False,
+}
+_SKELETON_ONLY = ("label", "start", "end")
+
+
+def _random(element_id: str, salt: str) -> int:
+    """由元素 ID 派生的 31 位随机数（seed / versionNonce）"""
+    digest = hashlib.blake2b(f"{element_id}:{salt}".encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFF
+
+
+def _complete(element: Dict[str, Any]) -> Dict[str, Any]:
+    """补全所有元素共有的字段"""
+    resolved = {**_BASE, **{k: v for k, v in element.items() if k not in _SKELETON_ONLY}}
+    resolved["groupIds"] = list(resolved["groupIds"])
+    resolved["seed"] = _random(resolved["id"], "seed")
+    resolved["versionNonce"] = _random(resolved["id"], "nonce")
+    return resolved
+
+
+def _text(
+    element_id: str,
+    text: str,
+    x: float,
+    y: float,
+    style: Dict[str, Any],
+    container_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """创建 text 元素（宽高按文本度量估算）"""
+    font_size = style.get("fontSize", 20)
+    width, height = measure_text(text, font_size)
+    return _complete({
+        "id": element_id,
+        "type": "text",
+        "x": float(x),
+        "y": float(y),
+        "width": width,
+        "height": height,
+        "strokeColor": style.get("strokeColor", "#1e1e1e"),
+        "text": text,
+        "originalText": text,
+        "fontSize": font_size,
+        "fontFamily": FONT_FAMILY,
+        "textAlign": style.get("textAlign", "left"),
+        "verticalAlign": style.get("verticalAlign", "top"),
+        "containerId": container_id,
+        "lineHeight": LINE_HEIGHT,
+        "autoResize": True,
+    })
+
+
+def _bind(element: Dict[str, Any], bound_id: str, bound_type: str) -> None:
+    element["boundElements"] = (element.get("boundElements") or []) + [{"id": bound_id, "type": bound_type}]
+
+
+def _path_midpoint(points: List[List[float]]) -> Tuple[float, float]:
+    """折线的中点（相对坐标）：奇数个点取中间点，偶数个点取中间一段的中点"""
+    middle = len(points) // 2
+    if len(points) % 2:
+        return points[middle][0], points[middle][1]
+    (x1, y1), (x2, y2) = points[middle - 1], points[middle]
+    return (x1 + x2) / 2, (y1 + y2) / 2
+
+
+def _linear(element: Dict[str, Any]) -> Dict[str, Any]:
+    """箭头 / 线条：补全 points，宽高取 points 的包围盒"""
+    points = element.get("points") or [[0.0, 0.0], [element.get("width", 0), element.get("height", 0)]]
+    points = [[float(px), float(py)] for px, py in points]
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    resolved = _complete({
+        **element,
+        "points": points,
+        "width": max(xs) - min(xs),
+        "height": max(ys) - min(ys),
+    })
+    resolved.setdefault("lastCommittedPoint", None)
+    resolved.setdefault("startBinding", None)
+    resolved.setdefault("endBinding", None)
+    resolved.setdefault("startArrowhead", None)
+    resolved.setdefault("endArrowhead", "arrow" if element.get("type") == "arrow" else None)
+    return resolved
+
+
+def to_scene_elements(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把 skeleton 元素列表解析为完整的 Excalidraw 元素（绑定文本紧跟在容器之后）
+
+    Args:
+        elements: ExcalidrawBuilder / optimize_arrow_elements 输出的元素列表
+
+    Returns:
+        完整的 Excalidraw 元素列表
+    """
+    resolved: List[Dict[str, Any]] = []
+    by_id: Dict[str, Dict[str, Any]] = {}
+    pending_arrows: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+
+    for element in elements:
+        kind = element.get("type")
+        if kind in ("arrow", "line"):
+            item = _linear(element)
+            pending_arrows.append((item, element))
+        elif kind == "text":
+            style = {k: element[k] for k in ("fontSize", "strokeColor", "textAlign", "verticalAlign") if k in element}
+            item = _text(element["id"], str(element.get("text", "")), element.get("x", 0), element.get("y", 0), style)
+        else:
+            item = _complete(element)
+        resolved.append(item)
+        by_id[item["id"]] = item
+
+        # 形状的 label -> 绑定文本（在容器内水平居中，按 verticalAlign 垂直对齐）
+        label = element.get("label")
+        if kind not in ("arrow", "line") and label and label.get("text"):
+            text_id = f"{item['id']}-label"
+            text = _text(text_id, str(label["text"]), 0, 0, {"textAlign": "center", **label}, item["id"])
+            text["x"] = item["x"] + (item.get("width", 0) - text["width"]) / 2
+            if text["verticalAlign"] == "top":
+                text["y"] = item["y"] + LABEL_PADDING
+            elif text["verticalAlign"] == "bottom":
+                text["y"] = item["y"] + item.get("height", 0) - text["height"] - LABEL_PADDING
+            else:
+                text["y"] = item["y"] + (item.get("height", 0) - text["height"]) / 2
+            _bind(item, text_id, "text")
+            resolved.append(text)
+            by_id[text_id] = text
+
+    # 箭头绑定与箭头标签（需要所有形状都已解析）
+    for item, element in pending_arrows:
+        for end, key in (("start", "startBinding"), ("end", "endBinding")):
+            target = by_id.get((element.get(end) or {}).get("id"))
+            if target is not None:
+                item[key] = {"elementId": target["id"], "focus": 0, "gap": BINDING_GAP}
+                _bind(target, item["id"], "arrow")
+        label = element.get("label")
+        if label and label.get("text"):
+            text_id = f"{item['id']}-label"
+            text = _text(text_id, str(label["text"]), 0, 0, {"textAlign": "center", "verticalAlign": "middle", **label}, item["id"])
+            mx, my = _path_midpoint(item["points"])
+            text["x"] = item["x"] + mx - text["width"] / 2
+            text["y"] = item["y"] + my - text["height"] / 2
+            _bind(item, text_id, "text")
+            resolved.append(text)
+    return resolved
+
+
+def to_scene(
+    elements: List[Dict[str, Any]],
+    theme_type: ThemeType = ThemeType.DEFAULT
+) -> Dict[str, Any]:
+    """
+    生成完整的 .excalidraw 场景
+
+    Args:
+        elements: skeleton 元素列表
+        theme_type: 主题（决定画布背景色）
+
+    Returns:
+        {type, version, source, elements, appState, files}
+    """
+    return {
+        "type": "excalidraw",
+        "version": 2,
+        "source": SCENE_SOURCE,
+        "elements": to_scene_elements(elements),
+        "appState": {
+            "viewBackgroundColor": Theme.get_background_color(theme_type),
+            "gridSize": None,
+        },
+        "files": {},
+    }
@@ -0,0 +1,204 @@
+"""
+场景流式读取 - 从超大的 current_code 中只取需要的元素字段
+
+从 Excalidraw 导出的场景常带有 files（base64 图片，动辄几十 MB），
+json.loads 会把整个场景（包括所有图片数据）都构造成 Python 对象。
+这里手写一个只前进的扫描器：
+- 只进入元素数组（顶层数组，或场景对象的 "elements"），其余顶层字段（files、appState 等）直接跳过
+- 元素逐个产出；指定 fields 时只解码这些字段，其他字段（freedraw 的 points 等）跳过
+- 跳过的值不构造对象：字符串用 str.find 找结束引号，容器只检查括号配对，标量按字面量检查，
+  跳过部分括号不配对或字面量非法的文档仍会被拒绝
+- max_elements 限制产出的元素数，超大输入的内存占用有上限（达到上限后不再检查其余内容）
+- 元素数组之后的场景字段同样跳过并检查，之后只允许空白
+
+输入不合法时抛出 ValueError，调用方回退到容错解析（parser.parse_code）。
+"""
+import json
+import re
+from typing import AbstractSet, Any, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+
+
+# 结构提取用到的元素字段
+STRUCTURE_FIELDS = frozenset({
+    "id", "type", "text", "label", "containerId", "boundElements", "groupIds", "isDeleted",
+    "start", "end", "startBinding", "endBinding", "x", "y", "width", "height",
+})
+MAX_SCENE_ELEMENTS = 50000
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\r\n]*")
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r"[,\]}\s]")
+_SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _ws(s: str, i: int) -> int:
+    return _WS.match(s, i).end()
+
+
+def _skip_string(s: str, i: int) -> int:
+    """s[i] 为开头的引号，返回结束引号之后的位置"""
+    j = i + 1
+    while True:
+        j = s.find('"', j)
+        if j < 0:
+            raise ValueError("未闭合的字符串")
+        k = j - 1
+        while s[k] == "\\":
+            k -= 1
+        if (j - 1 - k) % 2 == 0:  # 前面的反斜杠为偶数个：不是转义的引号
+            return j + 1
+        j += 1
+
+
+def _skip_value(s: str, i: int) -> int:
+    """跳过 s[i] 开始的一个值（不构造对象），返回其后的位置；括号不配对或字面量非法时抛出 ValueError"""
+    c = s[i]
+    if c == '"':
+        return _skip_string(s, i)
+    if c in "{[":
+        expected = []  # 待匹配的闭合括号
+        while True:
+            match = _STRUCTURAL.search(s, i)
+            if match is None:
+                raise ValueError("未闭合的容器")
+            i = match.start()
+            ch = s[i]
+            if ch == '"':
+                i = _skip_string(s, i)
+                continue
+            if ch in "{[":
+                expected.append(_CLOSERS[ch])
+            elif ch != expected.pop():
+                raise ValueError(f"位置 {i} 处的括号不配对")
+            elif not expected:
+                return i + 1
+            i += 1
+    match = _SCALAR_END.search(s, i)
+    end = match.start() if match else len(s)
+    if _SCALAR.fullmatch(s, i, end) is None:
+        raise ValueError(f"位置 {i} 处不是合法的值")
+    return end
+
+
+def _read_object(s: str, i: int, fields: Optional[AbstractSet[str]]) -> Tuple[Dict[str, Any], int]:
+    """读取 s[i] 开始的对象；fields 不为空时只解码其中的字段"""
+    if fields is None:
+        return _DECODER.raw_decode(s, i)
+    obj: Dict[str, Any] = {}
+    i = _ws(s, i + 1)
+    if s[i] == "}":
+        return obj, i + 1
+    while True:
+        if s[i] != '"':
+            raise ValueError(f"位置 {i} 处应为字段名")
+        key, i = _DECODER.raw_decode(s, i)
+        i = _ws(s, i)
+        if s[i] != ":":
+            raise ValueError(f"位置 {i} 处应为冒号")
+        i = _ws(s, i + 1)
+        if key in fields:
+            obj[key], i = _DECODER.raw_decode(s, i)
+        else:
+            i = _skip_value(s, i)
+        i = _ws(s, i)
+        if s[i] == ",":
+            i = _ws(s, i + 1)
+        elif s[i] == "}":
+            return obj, i + 1
+        else:
+            raise ValueError(f"位置 {i} 处应为逗号或右花括号")
+
+
+def _find_elements(s: str, i: int) -> int:
+    """场景对象中 "elements" 数组的起始位置（跳过其他所有字段）"""
+    i = _ws(s, i + 1)
+    while s[i] != "}":
+        if s[i] != '"':
+            raise ValueError(f"位置 {i} 处应为字段名")
+        key, i = _DECODER.raw_decode(s, i)
+        i = _ws(s, i)
+        if s[i] != ":":
+            raise ValueError(f"位置 {i} 处应为冒号")
+        i = _ws(s, i + 1)
+        if key == "elements" and s[i] == "[":
+            return i
+        i = _ws(s, _skip_value(s, i))
+        if s[i] == ",":
+            i = _ws(s, i + 1)
+        elif s[i] != "}":
+            raise ValueError(f"位置 {i} 处应为逗号或右花括号")
+    raise ValueError("场景中没有 elements 数组")
+
+
+def _check_rest(s: str, i: int, scene: bool) -> None:
+    """元素数组之后的内容：场景对象的其余字段（跳过，只检查语法），然后只允许空白"""
+    i = _ws(s, i)
+    if scene:
+        while s[i] == ",":
+            i = _ws(s, i + 1)
+            if s[i] != '"':
+                raise ValueError(f"位置 {i} 处应为字段名")
+            i = _ws(s, _skip_string(s, i))
+            if s[i] != ":":
+                raise ValueError(f"位置 {i} 处应为冒号")
+            i = _ws(s, _skip_value(s, _ws(s, i + 1)))
+        if s[i] != "}":
+            raise ValueError(f"位置 {i} 处应为逗号或右花括号")
+        i = _ws(s, i + 1)
+    if i < len(s):
+        raise ValueError(f"位置 {i} 处有多余的内容")
+
+
+def iter_scene_elements(
+    code: str,
+    fields: Optional[AbstractSet[str]] = None,
+    max_elements: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    逐个产出元素数组或 .excalidraw 场景中的元素
+
+    Args:
+        code: 元素数组或场景的 JSON 文本
+        fields: 只保留的元素字段；为空时保留完整元素
+        max_elements: 最多产出的元素数
+
+    Raises:
+        ValueError: 不是合法的元素数组 / 场景
+    """
+    try:
+        i = _ws(code, 1 if code.startswith("\ufeff") else 0)
+        scene = code[i] == "{"
+        if scene:
+            i = _find_elements(code, i)
+        elif code[i] != "[":
+            raise ValueError("不是元素数组或场景")
+
+        count = 0
+        i = _ws(code, i + 1)
+        if code[i] == "]":
+            _check_rest(code, i + 1, scene)
+            return
+        while True:
+            if code[i] == "{":
+                element, i = _read_object(code, i, fields)
+                yield element
+                count += 1
+                if max_elements is not None and count >= max_elements:
+                    logger.warning(f"场景元素超过 {max_elements} 个，其余元素被忽略")
+                    return
+            else:
+                i = _skip_value(code, i)  # 非对象的数组项
+            i = _ws(code, i)
+            if code[i] == ",":
+                i = _ws(code, i + 1)
+            elif code[i] == "]":
+                _check_rest(code, i + 1, scene)
+                return
+            else:
+                raise ValueError(f"位置 {i} 处应为逗号或右方括号")
+    except IndexError:
+        raise ValueError("输入在元素数组结束前截断")
@@ -0,0 +1,34 @@
+"""
+Excalidraw 元素序列化
+
+生成流水线（构建 -> 箭头优化 -> 验证）内部传递元素列表，只在响应边界序列化一次。
+输出紧凑 JSON（无缩进），优先使用 orjson。
+"""
+import json
+from typing import Any, Dict, List
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _dumps(data: Any) -> str:
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型（如 numpy 标量的某些子类），回退到标准库
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=float)
+
+
+def dumps_elements(elements: List[Dict[str, Any]]) -> str:
+    """把元素列表序列化为紧凑的 JSON 字符串"""
+    return _dumps(elements)
+
+
+def dumps_scene(scene: Dict[str, Any]) -> str:
+    """把完整的 .excalidraw 场景序列化为紧凑的 JSON 字符串"""
+    return _dumps(scene)
@@ -1,163 +1,212 @@
 """
 从 Excalidraw 代码中提取逻辑结构（节点和边）
 用于修改模式下的增量更新
+
+同时支持两种输入：
+- ExcalidrawBuilder 输出的元素骨架：形状的 label 对象、箭头的 start / end
+- 浏览器导出的完整场景（元素数组或 .excalidraw 场景）：文本是独立的 text 元素，
+  通过 containerId / boundElements 绑定到容器，箭头通过 startBinding / endBinding 连接
+
+先按 ID 建立索引，绑定关系一次遍历即可解析，整体 O(N)。
+节点保留坐标与尺寸（x, y, width, height），可用于重新布局时的热启动。
+多轮对话每轮都会重新提交同一个 current_code，结果按代码哈希缓存。
+场景按 scene_stream 流式读取，只解码结构用到的字段，files 中的图片数据不会被解析。
 """
-import json
-from typing import Dict, Any, List, Optional
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
 from loguru import logger
 
+from app.core.excalidraw.diff import load_scene
+from app.core.excalidraw.scene_stream import MAX_SCENE_ELEMENTS, STRUCTURE_FIELDS
+
+
+NODE_TYPES = ("rectangle", "ellipse", "diamond", "text")
+EDGE_TYPES = ("arrow", "line")
+STRUCTURE_CACHE_CAPACITY = 64
+ICON_GROUP_SUFFIX = "-icon"  # ExcalidrawBuilder 绘制的图标内部元素所在的组
+_HASH_SLICE = 1 << 20
+_MISSING = object()
+
+
+def _label_text(value: Any) -> str:
+    """skeleton 的 label：对象或字符串"""
+    if isinstance(value, dict):
+        value = value.get("text", "")
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _endpoint(element: Dict[str, Any], end: str) -> Optional[str]:
+    """箭头端点绑定的元素 ID：skeleton 的 start / end，或场景的 startBinding / endBinding"""
+    ref = element.get(end)
+    if isinstance(ref, dict) and ref.get("id"):
+        return ref["id"]
+    binding = element.get(f"{end}Binding")
+    if isinstance(binding, dict) and binding.get("elementId"):
+        return binding["elementId"]
+    return None
+
+
+def _in_icon(element: Dict[str, Any]) -> bool:
+    return any(str(group).endswith(ICON_GROUP_SUFFIX) for group in element.get("groupIds") or ())
+
+
+def elements_to_structure(elements: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    从元素列表提取结构
+
+    Returns:
+        {nodes: [...], edges: [...]}；没有带文本的节点时返回 None
+    """
+    live = [el for el in elements if el.get("id") and not el.get("isDeleted") and not _in_icon(el)]
+    by_id = {el["id"]: el for el in live}
+
+    # 1. 绑定文本：容器 ID -> 文本（containerId 与容器 boundElements 两个方向都接受）
+    bound_text: Dict[str, str] = {}
+    text_owner: Dict[str, str] = {}  # 绑定文本 ID -> 容器 ID
+    for el in live:
+        if el.get("type") == "text" and el.get("containerId") in by_id:
+            bound_text.setdefault(el["containerId"], str(el.get("text", "")).strip())
+            text_owner[el["id"]] = el["containerId"]
+        for bound in el.get("boundElements") or ():
+            text = by_id.get(bound.get("id")) if isinstance(bound, dict) and bound.get("type") == "text" else None
+            if text is not None and text["id"] not in text_owner:
+                bound_text.setdefault(el["id"], str(text.get("text", "")).strip())
+                text_owner[text["id"]] = el["id"]
+
+    # 2. 节点：带文本的形状，以及不属于任何容器的独立文本
+    nodes: List[Dict[str, Any]] = []
+    node_ids = set()
+    for el in live:
+        el_type = el.get("type")
+        if el_type not in NODE_TYPES or el["id"] in text_owner:
+            continue
+        if el_type == "text":
+            label = str(el.get("text", "")).strip()
+        else:
+            label = _label_text(el.get("label")) or bound_text.get(el["id"], "")
+        if not label:
+            continue
+        node = {"id": el["id"], "label": label, "shape": el_type}
+        for key in ("x", "y", "width", "height"):
+            if isinstance(el.get(key), (int, float)):
+                node[key] = el[key]
+        nodes.append(node)
+        node_ids.add(el["id"])
+
+    # 3. 边：两端都连接到节点的箭头 / 线条（端点是绑定文本时归到其容器）
+    edges: List[Dict[str, Any]] = []
+    for el in live:
+        if el.get("type") not in EDGE_TYPES:
+            continue
+        start, end = _endpoint(el, "start"), _endpoint(el, "end")
+        start, end = text_owner.get(start, start), text_owner.get(end, end)
+        if start not in node_ids or end not in node_ids:
+            continue
+        edge = {"from": start, "to": end}
+        label = _label_text(el.get("label")) or bound_text.get(el["id"], "")
+        if label:
+            edge["label"] = label
+        edges.append(edge)
+
+    if not nodes:
+        return None
+    return {"nodes": nodes, "edges": edges}
+
+
+class StructureCache:
+    """代码哈希 -> 提取结果（进程内 LRU，也缓存无法提取的结果 None）"""
+
+    def __init__(self, capacity: int = STRUCTURE_CACHE_CAPACITY):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """命中时返回结果（可能为 None），未命中时返回 _MISSING"""
+        if key not in self._items:
+            return _MISSING
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key: str, structure: Optional[Dict[str, Any]]) -> None:
+        self._items[key] = structure
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+
+STRUCTURE_CACHE = StructureCache()
+
+
+def code_hash(code: str) -> str:
+    # 分段编码，超大场景不会整体复制一份 UTF-8 字节串
+    digest = hashlib.blake2b(digest_size=16)
+    for i in range(0, len(code), _HASH_SLICE):
+        digest.update(code[i:i + _HASH_SLICE].encode("utf-8"))
+    return digest.hexdigest()
+
 
 def extract_structure_from_code(excalidraw_code: str) -> Optional[Dict[str, Any]]:
     """
-    从 Excalidraw JSON 代码中提取逻辑结构
-    
+    从 Excalidraw JSON 代码中提取逻辑结构（带缓存，返回值在多次调用间共享，不要修改）
+
     Args:
-        excalidraw_code: Excalidraw JSON 代码字符串
-        
+        excalidraw_code: Excalidraw JSON 代码字符串（元素数组或完整场景）
+
     Returns:
         结构字典 {nodes: [...], edges: [...]} 或 None
     """
+    if not excalidraw_code or not excalidraw_code.strip():
+        return None
+    key = code_hash(excalidraw_code)
+    cached = STRUCTURE_CACHE.get(key)
+    if cached is not _MISSING:
+        return cached
+
+    structure = None
     try:
-        elements = json.loads(excalidraw_code)
-        if not isinstance(elements, list):
-            return None
-            
-        nodes = []
-        edges = []
-        node_id_map = {}  # excalidraw_id -> logical_id
-        
-        # 1. 提取节点（非箭头/线条的元素）
-        for element in elements:
-            el_type = element.get("type", "")
-            
-            if el_type in ["rectangle", "ellipse", "diamond", "text"]:
-                # 这是一个节点
-                excalidraw_id = element.get("id")
-                if not excalidraw_id:
-                    continue
-                    
-                # 提取标签文本
-                label = ""
-                if el_type == "text":
-                    label = element.get("text", "")
-                else:
-                    # 从 label 对象中提取
-                    label_obj = element.get("label")
-                    if isinstance(label_obj, dict):
-                        label = label_obj.get("text", "")
-                    elif isinstance(label_obj, str):
-                        label = label_obj
-                
-                if not label or not label.strip():
-                    continue
-                
-                # 生成逻辑 ID（基于标签）
-                logical_id = _generate_logical_id(label, len(nodes))
-                
-                node = {
-                    "id": logical_id,
-                    "label": label.strip(),
-                    "shape": el_type
-                }
-                
-                nodes.append(node)
-                node_id_map[excalidraw_id] = logical_id
-                
-        # 2. 提取边（箭头/线条）
-        for element in elements:
-            el_type = element.get("type", "")
-            
-            if el_type in ["arrow", "line"]:
-                start_ref = element.get("start", {})
-                end_ref = element.get("end", {})
-                
-                start_id = start_ref.get("id") if isinstance(start_ref, dict) else None
-                end_id = end_ref.get("id") if isinstance(end_ref, dict) else None
-                
-                if start_id in node_id_map and end_id in node_id_map:
-                    from_id = node_id_map[start_id]
-                    to_id = node_id_map[end_id]
-                    
-                    # 提取边标签
-                    edge_label = ""
-                    label_obj = element.get("label")
-                    if isinstance(label_obj, dict):
-                        edge_label = label_obj.get("text", "")
-                    elif isinstance(label_obj, str):
-                        edge_label = label_obj
-                    
-                    edge = {
-                        "from": from_id,
-                        "to": to_id
-                    }
-                    
-                    if edge_label and edge_label.strip():
-                        edge["label"] = edge_label.strip()
-                    
-                    edges.append(edge)
-        
-        if not nodes:
-            return None
-            
-        return {
-            "nodes": nodes,
-            "edges": edges
-        }
-        
+        elements = load_scene(excalidraw_code, STRUCTURE_FIELDS, MAX_SCENE_ELEMENTS)
+        if elements is not None:
+            structure = elements_to_structure(elements)
     except Exception as e:
         logger.warning(f"Failed to extract structure from code: {e}")
-        return None
-
-
-def _generate_logical_id(label: str, index: int) -> str:
-    """生成逻辑 ID"""
-    # 简化标签作为 ID（移除特殊字符，保留中文和英文）
-    import re
-    clean_label = re.sub(r'[^\w\u4e00-\u9fa5]', '_', label)
-    clean_label = clean_label.strip('_')
-    
-    if not clean_label:
-        return f"node_{index}"
-    
-    # 限制长度
-    if len(clean_label) > 30:
-        clean_label = clean_label[:30]
-    
-    return clean_label.lower()
+    STRUCTURE_CACHE.put(key, structure)
+    return structure
 
 
 def summarize_structure(structure: Dict[str, Any]) -> str:
     """
     将结构总结为文本描述，用于传递给 LLM
-    
+
     Args:
         structure: 结构字典
-        
+
     Returns:
         文本描述
     """
     if not structure:
         return "无现有结构"
-    
+
     nodes = structure.get("nodes", [])
     edges = structure.get("edges", [])
-    
+    labels = {node["id"]: node.get("label", "") for node in nodes}
+
     lines = [f"现有图表包含 {len(nodes)} 个节点和 {len(edges)} 条边："]
     lines.append("\n节点列表：")
     for i, node in enumerate(nodes, 1):
         shape = node.get("shape", "rectangle")
         label = node.get("label", "")
         lines.append(f"  {i}. [{shape}] {label}")
-    
+
     if edges:
         lines.append("\n连接关系：")
         for edge in edges[:10]:  # 最多显示10条边
-            from_label = next((n["label"] for n in nodes if n["id"] == edge.get("from")), edge.get("from"))
-            to_label = next((n["label"] for n in nodes if n["id"] == edge.get("to")), edge.get("to"))
+            from_label = labels.get(edge.get("from"), edge.get("from"))
+            to_label = labels.get(edge.get("to"), edge.get("to"))
             lines.append(f"  - {from_label} -> {to_label}")
-        
+
         if len(edges) > 10:
             lines.append(f"  ... 还有 {len(edges) - 10} 条边")
-    
-    return "\n".join(lines)
 
+    return "\n".join(lines)
@@ -0,0 +1,288 @@
+"""
+SVG 渲染 - 不依赖浏览器的图表预览
+
+渲染 ExcalidrawBuilder / optimize_arrow_elements 输出的元素列表（也兼容 scene 模式的完整元素）：
+- rectangle（圆角）/ ellipse / diamond，hachure 填充近似为半透明实心填充
+- arrow / line：按 points 绘制折线，箭头端绘制三角形箭头
+- 文本：独立 text 元素与形状 / 箭头的 label，按 text_metrics 的度量分行定位
+
+iter_svg 逐个元素产出 SVG 片段（先单独一遍计算包围盒），write_svg 直接写入文件对象，
+大图不会拼出巨大的中间字符串。render_svg 按场景哈希缓存结果，列表页 / 对话历史的缩略图只渲染一次。
+"""
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from app.core.excalidraw.serializer import dumps_elements
+from app.core.layout.text_metrics import LINE_HEIGHT, measure_text
+
+
+PADDING = 20
+FONT_FAMILY = "Virgil, 'Segoe UI Emoji', sans-serif"
+ARROWHEAD_SIZE = 12
+HACHURE_OPACITY = 0.35
+SVG_CACHE_CAPACITY = 256
+SVG_CACHE_MAX_BYTES = 512 * 1024  # 超过该大小的 SVG 不缓存
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _points(element: Dict[str, Any]) -> List[Tuple[float, float]]:
+    points = element.get("points") or [[0, 0], [element.get("width", 0), element.get("height", 0)]]
+    x, y = element.get("x", 0), element.get("y", 0)
+    return [(x + px, y + py) for px, py in points]
+
+
+def _bounds(elements: List[Dict[str, Any]]) -> Tuple[float, float, float, float]:
+    """所有元素的包围盒 (min_x, min_y, max_x, max_y)"""
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for element in elements:
+        if element.get("type") in ("arrow", "line"):
+            for px, py in _points(element):
+                min_x, min_y = min(min_x, px), min(min_y, py)
+                max_x, max_y = max(max_x, px), max(max_y, py)
+            continue
+        x, y = element.get("x", 0), element.get("y", 0)
+        width, height = element.get("width"), element.get("height")
+        if width is None or height is None:
+            width, height = measure_text(str(element.get("text", "")), element.get("fontSize", 20))
+        min_x, min_y = min(min_x, x, x + width), min(min_y, y, y + height)
+        max_x, max_y = max(max_x, x, x + width), max(max_y, y, y + height)
+    if min_x == math.inf:
+        return 0.0, 0.0, 0.0, 0.0
+    return min_x, min_y, max_x, max_y
+
+
+def _style(element: Dict[str, Any], fill: bool = True) -> str:
+    stroke = element.get("strokeColor", "#1e1e1e")
+    attrs = [
+        f'stroke={quoteattr(stroke)}',
+        f'stroke-width="{_num(element.get("strokeWidth", 2))}"',
+    ]
+    background = element.get("backgroundColor", "transparent")
+    if fill and background not in (None, "transparent"):
+        attrs.append(f'fill={quoteattr(background)}')
+        if element.get("fillStyle", "hachure") == "hachure":
+            attrs.append(f'fill-opacity="{HACHURE_OPACITY}"')
+    else:
+        attrs.append('fill="none"')
+    if element.get("strokeStyle") == "dashed":
+        attrs.append('stroke-dasharray="8 6"')
+    elif element.get("strokeStyle") == "dotted":
+        attrs.append('stroke-dasharray="2 6"')
+    opacity = element.get("opacity", 100)
+    if opacity != 100:
+        attrs.append(f'opacity="{_num(opacity / 100)}"')
+    return " ".join(attrs)
+
+
+def _text(
+    text: str,
+    x: float,
+    y: float,
+    font_size: float,
+    color: str,
+    align: str = "left"
+) -> str:
+    """多行文本：(x, y) 为文本块左上角，按对齐方式确定锚点"""
+    lines = text.split("\n")
+    width, _ = measure_text(text, font_size)
+    anchor = {"center": "middle", "right": "end"}.get(align, "start")
+    anchor_x = x + {"middle": width / 2, "end": width}.get(anchor, 0)
+    step = font_size * LINE_HEIGHT
+    spans = "".join(
+        f'<tspan x="{_num(anchor_x)}" y="{_num(y + step * i + font_size)}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return (
+        f'<text font-family={quoteattr(FONT_FAMILY)} font-size="{_num(font_size)}" '
+        f'fill={quoteattr(color)} text-anchor="{anchor}">{spans}</text>'
+    )
+
+
+def _arrowhead(tip: Tuple[float, float], tail: Tuple[float, float], color: str) -> str:
+    angle = math.atan2(tip[1] - tail[1], tip[0] - tail[0])
+    left = (tip[0] - ARROWHEAD_SIZE * math.cos(angle - math.pi / 7), tip[1] - ARROWHEAD_SIZE * math.sin(angle - math.pi / 7))
+    right = (tip[0] - ARROWHEAD_SIZE * math.cos(angle + math.pi / 7), tip[1] - ARROWHEAD_SIZE * math.sin(angle + math.pi / 7))
+    return (
+        f'<polygon points="{_num(tip[0])},{_num(tip[1])} {_num(left[0])},{_num(left[1])} '
+        f'{_num(right[0])},{_num(right[1])}" fill={quoteattr(color)}/>'
+    )
+
+
+def _label(element: Dict[str, Any], box: Tuple[float, float, float, float]) -> str:
+    """形状 / 箭头的 label：在 box 内水平居中，按 verticalAlign 垂直对齐"""
+    label = element.get("label") or {}
+    text = str(label.get("text", ""))
+    if not text:
+        return ""
+    font_size = label.get("fontSize", 16)
+    width, height = measure_text(text, font_size)
+    x, y, box_w, box_h = box
+    align = label.get("verticalAlign")
+    if align == "top":
+        top = y + 5
+    elif align == "bottom":
+        top = y + box_h - height - 5
+    else:
+        top = y + (box_h - height) / 2
+    return _text(text, x + (box_w - width) / 2, top, font_size, label.get("strokeColor", "#1e1e1e"), "center")
+
+
+def _render_element(element: Dict[str, Any]) -> str:
+    kind = element.get("type")
+    x, y = element.get("x", 0), element.get("y", 0)
+    width, height = element.get("width", 0), element.get("height", 0)
+
+    if kind == "rectangle":
+        radius = min(width, height) * 0.1 if element.get("roundness") else 0
+        shape = (
+            f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(width)}" height="{_num(height)}" '
+            f'rx="{_num(radius)}" {_style(element)}/>'
+        )
+        return shape + _label(element, (x, y, width, height))
+    if kind == "ellipse":
+        shape = (
+            f'<ellipse cx="{_num(x + width / 2)}" cy="{_num(y + height / 2)}" '
+            f'rx="{_num(width / 2)}" ry="{_num(height / 2)}" {_style(element)}/>'
+        )
+        return shape + _label(element, (x, y, width, height))
+    if kind == "diamond":
+        corners = [(x + width / 2, y), (x + width, y + height / 2), (x + width / 2, y + height), (x, y + height / 2)]
+        shape = f'<polygon points="{" ".join(f"{_num(px)},{_num(py)}" for px, py in corners)}" {_style(element)}/>'
+        return shape + _label(element, (x, y, width, height))
+    if kind in ("arrow", "line"):
+        points = _points(element)
+        parts = [f'<polyline points="{" ".join(f"{_num(px)},{_num(py)}" for px, py in points)}" {_style(element, fill=False)}/>']
+        color = element.get("strokeColor", "#1e1e1e")
+        if kind == "arrow" and len(points) >= 2:
+            if element.get("endArrowhead", "arrow"):
+                parts.append(_arrowhead(points[-1], points[-2], color))
+            if element.get("startArrowhead"):
+                parts.append(_arrowhead(points[0], points[1], color))
+        if element.get("label"):
+            # 箭头标签放在折线中点
+            middle = len(points) // 2
+            if len(points) % 2:
+                mx, my = points[middle]
+            else:
+                mx = (points[middle - 1][0] + points[middle][0]) / 2
+                my = (points[middle - 1][1] + points[middle][1]) / 2
+            parts.append(_label(element, (mx, my, 0, 0)))
+        return "".join(parts)
+    if kind == "text":
+        return _text(
+            str(element.get("text", "")),
+            x, y,
+            element.get("fontSize", 20),
+            element.get("strokeColor", "#1e1e1e"),
+            element.get("textAlign", "left"),
+        )
+    return ""
+
+
+def iter_svg(
+    elements: List[Dict[str, Any]],
+    background: str = "#FFFFFF",
+    width: Optional[int] = None
+) -> Iterator[str]:
+    """
+    逐段产出 SVG
+
+    Args:
+        elements: Excalidraw 元素列表
+        background: 背景色
+        width: 输出宽度（像素，缩略图用）；为空时按原始尺寸
+    """
+    elements = [el for el in elements if isinstance(el, dict) and not el.get("isDeleted")]
+    min_x, min_y, max_x, max_y = _bounds(elements)
+    view_w = max_x - min_x + 2 * PADDING
+    view_h = max_y - min_y + 2 * PADDING
+    out_w = width or view_w
+    out_h = view_h * out_w / view_w if view_w else view_h
+
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(out_w)}" height="{_num(out_h)}" '
+        f'viewBox="{_num(min_x - PADDING)} {_num(min_y - PADDING)} {_num(view_w)} {_num(view_h)}">'
+    )
+    yield (
+        f'<rect x="{_num(min_x - PADDING)}" y="{_num(min_y - PADDING)}" '
+        f'width="{_num(view_w)}" height="{_num(view_h)}" fill={quoteattr(background)}/>'
+    )
+    for element in elements:
+        fragment = _render_element(element)
+        if fragment:
+            yield fragment
+    yield "</svg>"
+
+
+def write_svg(elements: List[Dict[str, Any]], fp: TextIO, **options: Any) -> None:
+    """把 SVG 逐段写入文件对象"""
+    for chunk in iter_svg(elements, **options):
+        fp.write(chunk)
+
+
+class SvgCache:
+    """场景哈希 -> SVG（进程内 LRU，只缓存不超过 SVG_CACHE_MAX_BYTES 的结果）"""
+
+    def __init__(self, capacity: int = SVG_CACHE_CAPACITY):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        svg = self._items.get(key)
+        if svg is not None:
+            self._items.move_to_end(key)
+        return svg
+
+    def put(self, key: str, svg: str) -> None:
+        if len(svg) > SVG_CACHE_MAX_BYTES:
+            return
+        self._items[key] = svg
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+
+SVG_CACHE = SvgCache()
+
+
+def scene_hash(elements: List[Dict[str, Any]], **options: Any) -> str:
+    """场景哈希（元素内容 + 渲染选项）"""
+    digest = hashlib.blake2b(dumps_elements(elements).encode("utf-8"), digest_size=16)
+    digest.update(repr(sorted(options.items())).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def iter_svg_cached(elements: List[Dict[str, Any]], **options: Any) -> Iterator[str]:
+    """
+    带缓存的流式渲染：命中时直接产出缓存结果；
+    未命中时边产出边收集，总大小不超过 SVG_CACHE_MAX_BYTES 时写入缓存
+    """
+    key = scene_hash(elements, **options)
+    cached = SVG_CACHE.get(key)
+    if cached is not None:
+        yield cached
+        return
+    chunks: Optional[List[str]] = []
+    size = 0
+    for chunk in iter_svg(elements, **options):
+        if chunks is not None:
+            size += len(chunk)
+            if size > SVG_CACHE_MAX_BYTES:
+                chunks = None  # 太大，不再收集
+            else:
+                chunks.append(chunk)
+        yield chunk
+    if chunks is not None:
+        SVG_CACHE.put(key, "".join(chunks))
+
+
+def render_svg(elements: List[Dict[str, Any]], **options: Any) -> str:
+    """渲染为完整的 SVG 字符串（带缓存）"""
+    return "".join(iter_svg_cached(elements, **options))
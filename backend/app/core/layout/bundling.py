@@ -0,0 +1,127 @@
+"""
+连线合并与边捆绑 - 面向连线密集的数据流图、网络图
+
+1. 重边合并：(from, to) 与样式（标签以外的其他字段）都相同的边合并为一条，标签合并；
+   互为反向、都没有标签且样式相同的边合并为一条双向箭头。带标签或样式不同的反向边保持独立，不丢信息
+2. 走廊捆绑：节点按 group 分簇（分层捆绑）；没有 group 的节点按布局坐标落入网格单元，
+   同一单元视为一簇（走廊捆绑）。同一对簇之间的边（不少于 BUNDLE_MIN 条）共用一段「主干」：
+   主干两端取两个簇质心连线上 1/3、2/3 处，每条边经过这两个途经点，从而在走廊中汇成一束
+
+输出的边可能带 waypoints（绝对坐标的途经点）与 bidirectional 标记，由 ExcalidrawBuilder 绘制。
+"""
+from typing import Any, Dict, List, Tuple
+
+
+BUNDLE_MIN = 3  # 同一对簇之间至少有这么多条边才捆绑
+SPINE_RANGE = (1 / 3, 2 / 3)  # 主干在两个簇质心连线上的起止比例
+CORRIDOR_CELL = 2.5  # 走廊捆绑的网格单元边长（节点宽高中位数的倍数）
+_ENDPOINT_FIELDS = ("from", "to", "label")
+
+
+def _style(edge: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """边的样式签名：端点与标签以外的所有字段"""
+    return tuple(sorted((k, repr(v)) for k, v in edge.items() if k not in _ENDPOINT_FIELDS))
+
+
+def merge_parallel_edges(edges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """合并重边，并把无标签、同样式的反向边折叠为双向箭头（保持首次出现的顺序）"""
+    merged: Dict[Tuple[Any, Any, tuple], Dict[str, Any]] = {}
+    labels: Dict[Tuple[Any, Any, tuple], List[str]] = {}
+    for edge in edges:
+        key = (edge.get("from"), edge.get("to"), _style(edge))
+        if key not in merged:
+            merged[key] = {**edge, "count": 0}
+            labels[key] = []
+        merged[key]["count"] += 1
+        label = edge.get("label")
+        if label and label not in labels[key]:
+            labels[key].append(label)
+
+    result = []
+    folded = set()
+    for key, edge in merged.items():
+        if key in folded:
+            continue
+        u, v, style = key
+        reverse = (v, u, style)
+        if labels[key]:
+            edge["label"] = " / ".join(labels[key])
+        elif u != v and reverse in merged and reverse not in folded and not labels[reverse]:
+            edge["bidirectional"] = True
+            edge["count"] += merged[reverse]["count"]
+            folded.add(reverse)
+        result.append(edge)
+    return result
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def bundle_edges(
+    layout_nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    重边合并 + 按簇（group 或网格走廊）捆绑
+
+    Args:
+        layout_nodes: 带坐标的节点列表
+        edges: 边列表
+
+    Returns:
+        (处理后的边, 统计 {edges_before, edges_after, bundles, bundled_edges, elements_saved})
+    """
+    merged = merge_parallel_edges(edges)
+    nodes = {node.get("id"): node for node in layout_nodes}
+
+    # 节点所属的簇：有 group 时按 group，否则按中心点所在的网格单元
+    cell = CORRIDOR_CELL * _median([
+        max(node.get("width", 200), node.get("height", 80)) for node in layout_nodes
+    ]) or 1.0
+    clusters: Dict[Any, Tuple] = {}
+    sums: Dict[Tuple, List[float]] = {}
+    for node in layout_nodes:
+        cx = node.get("x", 0) + node.get("width", 200) / 2
+        cy = node.get("y", 0) + node.get("height", 80) / 2
+        group = node.get("group")
+        cluster = ("group", group) if group is not None else ("cell", int(cx // cell), int(cy // cell))
+        clusters[node.get("id")] = cluster
+        acc = sums.setdefault(cluster, [0.0, 0.0, 0])
+        acc[0] += cx
+        acc[1] += cy
+        acc[2] += 1
+    centroids = {cluster: (sx / count, sy / count) for cluster, (sx, sy, count) in sums.items()}
+
+    # 按无序簇对分桶
+    buckets: Dict[Tuple[Any, Any], List[int]] = {}
+    for i, edge in enumerate(merged):
+        c1, c2 = clusters.get(edge.get("from")), clusters.get(edge.get("to"))
+        if c1 is None or c2 is None or c1 == c2:
+            continue
+        buckets.setdefault(tuple(sorted((c1, c2), key=repr)), []).append(i)
+
+    result = list(merged)
+    bundles = bundled = 0
+    for (c1, c2), members in buckets.items():
+        if len(members) < BUNDLE_MIN:
+            continue
+        (x1, y1), (x2, y2) = centroids[c1], centroids[c2]
+        spine = [(x1 + (x2 - x1) * t, y1 + (y2 - y1) * t) for t in SPINE_RANGE]
+        for i in members:
+            edge = result[i]
+            forward = clusters[edge["from"]] == c1
+            result[i] = {**edge, "waypoints": spine if forward else spine[::-1]}
+        bundles += 1
+        bundled += len(members)
+
+    stats = {
+        "edges_before": len(edges),
+        "edges_after": len(result),
+        "bundles": bundles,
+        "bundled_edges": bundled,
+        # 每条边对应一个箭头元素
+        "elements_saved": len(edges) - len(result),
+    }
+    return result, stats
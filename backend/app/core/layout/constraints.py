@@ -0,0 +1,247 @@
+"""
+布局约束求解 - 固定节点、对齐与顺序约束
+
+在主布局算法之后，把节点中心坐标投影到约束上：
+    最小化 Σ (x_i - x̂_i)²，满足
+    - pin:   x_i = p                        （固定节点，硬约束）
+    - align: x_i = x_j                      （同一组节点中心对齐）
+    - order: x_j - x_i >= (w_i + w_j) / 2 + gap （按给定顺序排列，互不重叠）
+
+x、y 两个轴相互独立。每个轴上的变量按约束连成若干连通块，
+每块用 Gauss-Seidel 式的逐约束投影求解（对齐组整体移到均值/固定值，
+违反的顺序约束把两端各推开一半，固定节点不动），只涉及块内变量。
+
+约束或固定点变化时，`ConstraintSolver` 只重新求解受影响的连通块，
+交互式微调不需要重跑整个布局。每次生成的布局与求解器存入进程级 LAYOUT_SESSIONS，
+约束微调接口按布局 ID 取回，继续增量求解。
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+AXES = ("x", "y")
+MAX_SWEEPS = 100  # 每个连通块的投影轮数上限
+EPSILON = 1e-3
+LAYOUT_SESSION_CAPACITY = 128
+
+
+class ConstraintSolver:
+    """
+    稀疏约束求解器（可增量更新）
+
+    约束格式：
+    - {"type": "align", "axis": "x" | "y", "nodes": [id, ...]}
+      axis="x" 表示 x 坐标相同（竖直对齐成一列），axis="y" 表示水平对齐成一行
+    - {"type": "order", "axis": "x" | "y", "nodes": [id, ...], "gap": 40}
+      按列表顺序从左到右（或从上到下）排列，如「数据库在最右侧」= 其他节点在前、数据库在最后
+    固定节点：{id: {"x": ..., "y": ...}}（左上角坐标，可只固定一个轴）
+    """
+
+    def __init__(
+        self,
+        nodes: List[Dict[str, Any]],
+        constraints: Optional[List[Dict[str, Any]]] = None,
+        pinned: Optional[Dict[Any, Dict[str, float]]] = None
+    ):
+        # 主布局给出的「期望位置」（中心坐标），约束只在其基础上做最小调整
+        self.sizes = {n.get("id"): (n.get("width", 200), n.get("height", 80)) for n in nodes}
+        self.desired = {
+            n.get("id"): {
+                "x": n.get("x", 0) + n.get("width", 200) / 2,
+                "y": n.get("y", 0) + n.get("height", 80) / 2,
+            }
+            for n in nodes
+        }
+        self.positions = {node_id: dict(pos) for node_id, pos in self.desired.items()}
+        self.constraints: List[Dict[str, Any]] = []
+        self.pinned: Dict[Any, Dict[str, float]] = {}
+        self._dirty: Set[Tuple[str, Any]] = set()
+
+        for constraint in constraints or []:
+            self.add_constraint(constraint)
+        for node_id, pos in (pinned or {}).items():
+            self.pin(node_id, pos)
+
+    # ---- 约束编辑（只记录受影响的变量） ----
+
+    def add_constraint(self, constraint: Dict[str, Any]) -> None:
+        """添加一条约束（引用了未知节点或轴非法的约束会被忽略）"""
+        axis = constraint.get("axis", "x")
+        members = [n for n in constraint.get("nodes", []) if n in self.desired]
+        if constraint.get("type") not in ("align", "order") or axis not in AXES or len(members) < 2:
+            logger.warning(f"忽略无效的布局约束: {constraint}")
+            return
+        constraint = {**constraint, "axis": axis, "nodes": members}
+        self.constraints.append(constraint)
+        self._dirty.update((axis, n) for n in members)
+
+    def remove_constraint(self, constraint: Dict[str, Any]) -> None:
+        """移除一条约束；被释放的变量回到各自的期望位置后重新求解所在块"""
+        for i, existing in enumerate(self.constraints):
+            if existing.get("type") == constraint.get("type") and existing["axis"] == constraint.get("axis", "x") \
+                    and existing["nodes"] == [n for n in constraint.get("nodes", []) if n in self.desired]:
+                del self.constraints[i]
+                axis = existing["axis"]
+                for n in existing["nodes"]:
+                    self.positions[n][axis] = self.desired[n][axis]
+                    self._dirty.add((axis, n))
+                return
+
+    def pin(self, node_id: Any, pos: Optional[Dict[str, float]]) -> None:
+        """固定节点（左上角坐标），pos 为 None 时取消固定"""
+        if node_id not in self.desired:
+            return
+        width, height = self.sizes[node_id]
+        old = self.pinned.pop(node_id, {})
+        new = {}
+        for axis, half in (("x", width / 2), ("y", height / 2)):
+            if pos and pos.get(axis) is not None:
+                new[axis] = float(pos[axis]) + half
+        if new:
+            self.pinned[node_id] = new
+        for axis in set(old) | set(new):
+            if axis not in new:
+                self.positions[node_id][axis] = self.desired[node_id][axis]
+            self._dirty.add((axis, node_id))
+
+    # ---- 求解 ----
+
+    def _blocks(self, axis: str) -> Tuple[Dict[Any, List[Dict[str, Any]]], Callable[[Any], Any]]:
+        """按约束把一个轴上的变量分成连通块，返回 (块代表 -> 块内约束, 查找块代表的函数)"""
+        parent: Dict[Any, Any] = {}
+
+        def find(v: Any) -> Any:
+            parent.setdefault(v, v)
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        for constraint in self.constraints:
+            if constraint["axis"] != axis:
+                continue
+            first = constraint["nodes"][0]
+            for other in constraint["nodes"][1:]:
+                parent[find(other)] = find(first)
+
+        blocks: Dict[Any, List[Dict[str, Any]]] = {}
+        for constraint in self.constraints:
+            if constraint["axis"] == axis:
+                blocks.setdefault(find(constraint["nodes"][0]), []).append(constraint)
+        return blocks, find
+
+    def _solve_block(self, axis: str, members: Iterable[Any], constraints: List[Dict[str, Any]]) -> None:
+        """对一个连通块做逐约束投影"""
+        pos = self.positions
+        for n in members:
+            pos[n][axis] = self.pinned.get(n, {}).get(axis, self.desired[n][axis])
+        dim = 0 if axis == "x" else 1  # sizes 中对应的宽/高
+
+        for _ in range(MAX_SWEEPS):
+            moved = 0.0
+            for constraint in constraints:
+                group = constraint["nodes"]
+                if constraint["type"] == "align":
+                    fixed = [self.pinned[n][axis] for n in group if axis in self.pinned.get(n, {})]
+                    target = fixed[0] if fixed else sum(pos[n][axis] for n in group) / len(group)
+                    for n in group:
+                        if axis not in self.pinned.get(n, {}):
+                            moved = max(moved, abs(pos[n][axis] - target))
+                            pos[n][axis] = target
+                else:
+                    gap = constraint.get("gap", 40)
+                    for a, b in zip(group, group[1:]):
+                        extent = (self.sizes[a][dim] + self.sizes[b][dim]) / 2 + gap
+                        violation = pos[a][axis] + extent - pos[b][axis]
+                        if violation <= EPSILON:
+                            continue
+                        a_fixed = axis in self.pinned.get(a, {})
+                        b_fixed = axis in self.pinned.get(b, {})
+                        if a_fixed and b_fixed:
+                            continue
+                        share_a = 0.0 if a_fixed else (1.0 if b_fixed else 0.5)
+                        pos[a][axis] -= violation * share_a
+                        pos[b][axis] += violation * (1.0 - share_a)
+                        moved = max(moved, violation)
+            if moved <= EPSILON:
+                return
+        logger.warning(f"布局约束在 {MAX_SWEEPS} 轮内未完全满足（{axis} 轴），可能存在冲突的约束")
+
+    def solve(self) -> Set[Any]:
+        """
+        重新求解受影响的变量
+
+        Returns:
+            坐标可能发生变化的节点 ID 集合
+        """
+        changed: Set[Any] = set()
+        for axis in AXES:
+            dirty = {n for a, n in self._dirty if a == axis}
+            if not dirty:
+                continue
+            blocks, find = self._blocks(axis)
+            touched = {find(n) for n in dirty}
+            for root, constraints in blocks.items():
+                if root not in touched:
+                    continue
+                members = {n for c in constraints for n in c["nodes"]}
+                self._solve_block(axis, members, constraints)
+                changed |= members
+            # 不在任何约束中的变量：只受固定点影响
+            for n in dirty:
+                if find(n) not in blocks:
+                    self.positions[n][axis] = self.pinned.get(n, {}).get(axis, self.desired[n][axis])
+                    changed.add(n)
+        self._dirty.clear()
+        return changed
+
+    def constrained_ids(self) -> Set[Any]:
+        """参与约束或被固定的节点"""
+        return set(self.pinned) | {n for c in self.constraints for n in c["nodes"]}
+
+    def apply(self, nodes: List[Dict[str, Any]], only: Optional[Set[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        把求解结果写回节点（左上角坐标）；only 不为空时只更新其中的节点
+
+        参与约束的节点标记 constrained=True，后处理不再移动整张图（固定坐标是绝对坐标）。
+        """
+        constrained = self.constrained_ids()
+        result = []
+        for node in nodes:
+            node_id = node.get("id")
+            if node_id in self.positions and (only is None or node_id in only):
+                width, height = self.sizes[node_id]
+                node = {
+                    **node,
+                    "x": float(self.positions[node_id]["x"] - width / 2),
+                    "y": float(self.positions[node_id]["y"] - height / 2),
+                    "constrained": node_id in constrained,
+                }
+            result.append(node)
+        return result
+
+
+class LayoutSessionStore:
+    """布局 ID -> 布局会话（LayoutEngine 及其约束求解器、结构、节点坐标；进程内 LRU）"""
+
+    def __init__(self, capacity: int = LAYOUT_SESSION_CAPACITY):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(self, layout_id: str, session: Dict[str, Any]) -> None:
+        self._items[layout_id] = session
+        self._items.move_to_end(layout_id)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def get(self, layout_id: str) -> Optional[Dict[str, Any]]:
+        session = self._items.get(layout_id)
+        if session is not None:
+            self._items.move_to_end(layout_id)
+        return session
+
+
+# 进程级布局会话（约束微调接口按布局 ID 读取）
+LAYOUT_SESSIONS = LayoutSessionStore()
@@ -2,7 +2,11 @@
 布局引擎 - 使用 graphviz/networkx 自动计算节点坐标
 """
 import json
-from typing import Dict, Any, List, Tuple, Optional, TYPE_CHECKING
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional, Union, TYPE_CHECKING
 from loguru import logger
 
 if TYPE_CHECKING:
@@ -23,6 +27,22 @@ except ImportError:
     HAS_PYGRAPHVIZ = False
     # pygraphviz 是可选依赖，不需要警告
 
+from app.core.layout.multilevel import HAS_NUMPY, multilevel_layout
+from app.core.layout.stress import stress_layout
+from app.core.layout.venn import venn_layout
+from app.core.layout.fishbone import fishbone_layout
+from app.core.layout.record import fold_attributes, record_sections
+from app.core.layout.text_metrics import text_units
+from app.core.layout.constraints import ConstraintSolver
+from app.core.layout.templates import TEMPLATE_MAX_NODES, TEMPLATE_STORE, structure_key
+from app.core.layout.selector import (
+    GraphStats,
+    compute_graph_stats,
+    get_layout_spec,
+    record_selection,
+    select_layout,
+)
+
 
 class LayoutEngine:
     """布局引擎"""
@@ -30,6 +50,9 @@ class LayoutEngine:
     def __init__(self):
         self.node_spacing = 200  # 节点间距（像素）
         self.level_spacing = 300  # 层级间距（像素）
+        self.last_metrics: Dict[str, Any] = {}  # 最近一次布局的算法选择与耗时
+        self.constraint_solver: Optional[ConstraintSolver] = None  # 最近一次布局的约束求解器（供增量调整）
+        self.use_templates = True  # 是否按结构哈希复用布局模板
 
     def _estimate_node_size(self, node: Dict[str, Any]) -> Tuple[float, float]:
         """估算节点尺寸"""
@@ -42,16 +65,7 @@ class LayoutEngine:
         if len(lines) == 1:
             lines = label.split('\n')
             
-        max_line_len = 0
-        for line in lines:
-            line_len = 0
-            for char in line:
-                # 简单判断是否为宽字符（如汉字）
-                if '\u4e00' <= char <= '\u9fff': 
-                    line_len += 2 
-                else:
-                    line_len += 1.1 
-            max_line_len = max(max_line_len, line_len)
+        max_line_len = max(self._text_units(line) for line in lines)
         
         # 基础字体大小 (假设 16px)
         font_size = 16
@@ -69,17 +83,51 @@ class LayoutEngine:
 
         return estimated_width, estimated_height
     
+    def _text_units(self, line: str) -> float:
+        """文本行的宽度单位（半角字符计 1.1，宽字符如汉字计 2）"""
+        return text_units(line)
+
+    def _estimate_record_size(
+        self,
+        header: List[str],
+        sections: List[List[str]]
+    ) -> Tuple[float, float, Dict[str, Any]]:
+        """
+        估算记录节点（表头 + 分栏）的尺寸
+
+        Returns:
+            (宽, 高, 分栏绘制信息 {header, sections, header_height, section_heights, line_height})
+        """
+        font_size = 16
+        line_height = font_size * 1.5
+        padding = 12
+        lines = header + [line for section in sections for line in section]
+        width = max(160, max(self._text_units(line) for line in lines) * font_size * 0.5 + 40)
+        header_height = len(header) * line_height + 2 * padding
+        section_heights = [max(len(section), 1) * line_height + padding for section in sections]
+        record = {
+            "header": header,
+            "sections": sections,
+            "header_height": header_height,
+            "section_heights": section_heights,
+            "line_height": line_height,
+        }
+        return width, header_height + sum(section_heights), record
+
     def layout(
         self, 
         structure: Dict[str, Any],
-        chart_type: str = "flowchart"
+        chart_type: str = "flowchart",
+        algorithm: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         对结构进行布局，返回带坐标的节点列表
         
         Args:
-            structure: 图表结构 {type, nodes, edges}
+            structure: 图表结构 {type, nodes, edges}，可选 constraints（对齐/顺序约束）
+                与 pinned（{节点 ID: {x, y}}），节点上也可以直接给出 pinned
             chart_type: 图表类型
+            algorithm: 指定布局算法（布局注册表中的名称），为空时自动选择
             
         Returns:
             带坐标的节点列表
@@ -89,33 +137,191 @@ class LayoutEngine:
         
         if not nodes:
             return []
-            
+        
+        # 根据图统计特征 + 图表类型选择布局算法
+        start = time.perf_counter()
+        stats = compute_graph_stats(nodes, edges)
+        algorithm, reason = self._choose_algorithm(structure, chart_type, algorithm, stats)
+        record_selection(algorithm, reason, stats)
+        return self._layout_selected(structure, chart_type, algorithm, reason, stats, start)
+
+    def _layout_selected(
+        self,
+        structure: Dict[str, Any],
+        chart_type: str,
+        algorithm: str,
+        reason: str,
+        stats: GraphStats,
+        start: float
+    ) -> List[Dict[str, Any]]:
+        """用已选定的算法布局（layout() 与批量布局的工作进程共用，不重复计算图统计）"""
+        nodes = structure.get("nodes", [])
+        edges = structure.get("edges", [])
+        if not nodes:
+            return []
+
         # 预计算节点尺寸
         for node in nodes:
             if "width" not in node or "height" not in node:
                 w, h = self._estimate_node_size(node)
                 node["width"] = w
                 node["height"] = h
-        
-        # 根据图表类型选择布局算法
-        if chart_type in ["flowchart", "tree", "orgchart"]:
-            return self._hierarchical_layout(nodes, edges)
-        elif chart_type == "mindmap":
-            return self._radial_layout(nodes, edges)
-        elif chart_type in ["network", "architecture", "dataflow"]:
-            return self._force_directed_layout(nodes, edges)
-        elif chart_type == "venn":
-            return self._venn_layout(nodes, edges)
-        else:
-            # 默认使用分层布局
-            return self._hierarchical_layout(nodes, edges)
+
+        pinned = dict(structure.get("pinned") or {})
+        for node in nodes:
+            if isinstance(node.get("pinned"), dict):
+                pinned.setdefault(node.get("id"), node["pinned"])
+        constraints = structure.get("constraints") or []
+
+        # 同构结构（只是标签不同）直接复用布局模板，按实际节点尺寸缩放
+        spec = get_layout_spec(algorithm)
+        skey = None
+        result = None
+        if spec.templatable and self.use_templates and len(nodes) <= TEMPLATE_MAX_NODES:
+            skey = structure_key(nodes, edges, chart_type, algorithm)
+            result = TEMPLATE_STORE.lookup(skey, nodes)
+        template_hit = result is not None
+        if not template_hit:
+            result = getattr(self, spec.method)(nodes, edges)
+            if skey is not None:
+                TEMPLATE_STORE.store(skey, nodes, result)
+
+        # 主算法之后投影到固定点 / 对齐 / 顺序约束上
+        self.constraint_solver = None
+        if pinned or constraints:
+            self.constraint_solver = ConstraintSolver(result, constraints, pinned)
+            self.constraint_solver.solve()
+            result = self.constraint_solver.apply(result)
+
+        self.last_metrics = {
+            "algorithm": algorithm,
+            "reason": reason,
+            "stats": stats.to_dict(),
+            "template_hit": template_hit,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        return result
     
+    def _choose_algorithm(
+        self,
+        structure: Dict[str, Any],
+        chart_type: str,
+        algorithm: Optional[str],
+        stats: GraphStats
+    ) -> Tuple[str, str]:
+        """确定布局算法：指定且已注册的算法优先，否则按图统计 + 图表类型选择"""
+        if algorithm and get_layout_spec(algorithm):
+            return algorithm, "指定算法"
+        if algorithm:
+            logger.warning(f"未知的布局算法: {algorithm}，改为自动选择")
+        hint = chart_type
+        if chart_type == "auto":
+            # auto 模式下以 LLM 给出的结构类型为提示，仍需通过适用性检查
+            hint = structure.get("type") or chart_type
+        return select_layout(stats, hint)
+
+    def layout_many(
+        self,
+        structures: List[Dict[str, Any]],
+        chart_types: Union[str, List[str]] = "flowchart",
+        algorithm: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量布局（离线重渲染等场景）
+
+        先在主进程用 O(V + E) 的图统计为每个结构选好算法，按算法分组后切块，
+        连同统计与选择理由交给进程池执行（工作进程不再重复计算）；
+        每个工作进程复用同一个 LayoutEngine 实例。
+        数量较少或只有一个工作进程时直接在当前进程内执行。
+
+        Args:
+            structures: 图表结构列表
+            chart_types: 统一的图表类型，或与 structures 等长的列表
+            algorithm: 指定布局算法（对所有结构生效），为空时逐个自动选择
+            max_workers: 进程数，默认 CPU 核数
+            chunk_size: 每个任务块的结构数，默认按「每个进程约 4 块」计算
+
+        Returns:
+            与输入顺序一致的 [{"nodes", "metrics", "elapsed_ms", "error"}]
+        """
+        if isinstance(chart_types, str):
+            chart_types = [chart_types] * len(structures)
+        if len(chart_types) != len(structures):
+            raise ValueError("chart_types 的长度必须与 structures 一致")
+
+        # 1. 选择算法并按算法分组（同一块内走同一条代码路径）
+        groups: Dict[str, List[Tuple[int, Dict[str, Any], str, str, str, GraphStats]]] = {}
+        for index, (structure, chart_type) in enumerate(zip(structures, chart_types)):
+            stats = compute_graph_stats(structure.get("nodes", []), structure.get("edges", []))
+            name, reason = self._choose_algorithm(structure, chart_type, algorithm, stats)
+            if structure.get("nodes"):
+                record_selection(name, reason, stats)
+            groups.setdefault(name, []).append((index, structure, chart_type, name, reason, stats))
+        logger.info(
+            f"批量布局: {len(structures)} 个结构，"
+            + "，".join(f"{name} x{len(items)}" for name, items in groups.items())
+        )
+
+        workers = max_workers or os.cpu_count() or 1
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(structures) / (workers * 4)))
+        chunks = [
+            items[i:i + chunk_size]
+            for items in groups.values()
+            for i in range(0, len(items), chunk_size)
+        ]
+
+        # 2. 执行
+        results: List[Optional[Dict[str, Any]]] = [None] * len(structures)
+        if workers <= 1 or len(structures) < BATCH_PARALLEL_MIN:
+            outputs = [_layout_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(_layout_chunk, chunks))
+        for output in outputs:
+            for index, item in output:
+                results[index] = item
+        return results
+
+    def update_constraints(
+        self,
+        layout_nodes: List[Dict[str, Any]],
+        add: Optional[List[Dict[str, Any]]] = None,
+        remove: Optional[List[Dict[str, Any]]] = None,
+        pinned: Optional[Dict[str, Optional[Dict[str, float]]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        增量调整约束：只重新求解受影响的节点，不重跑布局
+
+        Args:
+            layout_nodes: 上一次 layout() 的结果
+            add/remove: 新增/移除的约束
+            pinned: 新的固定点 {节点 ID: {x, y}}，值为 None 表示取消固定
+
+        Returns:
+            更新后的节点列表
+        """
+        if self.constraint_solver is None:
+            self.constraint_solver = ConstraintSolver(layout_nodes)
+        solver = self.constraint_solver
+        for constraint in remove or []:
+            solver.remove_constraint(constraint)
+        for constraint in add or []:
+            solver.add_constraint(constraint)
+        for node_id, pos in (pinned or {}).items():
+            solver.pin(node_id, pos)
+        changed = solver.solve()
+        logger.debug(f"约束增量求解: {len(changed)} 个节点受影响")
+        return solver.apply(layout_nodes, only=changed)
+
     def _venn_layout(
         self,
         nodes: List[Dict[str, Any]],
         edges: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """韦恩图布局"""
+        """韦恩图布局（面积比例 + 按归属关系放置元素）"""
         if not nodes:
             return []
             
@@ -135,7 +341,88 @@ class LayoutEngine:
             elements = nodes[num_sets:]
             # 强制修正形状
             for s in sets: s["shape"] = "ellipse"
-            
+
+        if not HAS_NUMPY or len(sets) > 30:
+            return self._simple_venn_layout(sets, elements)
+
+        # 构建归属关系 map: element_id -> 集合位掩码
+        set_bits = {}
+        for i, node in enumerate(sets):
+            set_bits[node.get("id")] = 1 << i
+            label = str(node.get("label", "")).strip().lower()
+            if label:
+                set_bits.setdefault(label, 1 << i)
+
+        parent_map = {n.get("id"): 0 for n in elements}
+        for edge in edges:
+            u, v = edge.get("from"), edge.get("to")
+            # 边可能是 element -> set 或 set -> element
+            if u in parent_map and v in set_bits:
+                parent_map[u] |= set_bits[v]
+            elif v in parent_map and u in set_bits:
+                parent_map[v] |= set_bits[u]
+        for node in elements:
+            # 也支持在节点上直接标注所属集合：sets / group / parent（集合 ID 或名称）
+            refs = node.get("sets") or []
+            if isinstance(refs, str):
+                refs = [refs]
+            refs = list(refs) + [node.get("group"), node.get("parent")]
+            for ref in refs:
+                if isinstance(ref, str):
+                    bit = set_bits.get(ref) or set_bits.get(ref.strip().lower())
+                    if bit:
+                        parent_map[node.get("id")] |= bit
+
+        # 元素格子：取最大元素尺寸 + 间距，保证互不重叠
+        gap = 20
+        cell = (
+            max((n.get("width", 200) for n in elements), default=160) + gap,
+            max((n.get("height", 60) for n in elements), default=60) + gap,
+        )
+        centers, radii, positions = venn_layout(
+            len(sets),
+            [parent_map[n.get("id")] for n in elements],
+            cell
+        )
+
+        result = []
+        for node, (cx, cy), r in zip(sets, centers.tolist(), radii.tolist()):
+            result.append({
+                **node,
+                "x": float(cx - r),
+                "y": float(cy - r),
+                "width": float(r * 2),
+                "height": float(r * 2),
+                # 韦恩图的集合需要透明背景以便重叠
+                "backgroundColor": "transparent",
+                "fillStyle": "solid" # 前端 Builder 需要处理透明度
+            })
+
+        unplaced = []
+        for node, point in zip(elements, positions):
+            if point is None:
+                unplaced.append(node)
+                continue
+            width, height = node.get("width", 200), node.get("height", 60)
+            result.append({
+                **node,
+                "x": float(point[0] - width / 2),
+                "y": float(point[1] - height / 2),
+            })
+
+        # 放不进所属区域的元素（如要求的交集不存在）排在图表下方
+        if unplaced:
+            logger.warning(f"韦恩图: {len(unplaced)} 个元素无法放入所属区域，排列在下方")
+            bottom = max(r["y"] + r["height"] for r in result)
+            result.extend(self._grid_below(unplaced, bottom + 50))
+        return result
+
+    def _simple_venn_layout(
+        self,
+        sets: List[Dict[str, Any]],
+        elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """简单韦恩图布局（固定半径与偏移，元素排在下方；不依赖 numpy）"""
         result = []
         
         # 1. 布局集合圆圈 (Sets)
@@ -149,9 +436,7 @@ class LayoutEngine:
         elif len(sets) == 2:
             set_positions = [(-offset, 0), (offset, 0)]
         elif len(sets) == 3:
-            # 品字形：上，左下，右下 (倒三角)
-            # 或者 正三角：上，左下，右下
-            # 这里用正三角布局：上方一个，下方左右各一个
+            # 正三角布局：上方一个，下方左右各一个
             r = offset * 1.2
             set_positions = [
                 (0, -r),               # 上
@@ -172,25 +457,17 @@ class LayoutEngine:
                 "y": float(cy - set_radius),
                 "width": float(set_radius * 2),
                 "height": float(set_radius * 2),
-                # 韦恩图的集合需要透明背景以便重叠
                 "backgroundColor": "transparent", 
-                "fillStyle": "solid" # 前端 Builder 需要处理透明度
+                "fillStyle": "solid"
             })
             
-        # 2. 布局元素 (Elements)
-        # 简单策略：将元素分布在下方或四周，因为计算重叠区域太复杂
-        # 或者如果能判断归属关系，尽量靠近归属的集合
-        
-        # 构建归属关系 map
-        parent_map = {} # element_id -> [set_ids]
-        for edge in edges:
-            u, v = edge.get("from"), edge.get("to")
-            # 假设边是 element -> set 或 set -> element
-            # 这里暂不处理复杂的包含逻辑，简单将所有元素排布在图表下方
-            pass
+        # 2. 网格布局元素在下方
+        result.extend(self._grid_below(elements, set_radius * 1.5 + 50))
+        return result
 
-        # 网格布局元素在下方
-        start_y = set_radius * 1.5 + 50
+    def _grid_below(self, elements: List[Dict[str, Any]], start_y: float) -> List[Dict[str, Any]]:
+        """把元素按 4 列网格居中排列在 start_y 下方"""
+        result = []
         col_count = 4
         element_spacing_x = 220
         element_spacing_y = 100
@@ -486,7 +763,7 @@ class LayoutEngine:
                     pos = nx.nx_agraph.graphviz_layout(G, prog='dot')
                 else:
                     # 使用 networkx 的分层布局
-                    pos = nx.spring_layout(G, k=self.node_spacing/50, iterations=50)
+                    pos = nx.spring_layout(G, k=self.node_spacing/50, iterations=50, seed=42)  # 固定种子，结果可复现
                     # 或者使用分层布局
                     try:
                         pos = self._multipartite_layout(G)
@@ -736,6 +1013,121 @@ class LayoutEngine:
         
         return result
     
+    def _record_layout(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        记录式布局（ER 图 / 类图）
+
+        属性节点折叠进实体的属性栏，按属性/方法行测量分栏节点尺寸，
+        实体之间用分层布局，层间距按每层最高的记录计算。
+        """
+        nodes, edges = fold_attributes(nodes, edges)
+
+        sized = []
+        for node in nodes:
+            sections = record_sections(node)
+            if sections is None:
+                sized.append(node)
+                continue
+            width, height, record = self._estimate_record_size(*sections)
+            sized.append({**node, "width": width, "height": height, "record": record})
+
+        # 继承/实现边从子类指向父类，分层时反向，让父类在上
+        layer_edges = [
+            {**edge, "from": edge.get("to"), "to": edge.get("from")}
+            if str(edge.get("kind", "")).lower() in ("inheritance", "implementation", "inherit") else edge
+            for edge in edges
+        ]
+        result = self._hierarchical_layout(sized, layer_edges)
+
+        # 分层布局按固定层距摆放，记录高度不一，按每层最高的节点重新累加 y
+        rows: Dict[float, float] = {}
+        for node in result:
+            rows[node["y"]] = max(rows.get(node["y"], 0.0), node.get("height", 80))
+        offsets, y = {}, 0.0
+        gap = self.level_spacing - 80  # 与普通分层布局的层间空白保持一致
+        for row_y in sorted(rows):
+            offsets[row_y] = y
+            y += rows[row_y] + gap
+        for node in result:
+            node["y"] = offsets[node["y"]]
+        return result
+
+    def _fishbone_layout(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """鱼骨图布局（鱼头 + 上下交替的斜向大骨 + 沿大骨堆叠的原因）"""
+        index = {node.get("id"): i for i, node in enumerate(nodes)}
+        adj: List[List[int]] = [[] for _ in nodes]
+        for edge in edges:
+            u, v = index.get(edge.get("from")), index.get(edge.get("to"))
+            if u is not None and v is not None and u != v:
+                # 边方向不固定（原因 -> 结果 或 问题 -> 类别），按无向图处理
+                adj[u].append(v)
+                adj[v].append(u)
+
+        # 鱼头：显式标注的问题节点，否则取「有下级的邻居」最多的节点（即类别最多的节点）
+        head = next(
+            (i for i, n in enumerate(nodes) if str(n.get("type", "")).lower() in ("head", "problem", "effect")),
+            None
+        )
+        if head is None:
+            head = max(
+                range(len(nodes)),
+                key=lambda i: (sum(1 for j in adj[i] if len(adj[j]) > 1), len(adj[i]), -i)
+            )
+
+        # 从鱼头出发的 DFS：鱼头的邻居是类别，类别子树按先序展开为原因序列
+        visited = [False] * len(nodes)
+        visited[head] = True
+        bones = []
+        for category in adj[head]:
+            if visited[category]:
+                continue
+            visited[category] = True
+            causes = []
+            stack = [(j, 1) for j in reversed(adj[category])]
+            while stack:
+                u, depth = stack.pop()
+                if visited[u]:
+                    continue
+                visited[u] = True
+                causes.append((u, depth))
+                stack.extend((j, depth + 1) for j in reversed(adj[u]) if not visited[j])
+            bones.append((category, causes))
+
+        sizes = [(n.get("width", 200), n.get("height", 80)) for n in nodes]
+        centers, segments = fishbone_layout(sizes, head, bones)
+
+        placed = [node for node, seen in zip(nodes, visited) if seen]
+        result = self._place_centers(placed, [c for c, seen in zip(centers, visited) if seen])
+
+        # 主骨 / 大骨 / 短线作为 line 元素输出（鱼骨图不再绘制结构中的连线）
+        for i, (x1, y1, x2, y2) in enumerate(segments):
+            result.append({
+                "id": f"fishbone-bone-{i}",
+                "label": "",
+                "shape": "line",
+                "x": float(x1),
+                "y": float(y1),
+                "width": float(abs(x2 - x1)),
+                "height": float(abs(y2 - y1)),
+                "points": [[0.0, 0.0], [float(x2 - x1), float(y2 - y1)]],
+                "strokeWidth": 4 if i == 0 else 2,
+            })
+
+        # 与鱼头不连通的节点排在图表下方
+        unplaced = [node for node, seen in zip(nodes, visited) if not seen]
+        if unplaced:
+            bottom = max(r["y"] + r["height"] for r in result)
+            result.extend(self._grid_below(unplaced, bottom + 50))
+        return result
+
     def _force_directed_layout(
         self,
         nodes: List[Dict[str, Any]],
@@ -757,7 +1149,7 @@ class LayoutEngine:
                     if from_id in node_map and to_id in node_map:
                         G.add_edge(from_id, to_id)
                 
-                pos = nx.spring_layout(G, k=self.node_spacing/50, iterations=50)
+                pos = nx.spring_layout(G, k=self.node_spacing/50, iterations=50, seed=42)  # 固定种子，结果可复现
                 
                 result = []
                 for node in nodes:
@@ -785,6 +1177,77 @@ class LayoutEngine:
                 logger.warning(f"Force directed layout failed: {e}")
         
         # 回退到简单网格布局
+        return self._grid_layout(nodes, edges)
+
+    def _stress_layout(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """稀疏应力布局（适用于概念图、状态图、网络图，保持图距离）"""
+        if not HAS_NUMPY:
+            return self._force_directed_layout(nodes, edges)
+
+        src, dst = self._edge_indices(nodes, edges)
+        centers = stress_layout(len(nodes), src, dst, ideal_length=self._ideal_edge_length(nodes))
+        return self._place_centers(nodes, centers.tolist())
+
+    def _multilevel_force_layout(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """多层级力导向布局（适用于数千节点以上的网络图、架构图）"""
+        if not HAS_NUMPY:
+            return self._force_directed_layout(nodes, edges)
+
+        src, dst = self._edge_indices(nodes, edges)
+        centers = multilevel_layout(len(nodes), src, dst, ideal_length=self._ideal_edge_length(nodes))
+        return self._place_centers(nodes, centers.tolist())
+
+    def _edge_indices(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> Tuple[List[int], List[int]]:
+        """把边转换为节点下标数组（供 NumPy 布局使用）"""
+        index = {node.get("id"): i for i, node in enumerate(nodes)}
+        src, dst = [], []
+        for edge in edges:
+            u, v = index.get(edge.get("from")), index.get(edge.get("to"))
+            if u is not None and v is not None:
+                src.append(u)
+                dst.append(v)
+        return src, dst
+
+    def _ideal_edge_length(self, nodes: List[Dict[str, Any]]) -> float:
+        """理想边长：节点平均尺寸 + 半个节点间距"""
+        avg_size = sum(max(n.get("width", 200), n.get("height", 80)) for n in nodes) / len(nodes)
+        return avg_size + self.node_spacing / 2
+
+    def _place_centers(
+        self,
+        nodes: List[Dict[str, Any]],
+        centers: List[Tuple[float, float]]
+    ) -> List[Dict[str, Any]]:
+        """中心坐标 -> 左上角坐标"""
+        result = []
+        for node, (cx, cy) in zip(nodes, centers):
+            width = node.get("width", 200)
+            height = node.get("height", 80)
+            result.append({
+                **node,
+                "x": float(cx - width / 2),
+                "y": float(cy - height / 2),
+            })
+        return result
+
+    def _grid_layout(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """网格布局（兜底）"""
         result = []
         cols = int(len(nodes) ** 0.5) + 1
         for i, node in enumerate(nodes):
@@ -800,3 +1263,35 @@ class LayoutEngine:
         
         return result
 
+
+BATCH_PARALLEL_MIN = 32  # 批量布局中结构数少于该值时不启用进程池
+
+_worker_engine: Optional[LayoutEngine] = None  # 工作进程内复用的布局引擎
+
+
+def _layout_chunk(
+    items: List[Tuple[int, Dict[str, Any], str, str, str, GraphStats]]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """进程池任务：按主进程选好的算法对一块结构逐个布局，单个失败不影响其他结构"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = LayoutEngine()
+    engine = _worker_engine
+
+    output = []
+    for index, structure, chart_type, algorithm, reason, stats in items:
+        start = time.perf_counter()
+        engine.last_metrics = {}
+        try:
+            nodes = engine._layout_selected(structure, chart_type, algorithm, reason, stats, start)
+            error = None
+        except Exception as e:
+            logger.warning(f"批量布局: 第 {index} 个结构布局失败: {e}")
+            nodes, error = [], str(e)
+        output.append((index, {
+            "nodes": nodes,
+            "metrics": engine.last_metrics,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": error,
+        }))
+    return output
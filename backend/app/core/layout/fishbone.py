@@ -0,0 +1,107 @@
+"""
+鱼骨图（石川图）布局
+
+1. 主骨：水平线 y = 0，鱼头（问题节点）在最右侧
+2. 大骨：每个类别一根斜骨，上下交替，从主骨向左上/左下倾斜延伸，类别节点在骨末端
+3. 小骨：原因节点沿所属大骨由内向外堆叠，每个原因用一根水平短线连到大骨上，
+   更深层的子原因在其父原因之后继续堆叠、短线加长（缩进）
+
+每根大骨的宽度只由其原因节点的实际尺寸决定，大骨之间从右向左依次排开，
+整体 O(V)，不需要分层和虚拟节点。
+"""
+import math
+from typing import List, Tuple
+
+
+BONE_ANGLE = 60.0  # 大骨与主骨的夹角（度）
+SPINE_GAP = 40.0  # 第一个原因与主骨的距离
+ROW_GAP = 20.0  # 同一根大骨上相邻原因的间距
+RIB_LENGTH = 30.0  # 原因节点与大骨之间的水平短线长度
+INDENT = 40.0  # 每深一层，短线加长的长度
+BONE_GAP = 60.0  # 相邻两组大骨之间的水平间距
+HEAD_GAP = 80.0  # 最靠近鱼头的大骨与鱼头的距离
+
+Segment = Tuple[float, float, float, float]
+
+
+def _bone(
+    sizes: List[Tuple[float, float]],
+    category: int,
+    causes: List[Tuple[int, int]],
+    slope: float
+) -> Tuple[List[Tuple[int, float, float]], List[Segment], float, float]:
+    """
+    以「大骨与主骨交点 = 原点、向外为正方向」计算一根大骨
+
+    Returns:
+        (节点 [(下标, 中心 x, 离主骨的距离)], 线段列表, 最左 x, 最右 x)
+    """
+    placed = []
+    segments: List[Segment] = []
+    left = right = 0.0
+
+    distance = SPINE_GAP
+    for index, depth in causes:
+        width, height = sizes[index]
+        t = distance + height / 2
+        bone_x = -t * slope
+        node_right = bone_x - RIB_LENGTH - INDENT * (depth - 1)
+        placed.append((index, node_right - width / 2, t))
+        segments.append((bone_x, t, node_right, t))
+        left = min(left, node_right - width)
+        distance += height + ROW_GAP
+
+    width, height = sizes[category]
+    t = distance + height / 2
+    center_x = -t * slope
+    placed.append((category, center_x, t))
+    segments.append((0.0, 0.0, -(t - height / 2) * slope, t - height / 2))
+    left = min(left, center_x - width / 2)
+    right = max(right, center_x + width / 2)
+    return placed, segments, left, right
+
+
+def fishbone_layout(
+    sizes: List[Tuple[float, float]],
+    head: int,
+    bones: List[Tuple[int, List[Tuple[int, int]]]]
+) -> Tuple[List[Tuple[float, float]], List[Segment]]:
+    """
+    鱼骨图布局
+
+    Args:
+        sizes: 每个节点的 (宽, 高)
+        head: 鱼头节点下标
+        bones: [(类别节点下标, [(原因节点下标, 深度)])]，原因按堆叠顺序排列，直接原因深度为 1
+
+    Returns:
+        (每个节点的中心坐标（未参与布局的节点为 (0, 0)）, 主骨/大骨/短线线段 (x1, y1, x2, y2))
+    """
+    slope = 1.0 / math.tan(math.radians(BONE_ANGLE))
+    centers = [(0.0, 0.0)] * len(sizes)
+    segments: List[Segment] = []
+
+    head_w, _ = sizes[head]
+    centers[head] = (head_w / 2, 0.0)
+
+    # 上下两根大骨为一组，共用主骨上的同一个交点
+    cursor = -HEAD_GAP
+    tail = -HEAD_GAP
+    for start in range(0, len(bones), 2):
+        group = []
+        for offset, (category, causes) in enumerate(bones[start:start + 2]):
+            sign = -1.0 if offset == 0 else 1.0  # 先上后下
+            group.append((sign, *_bone(sizes, category, causes, slope)))
+
+        attach = cursor - max(right for *_, right in group)
+        for sign, placed, bone_segments, _, _ in group:
+            for index, x, t in placed:
+                centers[index] = (attach + x, sign * t)
+            for x1, t1, x2, t2 in bone_segments:
+                segments.append((attach + x1, sign * t1, attach + x2, sign * t2))
+        left = attach + min(left for *_, left, _ in group)
+        cursor = left - BONE_GAP
+        tail = min(tail, left)
+
+    segments.insert(0, (tail, 0.0, 0.0, 0.0))
+    return centers, segments
@@ -0,0 +1,298 @@
+"""
+细节层次（LOD）折叠 - 超大图的摘要视图
+
+LLM 返回上千个节点时（如「画出全部微服务网格」），整张图在浏览器里既看不清也很卡。
+结构解析之后，如果元素数（节点 + 边）超过预算，就把簇折叠成摘要节点：
+1. 检测簇：
+   - group：节点上标注的 group 字段
+   - subtree：树形结构中，根节点的每个子节点连同其子树为一簇
+   - label_propagation：标签传播社区发现（一般图）
+   auto 时按上述顺序选择适用的方式
+2. 从最大的簇开始折叠，直到预计元素数不超过预算：
+   簇内节点替换为一个摘要节点，簇内边删除，簇外连线改接到摘要节点并去重
+3. 被折叠的子图存入进程级 SUBDIAGRAM_STORE，客户端可按摘要节点 ID 展开（无需重新生成）
+
+整个过程 O((V + E) · 传播轮数)。
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+LOD_METHODS = ("auto", "group", "subtree", "label_propagation")
+LPA_MAX_ROUNDS = 20  # 标签传播轮数上限
+SUBDIAGRAM_CAPACITY = 256
+
+
+def element_count(structure: Dict[str, Any]) -> int:
+    """结构绘制后的大致元素数（每个节点、每条边各一个元素）"""
+    return len(structure.get("nodes", [])) + len(structure.get("edges", []))
+
+
+# 簇：唯一键 -> (显示名, 成员节点 ID 列表)。显示名可能重复（如多个子树都叫「Service」），不能用作键
+Clusters = Dict[Any, Tuple[str, List[Any]]]
+
+
+def _group_clusters(nodes: List[Dict[str, Any]]) -> Clusters:
+    clusters: Clusters = {}
+    for node in nodes:
+        if node.get("group") is not None:
+            group = str(node["group"])
+            clusters.setdefault(group, (group, []))[1].append(node["id"])
+    return clusters
+
+
+def _is_forest(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> bool:
+    """每个节点至多一个父节点、且存在根节点"""
+    indegree: Dict[Any, int] = {}
+    for edge in edges:
+        indegree[edge["to"]] = indegree.get(edge["to"], 0) + 1
+    return all(count <= 1 for count in indegree.values()) and len(indegree) < len(nodes)
+
+
+def _subtree_clusters(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Clusters:
+    children: Dict[Any, List[Any]] = {}
+    has_parent = set()
+    for edge in edges:
+        children.setdefault(edge["from"], []).append(edge["to"])
+        has_parent.add(edge["to"])
+    labels = {node["id"]: node.get("label", node["id"]) for node in nodes}
+
+    clusters: Clusters = {}
+    for root in (node["id"] for node in nodes if node["id"] not in has_parent):
+        for child in children.get(root, []):
+            members, stack, seen = [], [child], {root}
+            while stack:
+                current = stack.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+                members.append(current)
+                stack.extend(children.get(current, []))
+            # 以子树根（子节点 ID）为键
+            clusters[child] = (str(labels.get(child, child)), members)
+    return clusters
+
+
+def _label_propagation_clusters(
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]]
+) -> Clusters:
+    """
+    标签传播：每个节点反复取邻居中最多的标签（平局取最小标签），直到不再变化。
+    按节点顺序原地更新（异步传播），结果确定、收敛快
+    """
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    neighbors: List[List[int]] = [[] for _ in nodes]
+    for edge in edges:
+        u, v = index[edge["from"]], index[edge["to"]]
+        if u != v:
+            neighbors[u].append(v)
+            neighbors[v].append(u)
+
+    labels = list(range(len(nodes)))
+    for _ in range(LPA_MAX_ROUNDS):
+        changed = False
+        for i in range(len(nodes)):
+            if not neighbors[i]:
+                continue
+            counts: Dict[int, int] = {}
+            for j in neighbors[i]:
+                counts[labels[j]] = counts.get(labels[j], 0) + 1
+            best = max(counts.values())
+            label = min(l for l, c in counts.items() if c == best)
+            if label != labels[i]:
+                labels[i] = label
+                changed = True
+        if not changed:
+            break
+
+    communities: Dict[int, List[Any]] = {}
+    for i, label in enumerate(labels):
+        communities.setdefault(label, []).append(nodes[i]["id"])
+    # 社区以度数最高的成员（锚点）为键，并以其标签命名
+    clusters: Clusters = {}
+    for members in communities.values():
+        anchor = max(members, key=lambda m: len(neighbors[index[m]]))
+        clusters[anchor] = (str(nodes[index[anchor]].get("label", anchor)), members)
+    return clusters
+
+
+def detect_clusters(
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]],
+    method: str = "auto"
+) -> Tuple[str, Clusters]:
+    """
+    检测可折叠的簇
+
+    Returns:
+        (实际使用的方式, 簇键 -> (显示名, 成员节点 ID 列表))
+    """
+    if method == "auto":
+        if sum(1 for node in nodes if node.get("group") is not None) * 2 >= len(nodes):
+            method = "group"
+        elif _is_forest(nodes, edges):
+            method = "subtree"
+        else:
+            method = "label_propagation"
+
+    if method == "group":
+        return method, _group_clusters(nodes)
+    if method == "subtree":
+        return method, _subtree_clusters(nodes, edges)
+    return "label_propagation", _label_propagation_clusters(nodes, edges)
+
+
+def _summary_id(members: List[Any]) -> str:
+    # 由成员确定的 ID：同一结构重复生成时摘要节点 ID 不变
+    digest = hashlib.blake2b("\x1f".join(sorted(map(str, members))).encode("utf-8"), digest_size=6)
+    return f"lod-{digest.hexdigest()}"
+
+
+class SubdiagramStore:
+    """摘要节点 ID -> 被折叠的子图（进程内 LRU）"""
+
+    def __init__(self, capacity: int = SUBDIAGRAM_CAPACITY):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(self, summary_id: str, subdiagram: Dict[str, Any]) -> None:
+        self._items[summary_id] = subdiagram
+        self._items.move_to_end(summary_id)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def get(self, summary_id: str) -> Optional[Dict[str, Any]]:
+        subdiagram = self._items.get(summary_id)
+        if subdiagram is not None:
+            self._items.move_to_end(summary_id)
+        return subdiagram
+
+
+# 进程级子图库（展开接口按摘要节点 ID 读取）
+SUBDIAGRAM_STORE = SubdiagramStore()
+
+
+def collapse_structure(
+    structure: Dict[str, Any],
+    budget: int,
+    method: str = "auto"
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    元素数超过预算时折叠簇
+
+    Args:
+        structure: 图表结构（nodes / edges）
+        budget: 元素预算（节点数 + 边数）
+        method: 簇检测方式，见 LOD_METHODS
+
+    Returns:
+        (折叠后的结构, 统计信息；未折叠时为 None)
+    """
+    nodes = [n for n in structure.get("nodes", []) if n.get("id") is not None]
+    node_ids = {n["id"] for n in nodes}
+    edges = [e for e in structure.get("edges", []) if e.get("from") in node_ids and e.get("to") in node_ids]
+    before = len(nodes) + len(edges)
+    if before <= budget:
+        return structure, None
+
+    used, detected = detect_clusters(nodes, edges, method)
+    clusters = {key: members for key, (_, members) in detected.items()}
+    cluster_of: Dict[Any, Any] = {}
+    for key, members in clusters.items():
+        for member in members:
+            cluster_of.setdefault(member, key)
+    internal: Dict[Any, int] = {}
+    for edge in edges:
+        key = cluster_of.get(edge["from"])
+        if key is not None and key == cluster_of.get(edge["to"]):
+            internal[key] = internal.get(key, 0) + 1
+
+    # 从最大的簇开始折叠：每折叠一个簇至少节省 (成员数 - 1 + 簇内边数) 个元素
+    excess = before - budget
+    chosen: Dict[Any, str] = {}  # 簇键 -> 摘要节点 ID
+    for key in sorted(clusters, key=lambda c: (-len(clusters[c]), str(c))):
+        if excess <= 0:
+            break
+        members = [m for m in clusters[key] if cluster_of[m] == key]
+        if len(members) < 2:
+            continue
+        chosen[key] = _summary_id(members)
+        excess -= len(members) - 1 + internal.get(key, 0)
+    if not chosen:
+        return structure, None
+
+    target = {node_id: chosen[key] for node_id, key in cluster_of.items() if key in chosen}
+    sub_nodes: Dict[str, List[Dict[str, Any]]] = {sid: [] for sid in chosen.values()}
+    sub_edges: Dict[str, List[Dict[str, Any]]] = {sid: [] for sid in chosen.values()}
+
+    new_nodes: List[Dict[str, Any]] = []
+    for node in nodes:
+        summary = target.get(node["id"])
+        if summary is None:
+            new_nodes.append(node)
+            continue
+        if not sub_nodes[summary]:
+            # 摘要节点放在簇的第一个成员的位置，保持节点顺序稳定
+            new_nodes.append({"id": summary})
+        sub_nodes[summary].append(node)
+
+    new_edges: List[Dict[str, Any]] = []
+    merged: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for edge in edges:
+        u, v = target.get(edge["from"], edge["from"]), target.get(edge["to"], edge["to"])
+        if u == v and u in sub_edges:
+            sub_edges[u].append(edge)
+            continue
+        if u == edge["from"] and v == edge["to"]:
+            new_edges.append(edge)
+            continue
+        # 改接到摘要节点的连线去重
+        key = (u, v)
+        if key in merged:
+            merged[key]["count"] += 1
+            continue
+        merged[key] = {"from": u, "to": v, "count": 1}
+        new_edges.append(merged[key])
+
+    summaries = []
+    for key, summary in chosen.items():
+        members = sub_nodes[summary]
+        name = detected[key][0]
+        SUBDIAGRAM_STORE.put(summary, {
+            "type": structure.get("type"),
+            "name": name,
+            "nodes": members,
+            "edges": sub_edges[summary],
+            "budget": budget,
+            "method": method,
+        })
+        summaries.append({"id": summary, "name": name, "nodes": len(members), "edges": len(sub_edges[summary])})
+
+    counts = {s["id"]: s["nodes"] for s in summaries}
+    names = {s["id"]: s["name"] for s in summaries}
+    new_nodes = [
+        {
+            "id": n["id"],
+            "label": f"{names[n['id']]}（{counts[n['id']]} 个节点）",
+            "type": "summary",
+            "collapsed": counts[n["id"]],
+        } if n["id"] in counts else n
+        for n in new_nodes
+    ]
+
+    collapsed = {**structure, "nodes": new_nodes, "edges": new_edges}
+    stats = {
+        "method": used,
+        "budget": budget,
+        "elements_before": before,
+        "elements_after": len(new_nodes) + len(new_edges),
+        "summaries": summaries,
+    }
+    logger.info(
+        f"LOD 折叠（{used}）: 元素 {before} -> {stats['elements_after']}，{len(summaries)} 个摘要节点"
+    )
+    return collapsed, stats
@@ -0,0 +1,397 @@
+"""
+多层级力导向布局（FM³ 风格）- 面向数千节点以上的网络图、架构图
+
+流程：
+1. 粗化：反复做「最大匹配 + 太阳系合并」（未匹配节点并入邻居所在簇），
+   直到图足够小或不再收缩，得到层级 G0 ⊃ G1 ⊃ ... ⊃ Gk
+2. 对最粗的 Gk 做完整的力导向布局
+3. 逐层延拓：子节点继承父簇坐标（加少量抖动），再做少量轮次的力导向细化
+4. 各连通分量分别完成以上步骤，最后按包围盒排列在一起
+
+粗层（较小）精确计算斥力以确定全局结构，细层使用 FR 网格变体只计算局部斥力，
+每轮 O(V + E)，全部用 NumPy 向量化；只有粗化时的匹配是逐节点的线性扫描。
+"""
+import math
+from typing import List, Tuple
+
+from loguru import logger
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    np = None
+    logger.warning("numpy not installed, multilevel/stress layouts are disabled")
+
+
+COARSEST_SIZE = 50  # 最粗层节点数上限
+COARSEST_ITERATIONS = 200  # 最粗层力导向轮次
+STAGNATION_RATIO = 0.85  # 收缩比例高于该值时停止粗化
+EXACT_REPULSION_LIMIT = 300  # 节点数不超过该值时斥力精确计算
+PAIR_BUDGET = 32  # 网格变体中每个节点平均参与的点对数上限
+
+
+def _build_csr(n: int, src: "np.ndarray", dst: "np.ndarray") -> Tuple[List[int], List[int]]:
+    """构建无向图的 CSR 邻接（返回 Python 列表，便于逐节点遍历）"""
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    order = np.argsort(u, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=n), out=indptr[1:])
+    return indptr.tolist(), v[order].tolist()
+
+
+def _coarsen(
+    n: int,
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    mass: "np.ndarray",
+    rng: "np.random.Generator"
+) -> Tuple["np.ndarray", int]:
+    """
+    一层粗化：随机顺序的最轻邻居匹配 + 太阳系合并
+
+    Returns:
+        (节点 -> 粗节点 的映射, 粗节点数)
+    """
+    indptr, indices = _build_csr(n, src, dst)
+    mass_l = mass.tolist()
+    cluster = [-1] * n
+    cluster_mass: List[float] = []
+
+    # 1. 匹配：每个未匹配节点与质量最小的未匹配邻居合并
+    for u in rng.permutation(n).tolist():
+        if cluster[u] >= 0:
+            continue
+        best, best_mass = -1, math.inf
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            if v != u and cluster[v] < 0 and mass_l[v] < best_mass:
+                best, best_mass = v, mass_l[v]
+        if best >= 0:
+            cluster[u] = cluster[best] = len(cluster_mass)
+            cluster_mass.append(mass_l[u] + best_mass)
+
+    # 2. 太阳系合并：剩下的节点（邻居都已匹配，如星型图的叶子）并入最轻的邻居簇
+    for u in range(n):
+        if cluster[u] >= 0:
+            continue
+        best, best_mass = -1, math.inf
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            c = cluster[v]
+            if c >= 0 and cluster_mass[c] < best_mass:
+                best, best_mass = c, cluster_mass[c]
+        if best < 0:
+            # 孤立节点自成一簇
+            best = len(cluster_mass)
+            cluster_mass.append(0.0)
+        cluster[u] = best
+        cluster_mass[best] += mass_l[u]
+
+    return np.asarray(cluster, dtype=np.int64), len(cluster_mass)
+
+
+def _coarse_edges(
+    mapping: "np.ndarray",
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    nc: int
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """把边映射到粗图，去掉自环并去重"""
+    cu, cv = mapping[src], mapping[dst]
+    keep = cu != cv
+    lo = np.minimum(cu[keep], cv[keep])
+    hi = np.maximum(cu[keep], cv[keep])
+    keys = np.unique(lo * nc + hi)
+    return keys // nc, keys % nc
+
+
+def _neighbor_cells(
+    pos: "np.ndarray",
+    cell_size: float
+) -> Tuple["np.ndarray", List[Tuple["np.ndarray", "np.ndarray"]]]:
+    """
+    把节点放入边长为 cell_size 的格子
+
+    Returns:
+        (按格子排序的节点顺序, 3x3 邻域中每个方向上 (邻居格子起始下标, 邻居格子节点数) 的列表)
+    """
+    ij = np.floor((pos - pos.min(axis=0)) / cell_size).astype(np.int64) + 1
+    rows = int(ij[:, 1].max()) + 2
+    keys = ij[:, 0] * rows + ij[:, 1]
+
+    order = np.argsort(keys, kind="stable")
+    uniq, start, count = np.unique(keys[order], return_index=True, return_counts=True)
+
+    cells = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys + dx * rows + dy
+            slot = np.minimum(np.searchsorted(uniq, target), len(uniq) - 1)
+            cnt = np.where(uniq[slot] == target, count[slot], 0)
+            cells.append((start[slot], cnt))
+    return order, cells
+
+
+def _repulsion(pos: "np.ndarray", k: float, cell_size: float = 0.0) -> Tuple["np.ndarray", float]:
+    """
+    斥力位移（Fruchterman-Reingold: k² / d）
+
+    小图精确计算全部点对；大图使用 FR 网格变体：只计算距离 2k 以内的点对，
+    格子边长为 2k，每个节点只和自身及相邻 8 个格子中的节点配对。
+    大图的全局结构已由更粗的层级决定，这一层只需要局部均匀化。
+
+    Args:
+        cell_size: 上一轮使用的格子边长；相邻两轮布局变化不大，从它的两倍开始尝试，
+            避免每轮都从 2k 开始逐次减半、重复分格
+
+    Returns:
+        (位移, 本轮使用的格子边长)
+    """
+    n = len(pos)
+    k2 = k * k
+    floor = 1e-4 * k2
+
+    if n <= EXACT_REPULSION_LIMIT:
+        delta = pos[:, None, :] - pos[None, :, :]
+        d2 = np.maximum((delta ** 2).sum(axis=2), floor)
+        np.fill_diagonal(d2, np.inf)
+        return (delta * (k2 / d2)[:, :, None]).sum(axis=1), cell_size
+
+    # 局部过于拥挤时（如随机图被引力压缩）缩小截断半径，保证每轮点对数 O(V)
+    cell_size = min(2.0 * k, cell_size * 2) if cell_size else 2.0 * k
+    while True:
+        order, cells = _neighbor_cells(pos, cell_size)
+        total = sum(int(cnt.sum()) for _, cnt in cells)
+        if total <= PAIR_BUDGET * n or cell_size <= k / 4:
+            break
+        cell_size /= 2
+
+    nodes = np.arange(n)
+    firsts, seconds = [], []
+    for start, cnt in cells:
+        total = int(cnt.sum())
+        if not total:
+            continue
+        base = np.repeat(start, cnt)
+        offset = np.arange(total) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        firsts.append(np.repeat(nodes, cnt))
+        seconds.append(order[base + offset])
+
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    delta = pos[first] - pos[second]
+    d2 = (delta ** 2).sum(axis=1)
+    keep = (first != second) & (d2 < cell_size * cell_size)
+    first, delta = first[keep], delta[keep]
+    force = delta * (k2 / np.maximum(d2[keep], floor))[:, None]
+
+    disp = np.zeros_like(pos)
+    disp[:, 0] = np.bincount(first, weights=force[:, 0], minlength=n)
+    disp[:, 1] = np.bincount(first, weights=force[:, 1], minlength=n)
+    return disp, cell_size
+
+
+def _force_iterations(
+    pos: "np.ndarray",
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    k: float,
+    iterations: int,
+    temperature: float,
+    cooling: float = 0.9,
+    gravity: float = 0.0
+) -> "np.ndarray":
+    """力导向迭代（原地更新并返回 pos）"""
+    n = len(pos)
+    cell_size = 0.0
+    for _ in range(iterations):
+        disp, cell_size = _repulsion(pos, k, cell_size)
+
+        # 引力：d² / k，沿边方向
+        if len(src):
+            delta = pos[dst] - pos[src]
+            dist = np.sqrt((delta ** 2).sum(axis=1)) + 1e-9
+            force = delta * (dist / k)[:, None]
+            for axis in (0, 1):
+                disp[:, axis] += np.bincount(src, weights=force[:, axis], minlength=n)
+                disp[:, axis] -= np.bincount(dst, weights=force[:, axis], minlength=n)
+
+        # 弱重力：防止不连通的分量漂得太远（只在最粗层使用，细层继承其全局结构）
+        if gravity:
+            disp -= gravity * (pos - pos.mean(axis=0))
+
+        # 按温度限制位移
+        length = np.sqrt((disp ** 2).sum(axis=1)) + 1e-9
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+    return pos
+
+
+def _expand(pos: "np.ndarray", k: float) -> "np.ndarray":
+    """
+    延拓后按理想边长放大布局，使每个节点平均占据约 k² 的面积
+
+    粗层节点数少、引力占优，直接延拓到细层会过于拥挤（局部斥力的点对数也会暴涨）。
+    """
+    center = pos.mean(axis=0)
+    span = np.maximum(pos.max(axis=0) - pos.min(axis=0), k)
+    target = len(pos) * k * k
+    area = float(span[0] * span[1])
+    if area < target:
+        pos = center + (pos - center) * math.sqrt(target / area)
+    return pos
+
+
+def _refine_iterations(size: int) -> int:
+    """细化轮次：延拓已给出较好的初始位置，越细（越大）的层只需越少的轮次"""
+    if size > 5000:
+        return 8
+    if size > 1000:
+        return 15
+    return 25
+
+
+def _components(n: int, src: "np.ndarray", dst: "np.ndarray") -> List["np.ndarray"]:
+    """连通分量（按节点数从大到小），每个分量是节点下标数组"""
+    indptr, indices = _build_csr(n, src, dst)
+    label = [-1] * n
+    count = 0
+    for root in range(n):
+        if label[root] >= 0:
+            continue
+        label[root] = count
+        stack = [root]
+        while stack:
+            u = stack.pop()
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                if label[v] < 0:
+                    label[v] = count
+                    stack.append(v)
+        count += 1
+    labels = np.asarray(label, dtype=np.int64)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.cumsum(np.bincount(labels, minlength=count))[:-1]
+    groups = np.split(order, bounds)
+    groups.sort(key=len, reverse=True)
+    return groups
+
+
+def _layout_component(
+    n: int,
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    ideal_length: float,
+    rng: "np.random.Generator"
+) -> "np.ndarray":
+    """对一个连通分量做多层级布局"""
+    if n == 1:
+        return np.zeros((1, 2))
+
+    # 1. 粗化层级
+    levels = [(n, src, dst, np.ones(n))]  # (节点数, 边, 质量)
+    mappings = []
+    while levels[-1][0] > COARSEST_SIZE:
+        size, s, d, mass = levels[-1]
+        mapping, nc = _coarsen(size, s, d, mass, rng)
+        if nc > STAGNATION_RATIO * size:
+            break
+        cs, cd = _coarse_edges(mapping, s, d, nc)
+        mappings.append(mapping)
+        levels.append((nc, cs, cd, np.bincount(mapping, weights=mass, minlength=nc)))
+    if len(levels) > 1:
+        logger.debug(f"多层级布局: {len(levels)} 层，最粗层 {levels[-1][0]} 个节点")
+
+    # 2. 最粗层完整布局（很小的分量收敛快，轮次随节点数递增）
+    size, s, d, mass = levels[-1]
+    k = ideal_length * math.sqrt(mass.mean())
+    side = k * math.sqrt(size)
+    pos = rng.uniform(-side / 2, side / 2, size=(size, 2))
+    iterations = min(COARSEST_ITERATIONS, 20 * size)
+    pos = _force_iterations(pos, s, d, k, iterations=iterations, temperature=side / 4, cooling=0.97, gravity=0.05)
+
+    # 3. 逐层延拓 + 细化（越细的层轮次越少）
+    for level in range(len(levels) - 2, -1, -1):
+        size, s, d, mass = levels[level]
+        k = ideal_length * math.sqrt(mass.mean())
+        # 抖动半径随父簇的子节点数增大：太阳系合并产生的大簇（如星型图的中心）展开到与其规模相当的范围
+        mapping = mappings[level]
+        spread = (k / 4) * np.sqrt(np.bincount(mapping)[mapping])[:, None]
+        pos = _expand(pos[mapping], k) + rng.uniform(-1.0, 1.0, size=(size, 2)) * spread
+        iterations = _refine_iterations(size)
+        pos = _force_iterations(pos, s, d, k, iterations=iterations, temperature=k * 2, cooling=0.85)
+
+    return pos
+
+
+def _pack(boxes: List[Tuple[float, float]], gap: float) -> List[Tuple[float, float]]:
+    """
+    货架式排列各分量的包围盒（已按大小降序）：逐行从左到右放置，行宽取总面积的平方根与最宽者中的较大值
+
+    Returns:
+        每个包围盒左上角的坐标
+    """
+    area = sum((w + gap) * (h + gap) for w, h in boxes)
+    row_width = max(math.sqrt(area), max(w for w, _ in boxes))
+    offsets = []
+    x = y = row_height = 0.0
+    for w, h in boxes:
+        if x > 0 and x + w > row_width:
+            x, y = 0.0, y + row_height + gap
+            row_height = 0.0
+        offsets.append((x, y))
+        x += w + gap
+        row_height = max(row_height, h)
+    return offsets
+
+
+def multilevel_layout(
+    n: int,
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    ideal_length: float = 1.0,
+    seed: int = 42
+) -> "np.ndarray":
+    """
+    多层级力导向布局
+
+    各连通分量分别布局后再排列在一起：斥力只在局部计算，不连通的小分量
+    （包括孤立节点）放在一起布局时会被推到很远，使主体延拓时显得已经足够大而不再放大，
+    挤在一起的主体又让局部斥力的点对数暴涨。
+
+    Args:
+        n: 节点数
+        src/dst: 边的端点索引数组
+        ideal_length: 理想边长（输出坐标的单位）
+        seed: 随机种子（保证结果可复现）
+
+    Returns:
+        (n, 2) 的节点中心坐标
+    """
+    rng = np.random.default_rng(seed)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    components = _components(n, src, dst)
+    index = np.empty(n, dtype=np.int64)
+    owner = np.empty(n, dtype=np.int64)
+    for c, members in enumerate(components):
+        index[members] = np.arange(len(members))
+        owner[members] = c
+    edge_owner = owner[src]
+    edge_order = np.argsort(edge_owner, kind="stable")
+    edge_bounds = np.cumsum(np.bincount(edge_owner, minlength=len(components)))[:-1]
+
+    layouts, boxes = [], []
+    for members, edges in zip(components, np.split(edge_order, edge_bounds)):
+        pos = _layout_component(len(members), index[src[edges]], index[dst[edges]], ideal_length, rng)
+        pos -= pos.min(axis=0)
+        layouts.append(pos)
+        boxes.append(tuple(pos.max(axis=0).tolist()))
+
+    result = np.zeros((n, 2))
+    for members, pos, offset in zip(components, layouts, _pack(boxes, ideal_length)):
+        result[members] = pos + offset
+    return result
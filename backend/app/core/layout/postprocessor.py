@@ -1,7 +1,7 @@
 """
 布局后处理器 - 宽高平衡、美观优化
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from loguru import logger
 
 
@@ -13,12 +13,15 @@ class LayoutPostProcessor:
         self.max_nodes_per_layer = 4  # 每层最大节点数
         self.min_node_spacing = 200  # 最小节点间距
         self.min_layer_spacing = 250  # 最小层级间距
+        # 几何上精确摆放的布局（按层推开节点会破坏其形状），只做整体居中
+        self.exact_layouts = {"venn", "fishbone"}
     
     def process(
         self,
         layout_nodes: List[Dict[str, Any]],
         edges: List[Dict[str, Any]],
-        chart_type: str = "flowchart"
+        chart_type: str = "flowchart",
+        algorithm: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         后处理布局，优化美观度
@@ -27,16 +30,24 @@ class LayoutPostProcessor:
             layout_nodes: 布局后的节点列表
             edges: 边列表
             chart_type: 图表类型
+            algorithm: 实际使用的布局算法（LayoutEngine.last_metrics 中的 algorithm）
             
         Returns:
             优化后的节点列表
         """
         if not layout_nodes:
             return layout_nodes
+
+        # 有固定点 / 对齐约束的布局已经是用户指定的绝对位置，不再推开或平移
+        if any(node.get("constrained") for node in layout_nodes):
+            return layout_nodes
         
         # 1. 优化间距（防止重叠）
         # 注意：LayoutEngine 已经做了较好的分层和排序，PostProcessor 主要负责微调防止重叠
-        balanced_nodes = self._optimize_spacing(layout_nodes)
+        if algorithm in self.exact_layouts:
+            balanced_nodes = layout_nodes
+        else:
+            balanced_nodes = self._optimize_spacing(layout_nodes)
         
         # 2. 整体居中
         balanced_nodes = self._center_graph(balanced_nodes)
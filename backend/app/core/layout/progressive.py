@@ -0,0 +1,82 @@
+"""
+渐进式布局 - 结构流式生成期间的临时摆放
+
+LLM 逐步输出节点和边时，每收到新的完整节点就把它放到下一个空位：
+按到达顺序从左到右排成行，每行最多 ROW_SIZE 个，行高取该行最高的节点。
+已放置的节点永远不移动（预览不会跳动），每个新节点 O(1)。
+结构生成完后再用完整布局替换。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ROW_SIZE = 5
+GAP_X = 60.0
+GAP_Y = 80.0
+
+
+def _node_key(value: Any) -> Optional[str]:
+    """LLM 给出的 ID 可能是数字：与 ExcalidrawBuilder 一样统一为字符串"""
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+class ProgressiveLayout:
+    """增量放置器（只追加，不回退）"""
+
+    def __init__(self, measure):
+        """
+        Args:
+            measure: 节点 -> (宽, 高) 的尺寸估算函数（通常为 LayoutEngine._estimate_node_size）
+        """
+        self.measure = measure
+        self.placed: Dict[str, Dict[str, Any]] = {}
+        self.order: List[str] = []
+        self._cursor_x = 0.0
+        self._row_y = 0.0
+        self._row_height = 0.0
+        self._row_count = 0
+
+    def _next_slot(self, width: float, height: float) -> Tuple[float, float]:
+        if self._row_count >= ROW_SIZE:
+            self._row_y += self._row_height + GAP_Y
+            self._cursor_x = 0.0
+            self._row_height = 0.0
+            self._row_count = 0
+        x, y = self._cursor_x, self._row_y
+        self._cursor_x += width + GAP_X
+        self._row_height = max(self._row_height, height)
+        self._row_count += 1
+        return x, y
+
+    def add(self, nodes: List[Dict[str, Any]]) -> int:
+        """
+        放置尚未放置的节点
+
+        Returns:
+            新放置的节点数
+        """
+        added = 0
+        for node in nodes:
+            node_id = _node_key(node.get("id"))
+            if node_id is None or node_id in self.placed:
+                continue
+            width, height = self.measure(node)
+            x, y = self._next_slot(width, height)
+            self.placed[node_id] = {**node, "id": node_id, "x": x, "y": y, "width": width, "height": height}
+            self.order.append(node_id)
+            added += 1
+        return added
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        """按到达顺序返回已放置的节点"""
+        return [self.placed[node_id] for node_id in self.order]
+
+    def edges(self, edges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """只保留两端都已放置的边（端点 ID 与节点一样统一为字符串）"""
+        result = []
+        for edge in edges:
+            source, target = _node_key(edge.get("from")), _node_key(edge.get("to"))
+            if source in self.placed and target in self.placed:
+                result.append({**edge, "from": source, "to": target})
+        return result
@@ -0,0 +1,116 @@
+"""
+记录（分栏）节点 - ER 实体 / UML 类
+
+DSL 中 ER/CLASS 节点通过 props 携带 attributes / methods / pk / stereotype，
+这里把它们整理成「表头 + 若干分栏」的文本行，供布局引擎测量尺寸、由 Builder 绘制分栏。
+
+ER 图中以独立 attribute 节点（椭圆 + 连线）表示的属性，会被折叠进所属实体的属性栏，
+减少元素和连线数量，也让分层布局只处理实体之间的关系。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+RECORD_KINDS = {"entity", "class", "interface", "abstract_class"}
+ATTRIBUTE_KIND = "attribute"
+
+
+def _format_member(member: Any) -> str:
+    """属性/方法 -> 单行文本，支持字符串或 {name, type} 字典"""
+    if isinstance(member, dict):
+        name = str(member.get("name", ""))
+        member_type = member.get("type")
+        return f"{name}: {member_type}" if member_type else name
+    return str(member)
+
+
+def _member_name(member: Any) -> str:
+    if isinstance(member, dict):
+        return str(member.get("name", ""))
+    return str(member).split(":")[0].strip()
+
+
+def record_sections(node: Dict[str, Any]) -> Optional[Tuple[List[str], List[List[str]]]]:
+    """
+    节点的表头与分栏文本
+
+    Returns:
+        (表头行, [属性行, 方法行])；不是记录节点时返回 None
+    """
+    props = node.get("props") or {}
+    kind = str(node.get("kind", "")).lower()
+    attributes = props.get("attributes") or []
+    methods = props.get("methods") or []
+    if kind not in RECORD_KINDS and not attributes and not methods:
+        return None
+
+    header = [str(node.get("label", ""))]
+    stereotype = props.get("stereotype") or (kind if kind in ("interface", "abstract_class") else None)
+    if stereotype:
+        header.insert(0, f"«{stereotype}»")
+
+    pk = {str(name) for name in (props.get("pk") or [])}
+    attribute_lines = []
+    for member in attributes:
+        line = _format_member(member)
+        if _member_name(member) in pk or (isinstance(member, dict) and member.get("pk")):
+            line = f"PK {line}"
+        attribute_lines.append(line)
+
+    sections = [attribute_lines]
+    if methods or kind != "entity":
+        sections.append([_format_member(m) for m in methods])
+    return header, sections
+
+
+def fold_attributes(
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    把 ER 图中的独立属性节点折叠进所属实体的 props.attributes
+
+    只折叠恰好连到一个记录节点的属性节点；其余保持原样。
+
+    Returns:
+        (剩余节点, 剩余边)；被修改的实体节点是浅拷贝，不影响输入
+    """
+    by_id = {node.get("id"): node for node in nodes}
+    owners: Dict[Any, List[Any]] = {}
+    for edge in edges:
+        u, v = edge.get("from"), edge.get("to")
+        for attr, owner in ((u, v), (v, u)):
+            attr_node, owner_node = by_id.get(attr), by_id.get(owner)
+            if (
+                attr_node is not None and owner_node is not None
+                and str(attr_node.get("kind", "")).lower() == ATTRIBUTE_KIND
+                and str(owner_node.get("kind", "")).lower() in RECORD_KINDS
+            ):
+                owners.setdefault(attr, []).append(owner)
+
+    folded = {attr: targets[0] for attr, targets in owners.items() if len(set(targets)) == 1}
+    if not folded:
+        return nodes, edges
+
+    extra: Dict[Any, List[Any]] = {}
+    for attr, owner in folded.items():
+        attr_node = by_id[attr]
+        attr_props = attr_node.get("props") or {}
+        member = {"name": attr_node.get("label", ""), "type": attr_props.get("type"), "pk": attr_props.get("pk")}
+        extra.setdefault(owner, []).append(member)
+
+    result = []
+    for node in nodes:
+        node_id = node.get("id")
+        if node_id in folded:
+            continue
+        if node_id in extra:
+            props = dict(node.get("props") or {})
+            props["attributes"] = list(props.get("attributes") or []) + extra[node_id]
+            node = {**node, "props": props}
+        result.append(node)
+
+    remaining = [
+        edge for edge in edges
+        if edge.get("from") not in folded and edge.get("to") not in folded
+    ]
+    return result, remaining
@@ -0,0 +1,326 @@
+"""
+布局算法选择器 - 根据图统计特征自动选择布局算法
+
+`compute_graph_stats` 在一次遍历边列表的过程中同时得到：
+森林判定、度数、连通分量（并查集），再用一次 Kahn 拓扑排序完成 DAG 判定。
+`select_layout` 根据统计结果，从 `LAYOUT_REGISTRY` 中选出「适用且代价最低」的布局实现。
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.layout.multilevel import HAS_NUMPY
+
+
+@dataclass
+class GraphStats:
+    """图的廉价统计特征"""
+
+    node_count: int
+    edge_count: int
+    is_forest: bool  # 视为无向图时是否无环
+    is_dag: bool  # 有向图是否无环
+    density: float  # E / (V * (V - 1))
+    max_degree: int
+    component_count: int
+    largest_component: int
+
+    @property
+    def avg_degree(self) -> float:
+        """平均度数"""
+        if not self.node_count:
+            return 0.0
+        return 2.0 * self.edge_count / self.node_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["avg_degree"] = round(self.avg_degree, 3)
+        data["density"] = round(self.density, 5)
+        return data
+
+
+def compute_graph_stats(
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]]
+) -> GraphStats:
+    """
+    计算图统计特征（O(V + E)）
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表
+
+    Returns:
+        GraphStats
+    """
+    index = {}
+    for node in nodes:
+        node_id = node.get("id")
+        if node_id not in index:
+            index[node_id] = len(index)
+    n = len(index)
+
+    parent = list(range(n))
+    size = [1] * n
+    degree = [0] * n
+    in_degree = [0] * n
+    adj: List[List[int]] = [[] for _ in range(n)]
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    edge_count = 0
+    is_forest = True
+    components = n
+
+    # 单次遍历：度数 + 并查集（连通分量 / 森林判定）+ 邻接表
+    for edge in edges:
+        u = index.get(edge.get("from"))
+        v = index.get(edge.get("to"))
+        if u is None or v is None:
+            continue
+        edge_count += 1
+        degree[u] += 1
+        degree[v] += 1
+        in_degree[v] += 1
+        adj[u].append(v)
+
+        ru, rv = find(u), find(v)
+        if ru == rv:
+            # 同一分量内再加一条边（含自环、重边）即出现无向环
+            is_forest = False
+        else:
+            if size[ru] < size[rv]:
+                ru, rv = rv, ru
+            parent[rv] = ru
+            size[ru] += size[rv]
+            components -= 1
+
+    # DAG 判定：森林一定是 DAG，否则跑一次 Kahn 拓扑排序
+    if is_forest:
+        is_dag = True
+    else:
+        queue = [i for i in range(n) if in_degree[i] == 0]
+        visited = 0
+        while queue:
+            u = queue.pop()
+            visited += 1
+            for v in adj[u]:
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    queue.append(v)
+        is_dag = visited == n
+
+    largest = max((size[i] for i in range(n) if parent[i] == i), default=0)
+    density = edge_count / (n * (n - 1)) if n > 1 else 0.0
+
+    return GraphStats(
+        node_count=n,
+        edge_count=edge_count,
+        is_forest=is_forest,
+        is_dag=is_dag,
+        density=density,
+        max_degree=max(degree, default=0),
+        component_count=components,
+        largest_component=largest,
+    )
+
+
+def _is_dense(stats: GraphStats) -> bool:
+    """稠密图：平均度数较高或边密度较高（分层布局会产生大量交叉与虚拟节点）"""
+    return stats.avg_degree > 6 or (stats.node_count > 8 and stats.density > 0.25)
+
+
+@dataclass
+class LayoutSpec:
+    """
+    布局实现的注册信息
+
+    - name: 注册名
+    - method: LayoutEngine 上的实现方法名
+    - chart_types: 默认使用该布局的图表类型
+    - cost: 代价估计函数（大致的操作次数，只用于相互比较）
+    - suits: 适用性判定函数
+    - general: 是否为通用算法（自动选择时只考虑通用算法，专用布局如韦恩图依赖语义）
+    - templatable: 结果是否只取决于拓扑和节点尺寸（可按结构哈希复用布局模板）
+    """
+
+    name: str
+    method: str
+    chart_types: Tuple[str, ...]
+    cost: Callable[[GraphStats], float]
+    suits: Callable[[GraphStats], bool]
+    general: bool = True
+    templatable: bool = True
+
+
+LAYOUT_REGISTRY: Dict[str, LayoutSpec] = {}
+
+
+def register_layout(spec: LayoutSpec) -> LayoutSpec:
+    """注册一个布局实现"""
+    LAYOUT_REGISTRY[spec.name] = spec
+    return spec
+
+
+def get_layout_spec(name: str) -> Optional[LayoutSpec]:
+    """按名称获取布局实现"""
+    return LAYOUT_REGISTRY.get(name)
+
+
+# 分层布局 (Sugiyama)：无环、不太稠密时效果最好；代价主要来自虚拟节点和 4 轮重心排序，
+# 有环时 BFS 分层会产生大量跨层边，虚拟节点数大致随图直径（~√V）增长
+register_layout(LayoutSpec(
+    name="hierarchical",
+    method="_hierarchical_layout",
+    chart_types=("flowchart", "tree", "orgchart"),
+    cost=lambda s: 8.0 * (s.node_count + 2 * s.edge_count) * (1 if s.is_dag else math.sqrt(s.node_count)),
+    suits=lambda s: s.is_forest or (not _is_dense(s) and (s.is_dag or s.edge_count <= 2 * s.node_count)),
+))
+
+# 径向布局：思维导图专用
+register_layout(LayoutSpec(
+    name="radial",
+    method="_radial_layout",
+    chart_types=("mindmap",),
+    cost=lambda s: float(s.node_count),
+    suits=lambda s: True,
+    general=False,
+))
+
+# 力导向布局 (networkx spring_layout)：O(V^2) 每轮，50 轮
+register_layout(LayoutSpec(
+    name="force",
+    method="_force_directed_layout",
+    chart_types=("network", "architecture", "dataflow"),
+    cost=lambda s: 50.0 * s.node_count * s.node_count,
+    suits=lambda s: not s.is_forest and s.node_count <= 1500,
+))
+
+# 多层级力导向布局 (FM³ 风格)：每层 O(V + E)，层数 O(log V)；只在大图上启用
+register_layout(LayoutSpec(
+    name="multilevel_force",
+    method="_multilevel_force_layout",
+    chart_types=("network", "architecture", "dataflow"),
+    cost=lambda s: 40.0 * (s.node_count + s.edge_count) * math.log2(max(s.node_count, 2)),
+    suits=lambda s: HAS_NUMPY and s.node_count >= 300,
+))
+
+# 稀疏应力布局 (Pivot MDS + 稀疏应力优化)：O(k·(V+E)) 初始化 + 每轮 O(E + k·V)，保持图距离
+register_layout(LayoutSpec(
+    name="stress",
+    method="_stress_layout",
+    chart_types=("concept", "state", "network"),
+    cost=lambda s: 50.0 * (s.node_count + s.edge_count) + 60.0 * (4 * s.edge_count + 50 * s.node_count),
+    suits=lambda s: HAS_NUMPY and not s.is_forest,
+))
+
+# 韦恩图布局：依赖集合/元素语义
+register_layout(LayoutSpec(
+    name="venn",
+    method="_venn_layout",
+    chart_types=("venn",),
+    cost=lambda s: float(s.node_count),
+    suits=lambda s: True,
+    general=False,
+    templatable=False,
+))
+
+# 记录式布局：ER 图 / 类图，属性折叠进实体分栏后对实体做分层布局
+register_layout(LayoutSpec(
+    name="record",
+    method="_record_layout",
+    chart_types=("er", "class"),
+    cost=lambda s: 8.0 * (s.node_count + 2 * s.edge_count) * (1 if s.is_dag else math.sqrt(s.node_count)),
+    suits=lambda s: True,
+    general=False,
+    templatable=False,
+))
+
+# 鱼骨图布局：依赖「鱼头 - 类别 - 原因」语义，O(V)
+register_layout(LayoutSpec(
+    name="fishbone",
+    method="_fishbone_layout",
+    chart_types=("fishbone",),
+    cost=lambda s: float(s.node_count + s.edge_count),
+    suits=lambda s: True,
+    general=False,
+    templatable=False,
+))
+
+# 网格布局：兜底，任何图都能放下
+register_layout(LayoutSpec(
+    name="grid",
+    method="_grid_layout",
+    chart_types=(),
+    cost=lambda s: 1e12,
+    suits=lambda s: True,
+))
+
+DEFAULT_LAYOUT = "hierarchical"
+
+# 选择结果计数（进程级指标）
+LAYOUT_SELECTION_COUNTS: Counter = Counter()
+
+
+def _cheapest(candidates: List[LayoutSpec], stats: GraphStats) -> Optional[LayoutSpec]:
+    suitable = [spec for spec in candidates if spec.suits(stats)]
+    if not suitable:
+        return None
+    return min(suitable, key=lambda spec: spec.cost(stats))
+
+
+def select_layout(stats: GraphStats, chart_type: Optional[str] = None) -> Tuple[str, str]:
+    """
+    选择布局算法
+
+    规则：
+    1. 图表类型有对应的布局实现且适用 -> 在其中选代价最低的
+    2. 否则（auto / 未知类型 / 类型与图结构不符）-> 在所有通用算法中选适用且代价最低的
+    3. 都不适用 -> 默认分层布局
+
+    Args:
+        stats: 图统计特征
+        chart_type: 图表类型（可为 auto 或 None）
+
+    Returns:
+        (布局名称, 选择原因)
+    """
+    if chart_type and chart_type != "auto":
+        by_type = [spec for spec in LAYOUT_REGISTRY.values() if chart_type in spec.chart_types]
+        spec = _cheapest(by_type, stats)
+        if spec:
+            return spec.name, f"chart_type={chart_type}"
+        if by_type:
+            reason = f"chart_type={chart_type} 对应布局不适用于该图"
+        else:
+            reason = f"chart_type={chart_type} 无专用布局"
+    else:
+        reason = "auto"
+
+    spec = _cheapest([s for s in LAYOUT_REGISTRY.values() if s.general], stats)
+    if spec:
+        return spec.name, f"{reason}，按图统计选择"
+    return DEFAULT_LAYOUT, f"{reason}，使用默认布局"
+
+
+def record_selection(name: str, reason: str, stats: GraphStats) -> None:
+    """记录选择结果（日志 + 计数指标）"""
+    LAYOUT_SELECTION_COUNTS[name] += 1
+    logger.info(
+        f"布局选择: {name}（{reason}）| V={stats.node_count} E={stats.edge_count} "
+        f"forest={stats.is_forest} dag={stats.is_dag} density={stats.density:.4f} "
+        f"max_degree={stats.max_degree} components={stats.component_count} "
+        f"largest={stats.largest_component}"
+    )
+
+
+def get_selection_counts() -> Dict[str, int]:
+    """获取各布局算法被选中的次数"""
+    return dict(LAYOUT_SELECTION_COUNTS)
@@ -0,0 +1,269 @@
+"""
+稀疏应力布局（Pivot MDS 初始化 + 稀疏应力优化）- 适用于概念图、状态图、网络图
+
+流程：
+1. 选取 k 个枢轴（最远点优先），从每个枢轴做一次 BFS，得到 n×k 的图距离矩阵，O(k·(V+E))
+2. Pivot MDS：对距离平方矩阵做双中心化，取 k×k 矩阵的前两个特征向量得到初始坐标
+3. 稀疏应力优化：只保留「边」和「节点-枢轴」两类应力项，
+   枢轴项按该枢轴负责的区域大小加权，近似完整的 O(V²) 应力函数；
+   用 Jacobi 式的局部化迭代更新，迭代次数有上限
+
+所有步骤都用 NumPy 向量化，图距离以边数计，输出坐标乘以理想边长。
+"""
+from typing import List, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    np = None
+
+
+DEFAULT_PIVOTS = 50  # 枢轴数量
+MAX_ITERATIONS = 60  # 应力迭代上限
+TOLERANCE = 1e-4  # 相对应力变化低于该值时提前结束
+
+
+def _csr(n: int, src: "np.ndarray", dst: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """无向图 CSR 邻接"""
+    u = np.concatenate([src, dst])
+    v = np.concatenate([dst, src])
+    order = np.argsort(u, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=n), out=indptr[1:])
+    return indptr, v[order]
+
+
+def _bfs(indptr: "np.ndarray", indices: "np.ndarray", source: int) -> "np.ndarray":
+    """按层向量化的 BFS，返回到各节点的跳数（不可达为 inf）"""
+    n = len(indptr) - 1
+    dist = np.full(n, np.inf)
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while len(frontier):
+        level += 1
+        counts = indptr[frontier + 1] - indptr[frontier]
+        total = int(counts.sum())
+        if not total:
+            break
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        neighbors = indices[np.repeat(indptr[frontier], counts) + offset]
+        neighbors = np.unique(neighbors[np.isinf(dist[neighbors])])
+        dist[neighbors] = level
+        frontier = neighbors
+    return dist
+
+
+def _pivot_distances(
+    indptr: "np.ndarray",
+    indices: "np.ndarray",
+    num_pivots: int
+) -> Tuple[List[int], "np.ndarray"]:
+    """最远点优先选取枢轴，返回 (枢轴列表, n×k 距离矩阵)"""
+    n = len(indptr) - 1
+    degree = indptr[1:] - indptr[:-1]
+    pivots = [int(np.argmax(degree))]
+    columns = []
+    nearest = np.full(n, np.inf)
+    for _ in range(num_pivots):
+        dist = _bfs(indptr, indices, pivots[-1])
+        columns.append(dist)
+        nearest = np.minimum(nearest, dist)
+        if len(pivots) == num_pivots:
+            break
+        # 下一个枢轴：离已有枢轴最远的节点（优先选不可达分量中的节点）
+        candidate = int(np.argmax(np.where(np.isinf(nearest), np.finfo(float).max, nearest)))
+        if nearest[candidate] == 0:
+            break
+        pivots.append(candidate)
+    return pivots, np.stack(columns, axis=1)
+
+
+def _pivot_mds(dist: "np.ndarray", rng: "np.random.Generator") -> "np.ndarray":
+    """Pivot MDS 初始化"""
+    d2 = dist ** 2
+    centered = d2 - d2.mean(axis=0)[None, :] - d2.mean(axis=1)[:, None] + d2.mean()
+    centered *= -0.5
+    if dist.shape[1] < 2:
+        return rng.uniform(-1, 1, size=(dist.shape[0], 2)) * max(dist.max(), 1.0)
+    # C^T C 是 k×k 的小矩阵，特征分解代价可忽略
+    values, vectors = np.linalg.eigh(centered.T @ centered)
+    top = vectors[:, np.argsort(values)[::-1][:2]]
+    return centered @ top
+
+
+def _components(n: int, src: "np.ndarray", dst: "np.ndarray") -> "np.ndarray":
+    """并查集求连通分量标签"""
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in zip(src.tolist(), dst.tolist()):
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    roots = np.asarray([find(i) for i in range(n)])
+    return np.unique(roots, return_inverse=True)[1]
+
+
+def _pack_components(parts: List["np.ndarray"], gap: float = 1.0) -> List["np.ndarray"]:
+    """按面积从大到小把各分量的布局排成若干行（货架式装箱）"""
+    boxes = []
+    for pos in parts:
+        lo = pos.min(axis=0)
+        boxes.append((pos - lo, pos.max(axis=0) - lo))
+    row_width = max(
+        float(np.sqrt(sum((w + gap) * (h + gap) for _, (w, h) in boxes))),
+        max(w for _, (w, _h) in boxes)
+    )
+
+    order = sorted(range(len(parts)), key=lambda i: -boxes[i][1][1])
+    placed: List["np.ndarray"] = [None] * len(parts)
+    x = y = row_height = 0.0
+    for i in order:
+        local, (w, h) = boxes[i]
+        if x > 0 and x + w > row_width:
+            x, y = 0.0, y + row_height + gap
+            row_height = 0.0
+        placed[i] = local + np.array([x, y])
+        x += w + gap
+        row_height = max(row_height, h)
+    return placed
+
+
+def _sibling_terms(indptr: "np.ndarray", indices: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    同一节点相邻两个邻居之间的应力项（图距离按 2 计）
+
+    稀疏应力里兄弟叶子到所有枢轴的距离完全相同，会被压到同一点；
+    给每个节点的邻居串一条链（O(E) 项），足以把它们沿父节点周围分开。
+    """
+    slot = np.arange(len(indices) - 1)
+    owner_end = np.repeat(indptr[1:], indptr[1:] - indptr[:-1])[:-1]
+    chain = slot + 1 < owner_end
+    return indices[slot[chain]], indices[slot[chain] + 1]
+
+
+def _component_layout(
+    n: int,
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    num_pivots: int,
+    max_iterations: int,
+    rng: "np.random.Generator"
+) -> "np.ndarray":
+    """单个连通分量的稀疏应力布局（边长单位为 1）"""
+    if n == 1:
+        return np.zeros((1, 2))
+    indptr, indices = _csr(n, src, dst)
+
+    # 1. 枢轴 BFS
+    pivots, dist = _pivot_distances(indptr, indices, min(num_pivots, n))
+
+    # 2. Pivot MDS 初始化，缩放到「边长约为 1」
+    pos = _pivot_mds(dist, rng)
+    pos += rng.uniform(-1e-3, 1e-3, size=pos.shape)
+    edge_len = np.sqrt(((pos[src] - pos[dst]) ** 2).sum(axis=1)).mean()
+    if edge_len > 1e-9:
+        pos /= edge_len
+
+    # 3. 稀疏应力项：边（d=1）+ 兄弟链（d=2）+ 节点到枢轴（d=图距离，按枢轴负责的区域大小加权）
+    region = np.argmin(dist, axis=1)  # 每个节点最近的枢轴
+    region_size = np.bincount(region, minlength=len(pivots)).astype(float)
+    ii, pp = np.nonzero(dist > 0)
+    pivot_ids = np.asarray(pivots)[pp]
+    d_pivot = dist[ii, pp]
+    w_pivot = region_size[pp] / d_pivot ** 2
+    sib_a, sib_b = _sibling_terms(indptr, indices)
+
+    term_i = np.concatenate([src, dst, sib_a, sib_b, ii])
+    term_j = np.concatenate([dst, src, sib_b, sib_a, pivot_ids])
+    term_d = np.concatenate([np.ones(2 * len(src)), np.full(2 * len(sib_a), 2.0), d_pivot])
+    term_w = np.concatenate([np.ones(2 * len(src)), np.full(2 * len(sib_a), 0.25), w_pivot])
+    weight_sum = np.bincount(term_i, weights=term_w, minlength=n)
+
+    def stress(p: "np.ndarray") -> float:
+        length = np.sqrt(((p[term_i] - p[term_j]) ** 2).sum(axis=1))
+        return float((term_w * (length - term_d) ** 2).sum())
+
+    # 4. 局部化应力优化（Jacobi 更新）
+    current = stress(pos)
+    for _ in range(max_iterations):
+        delta = pos[term_i] - pos[term_j]
+        length = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        target = pos[term_j] + delta * (term_d / length)[:, None]
+        new_pos = np.empty_like(pos)
+        for axis in (0, 1):
+            new_pos[:, axis] = np.bincount(term_i, weights=term_w * target[:, axis], minlength=n) / weight_sum
+        pos = new_pos
+
+        updated = stress(pos)
+        if current - updated < TOLERANCE * max(current, 1e-12):
+            break
+        current = updated
+    return pos
+
+
+def stress_layout(
+    n: int,
+    src: "np.ndarray",
+    dst: "np.ndarray",
+    ideal_length: float = 1.0,
+    num_pivots: int = DEFAULT_PIVOTS,
+    max_iterations: int = MAX_ITERATIONS,
+    seed: int = 42
+) -> "np.ndarray":
+    """
+    稀疏应力布局
+
+    各连通分量分别布局，再按货架式装箱排列（分量之间没有图距离可言）。
+
+    Args:
+        n: 节点数
+        src/dst: 边的端点索引数组
+        ideal_length: 理想边长（输出坐标的单位）
+        num_pivots: 枢轴数量
+        max_iterations: 应力迭代上限
+        seed: 随机种子
+
+    Returns:
+        (n, 2) 的节点中心坐标
+    """
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    labels = _components(n, src, dst)
+    count = int(labels.max()) + 1 if n else 0
+    if count <= 1:
+        return _component_layout(n, src, dst, num_pivots, max_iterations, rng) * ideal_length
+
+    # 全局下标 -> 分量内下标
+    order = np.argsort(labels, kind="stable")
+    sizes = np.bincount(labels, minlength=count)
+    local = np.empty(n, dtype=np.int64)
+    local[order] = np.arange(n) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    edge_label = labels[src]
+
+    members = np.split(order, np.cumsum(sizes)[:-1])
+    parts = []
+    for c, nodes in enumerate(members):
+        mask = edge_label == c
+        parts.append(_component_layout(
+            len(nodes), local[src[mask]], local[dst[mask]], num_pivots, max_iterations, rng
+        ))
+
+    pos = np.empty((n, 2))
+    for nodes, placed in zip(members, _pack_components(parts)):
+        pos[nodes] = placed
+    return pos * ideal_length
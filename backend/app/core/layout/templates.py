@@ -0,0 +1,203 @@
+"""
+布局模板 - 基于 Weisfeiler-Lehman 结构哈希复用布局
+
+很多请求生成的是同一种拓扑，只是标签不同（如 5 步的线性流程、3 层的组织架构树）。
+布局之前先计算 (图表类型, 布局算法, 拓扑, 节点尺寸档位) 的 WL 哈希：
+1. 初始颜色 = 形状 + 尺寸档位
+2. 每轮用「自身颜色 + 出邻居颜色多重集 + 入邻居颜色多重集」细化颜色，直到划分不再变细，
+   哈希 = 稳定颜色多重集 + 边数
+3. 从颜色最小的节点出发、按邻居颜色顺序做 BFS，得到规范顺序
+
+命中模板时按规范顺序对应节点，并校验规范化后的边集与模板完全一致
+（WL 对少数非同构图会给出相同颜色，边集一致才说明对应关系是同构映射），
+再把模板中的中心坐标按当前节点的实际尺寸缩放，跳过布局计算。
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+MAX_ROUNDS = 16  # WL 细化轮数上限
+SIZE_STEP = (80.0, 40.0)  # 尺寸档位（宽、高）
+TEMPLATE_CAPACITY = 2048
+TEMPLATE_MAX_NODES = 200  # 只对常见的中小图使用模板（大图的哈希代价与布局本身相当）
+
+
+def _digest(text: str) -> str:
+    # 不能用内置 hash()：字符串哈希按进程加盐，模板需要跨进程一致
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _refine(colors: List[str], out_adj: List[List[int]], in_adj: List[List[int]]) -> List[str]:
+    """WL 颜色细化：用「自身颜色 + 出/入邻居颜色多重集」迭代，直到划分不再变细"""
+    classes = len(set(colors))
+    for _ in range(MAX_ROUNDS):
+        refined = [
+            _digest(
+                colors[i]
+                + "|" + ",".join(sorted(colors[j] for j in out_adj[i]))
+                + "|" + ",".join(sorted(colors[j] for j in in_adj[i]))
+            )
+            for i in range(len(colors))
+        ]
+        refined_classes = len(set(refined))
+        colors = refined
+        if refined_classes == classes:
+            break
+        classes = refined_classes
+    return colors
+
+
+@dataclass
+class StructureKey:
+    """结构哈希及其规范顺序"""
+
+    key: str
+    order: List[int]  # 规范位置 -> 节点下标
+    edges: Tuple[Tuple[int, int], ...]  # 规范化后的边（规范位置对），已排序
+
+
+@dataclass
+class LayoutTemplate:
+    """一份布局模板：规范顺序下的中心坐标与当时的节点尺寸"""
+
+    edges: Tuple[Tuple[int, int], ...]
+    centers: List[Tuple[float, float]]
+    sizes: List[Tuple[float, float]]
+
+
+def structure_key(
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]],
+    chart_type: str,
+    algorithm: str
+) -> StructureKey:
+    """
+    计算结构的 WL 哈希（与节点 ID、标签文本无关），O(轮数 · (V + E))
+
+    Args:
+        nodes: 节点列表（需已带 width/height）
+        edges: 边列表
+        chart_type: 图表类型
+        algorithm: 布局算法
+
+    Returns:
+        StructureKey
+    """
+    n = len(nodes)
+    index = {node.get("id"): i for i, node in enumerate(nodes)}
+    out_adj: List[List[int]] = [[] for _ in range(n)]
+    in_adj: List[List[int]] = [[] for _ in range(n)]
+    pairs = []
+    for edge in edges:
+        u, v = index.get(edge.get("from")), index.get(edge.get("to"))
+        if u is None or v is None:
+            continue
+        out_adj[u].append(v)
+        in_adj[v].append(u)
+        pairs.append((u, v))
+
+    colors = _refine([
+        f"{node.get('shape', 'rectangle')}:"
+        f"{int(node.get('width', 200) // SIZE_STEP[0])}x{int(node.get('height', 80) // SIZE_STEP[1])}"
+        for node in nodes
+    ], out_adj, in_adj)
+    key = _digest(f"{chart_type}|{algorithm}|{len(pairs)}|" + ",".join(sorted(colors)))
+
+    # 规范顺序：从颜色最小的节点开始 BFS，邻居按 (方向, 颜色) 访问。
+    # 同色节点（如兄弟叶子）按输入顺序并列，它们的子树随之整体排在后面，
+    # 对称结构在不同输入顺序下得到相同的规范边集
+    seen = [False] * n
+    order: List[int] = []
+    for start in sorted(range(n), key=lambda i: (colors[i], i)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        order.append(start)
+        head = len(order) - 1
+        while head < len(order):
+            u = order[head]
+            head += 1
+            neighbors = sorted(
+                [(0, colors[v], v) for v in out_adj[u]] + [(1, colors[v], v) for v in in_adj[u]]
+            )
+            for _, _, v in neighbors:
+                if not seen[v]:
+                    seen[v] = True
+                    order.append(v)
+
+    rank = {node: position for position, node in enumerate(order)}
+    canonical_edges = tuple(sorted((rank[u], rank[v]) for u, v in pairs))
+    return StructureKey(key=key, order=order, edges=canonical_edges)
+
+
+class TemplateStore:
+    """结构哈希 -> 布局模板（进程内 LRU）"""
+
+    def __init__(self, capacity: int = TEMPLATE_CAPACITY):
+        self.capacity = capacity
+        self._templates: "OrderedDict[str, LayoutTemplate]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self,
+        skey: StructureKey,
+        nodes: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """查找模板并按当前节点尺寸还原布局；未命中（或边集校验失败）返回 None"""
+        template = self._templates.get(skey.key)
+        if template is None or template.edges != skey.edges:
+            self.misses += 1
+            return None
+        self._templates.move_to_end(skey.key)
+        self.hits += 1
+
+        # 尺寸档位相同但实际尺寸略有差异：按平均尺寸的比例缩放坐标
+        ordered = [nodes[i] for i in skey.order]
+        scale = []
+        for axis, key in ((0, "width"), (1, "height")):
+            old = sum(size[axis] for size in template.sizes) / len(template.sizes)
+            new = sum(node.get(key, 200 if axis == 0 else 80) for node in ordered) / len(ordered)
+            scale.append(new / old if old else 1.0)
+
+        result = []
+        for node, (cx, cy) in zip(ordered, template.centers):
+            width, height = node.get("width", 200), node.get("height", 80)
+            result.append({
+                **node,
+                "x": float(cx * scale[0] - width / 2),
+                "y": float(cy * scale[1] - height / 2),
+            })
+        # 保持与输入相同的节点顺序
+        position = {i: p for p, i in enumerate(skey.order)}
+        return [result[position[i]] for i in range(len(nodes))]
+
+    def store(
+        self,
+        skey: StructureKey,
+        nodes: List[Dict[str, Any]],
+        layout_nodes: List[Dict[str, Any]]
+    ) -> None:
+        """保存布局结果为模板（布局结果必须与输入节点一一对应）"""
+        by_id = {node.get("id"): node for node in layout_nodes}
+        centers, sizes = [], []
+        for i in skey.order:
+            placed = by_id.get(nodes[i].get("id"))
+            if placed is None:
+                return
+            width, height = placed.get("width", 200), placed.get("height", 80)
+            centers.append((placed["x"] + width / 2, placed["y"] + height / 2))
+            sizes.append((width, height))
+        self._templates[skey.key] = LayoutTemplate(edges=skey.edges, centers=centers, sizes=sizes)
+        self._templates.move_to_end(skey.key)
+        while len(self._templates) > self.capacity:
+            self._templates.popitem(last=False)
+        logger.debug(f"布局模板: 保存 {skey.key}（共 {len(self._templates)} 个）")
+
+
+# 进程级模板库（LayoutEngine 按请求创建，模板需要跨请求共享）
+TEMPLATE_STORE = TemplateStore()
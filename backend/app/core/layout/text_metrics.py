@@ -0,0 +1,37 @@
+"""
+文本度量 - 不依赖字体文件的近似文本尺寸
+
+布局（节点尺寸估算）、场景输出（绑定文本的宽高）与 SVG 渲染共用同一套估算，
+保证三者对同一段文本给出一致的尺寸。
+"""
+from typing import Tuple
+
+
+CHAR_WIDTH = 0.5  # 1 个宽度单位对应的字号倍数
+LINE_HEIGHT = 1.25  # Excalidraw 默认行高（字号倍数）
+
+
+def text_units(line: str) -> float:
+    """文本行的宽度单位（半角字符计 1.1，宽字符如汉字计 2）"""
+    units = 0.0
+    for char in line:
+        # 简单判断是否为宽字符（如汉字）
+        if '\u4e00' <= char <= '\u9fff':
+            units += 2
+        else:
+            units += 1.1
+    return units
+
+
+def measure_text(text: str, font_size: float, line_height: float = LINE_HEIGHT) -> Tuple[float, float]:
+    """
+    估算多行文本的 (宽, 高)
+
+    Args:
+        text: 文本（按 \\n 分行）
+        font_size: 字号
+        line_height: 行高（字号倍数）
+    """
+    lines = text.split("\n")
+    width = max(text_units(line) for line in lines) * font_size * CHAR_WIDTH
+    return width, len(lines) * font_size * line_height
@@ -0,0 +1,214 @@
+"""
+面积比例韦恩图布局
+
+1. 圆面积与集合基数成正比（每个元素预留一个格子的面积）
+2. 两两圆心距离：按目标交集面积用二分法求解透镜面积方程
+3. 圆心位置：对「距离等式（有交集）/ 距离下界（无交集）」做小规模梯度下降
+4. 元素放置：在预先生成的网格点上做向量化的「点在圆内」测试，
+   得到每个网格点所属区域的位掩码，每个元素放到与其所属集合掩码相同的区域中，
+   优先靠近区域中心；区域容量不足时整体放大后重试
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    np = None
+
+
+MIN_RADIUS = 120.0
+EMPTY_OVERLAP_RATIO = 0.3  # 没有任何元素时，相邻集合按较小圆面积的该比例重叠（保持经典韦恩图外观）
+CAPACITY_FACTOR = 2.5  # 区域面积相对于元素格子总面积的冗余倍数（区域形状不规则，不可能铺满）
+MAX_RETRIES = 6
+GROWTH = 1.25
+
+
+def lens_area(r1: float, r2: float, d: float) -> float:
+    """两圆相交部分（透镜）的面积"""
+    if d >= r1 + r2:
+        return 0.0
+    if d <= abs(r1 - r2):
+        return math.pi * min(r1, r2) ** 2
+    a1 = math.acos(max(-1.0, min(1.0, (d * d + r1 * r1 - r2 * r2) / (2 * d * r1))))
+    a2 = math.acos(max(-1.0, min(1.0, (d * d + r2 * r2 - r1 * r1) / (2 * d * r2))))
+    k = (-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2)
+    return r1 * r1 * a1 + r2 * r2 * a2 - 0.5 * math.sqrt(max(k, 0.0))
+
+
+def distance_for_overlap(r1: float, r2: float, target: float) -> float:
+    """二分求解使透镜面积等于 target 的圆心距离（面积随距离单调递减）"""
+    full = math.pi * min(r1, r2) ** 2
+    if target <= 0:
+        return r1 + r2
+    if target >= full:
+        # 子集：小圆完全落在大圆内
+        return abs(r1 - r2) * 0.5
+    lo, hi = abs(r1 - r2), r1 + r2
+    for _ in range(50):
+        mid = (lo + hi) / 2
+        if lens_area(r1, r2, mid) > target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def _solve_centers(
+    radii: List[float],
+    distances: Dict[Tuple[int, int], Tuple[float, bool]],
+    iterations: int = 400
+) -> "np.ndarray":
+    """
+    梯度下降求圆心
+
+    distances: (i, j) -> (目标距离, 是否只是下界)
+    """
+    n = len(radii)
+    if n == 1:
+        return np.zeros((1, 2))
+    spread = sum(radii) / n
+    angles = 2 * np.pi * np.arange(n) / n - np.pi / 2
+    pos = np.stack([np.cos(angles), np.sin(angles)], axis=1) * spread
+
+    pairs = np.array(list(distances.keys()), dtype=np.int64)
+    target = np.array([d for d, _ in distances.values()])
+    lower_only = np.array([flag for _, flag in distances.values()])
+    step = 0.2
+    for _ in range(iterations):
+        delta = pos[pairs[:, 0]] - pos[pairs[:, 1]]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-6)
+        error = dist - target
+        error[lower_only & (error > 0)] = 0  # 无交集的集合只要求足够远
+        grad = delta * (error / dist)[:, None]
+        move = np.zeros_like(pos)
+        np.add.at(move, pairs[:, 0], -grad)
+        np.add.at(move, pairs[:, 1], grad)
+        pos += step * move
+    return pos - pos.mean(axis=0)
+
+
+def _region_masks(
+    points: "np.ndarray",
+    centers: "np.ndarray",
+    radii: "np.ndarray",
+    half: "np.ndarray"
+) -> "np.ndarray":
+    """
+    计算网格点所属区域的位掩码（向量化的点在圆内测试）
+
+    以网格点为中心、半尺寸为 half 的元素框必须完整落在所属圆内（最远角在圆内）、
+    与其他圆完全不相交（最近点在圆外）；压在任一圆边界上的点标记为 -1（不可用）。
+    """
+    offset = np.abs(points[None, :, :] - centers[:, None, :])
+    farthest = ((offset + half) ** 2).sum(axis=2)
+    nearest = (np.maximum(offset - half, 0) ** 2).sum(axis=2)
+    r2 = (radii ** 2)[:, None]
+    inside = farthest <= r2
+    outside = nearest >= r2
+    bits = (1 << np.arange(len(radii), dtype=np.int64))[:, None]
+    masks = (inside * bits).sum(axis=0)
+    masks[~(inside | outside).all(axis=0)] = -1
+    return masks
+
+
+def venn_layout(
+    set_count: int,
+    memberships: List[int],
+    cell: Tuple[float, float]
+) -> Tuple["np.ndarray", "np.ndarray", List[Optional[Tuple[float, float]]]]:
+    """
+    面积比例韦恩图布局
+
+    Args:
+        set_count: 集合数量
+        memberships: 每个元素所属集合的位掩码（0 表示不属于任何集合）
+        cell: 元素格子尺寸 (宽, 高)，已含间距
+
+    Returns:
+        (圆心数组, 半径数组, 每个元素的中心坐标；放不下时为 None)
+    """
+    cell_w, cell_h = cell
+    cell_area = cell_w * cell_h
+    masks = np.asarray(memberships, dtype=np.int64) if memberships else np.zeros(0, dtype=np.int64)
+
+    bits = 1 << np.arange(set_count, dtype=np.int64)
+    member_of = (masks[:, None] & bits[None, :]) > 0 if len(masks) else np.zeros((0, set_count), bool)
+    cardinality = member_of.sum(axis=0)
+    has_members = bool(cardinality.sum())
+
+    radii = np.sqrt(np.maximum(cardinality, 1) * cell_area * CAPACITY_FACTOR / math.pi)
+    radii = np.maximum(radii, MIN_RADIUS)
+
+    # 两两目标距离
+    distances: Dict[Tuple[int, int], Tuple[float, bool]] = {}
+    for i in range(set_count):
+        for j in range(i + 1, set_count):
+            r1, r2 = float(radii[i]), float(radii[j])
+            if has_members:
+                shared = int((member_of[:, i] & member_of[:, j]).sum())
+                target_area = shared * cell_area * CAPACITY_FACTOR
+            else:
+                target_area = EMPTY_OVERLAP_RATIO * math.pi * min(r1, r2) ** 2
+            if target_area > 0:
+                distances[(i, j)] = (distance_for_overlap(r1, r2, target_area), False)
+            else:
+                distances[(i, j)] = (r1 + r2 + min(cell_w, cell_h), True)
+
+    centers = _solve_centers(radii.tolist(), distances) if set_count else np.zeros((0, 2))
+
+    positions: List[Optional[Tuple[float, float]]] = [None] * len(masks)
+    half = np.array([cell_w, cell_h]) / 2
+    # 用更细的网格（不考虑元素尺寸）判断各区域在几何上是否存在：
+    # 整体放大不改变区域形状，不存在的区域（如 4 个圆的对角交集）放大也不会出现，不触发重试
+    if set_count:
+        step = min(cell_w, cell_h) / 4
+        fx, fy = np.meshgrid(
+            np.arange((centers[:, 0] - radii).min(), (centers[:, 0] + radii).max(), step),
+            np.arange((centers[:, 1] - radii).min(), (centers[:, 1] + radii).max(), step),
+        )
+        fine = np.stack([fx.ravel(), fy.ravel()], axis=1)
+        existing = set(np.unique(_region_masks(fine, centers, radii, np.zeros(2))).tolist())
+    else:
+        existing = set()
+    existing.add(0)
+    scale = 1.0
+    for attempt in range(MAX_RETRIES):
+        c, r = centers * scale, radii * scale
+        # 预先生成覆盖所有圆（外加一圈）的网格点
+        pad = 2 * np.array([cell_w, cell_h])
+        lo = (c - r[:, None]).min(axis=0) - pad if set_count else -pad
+        hi = (c + r[:, None]).max(axis=0) + pad if set_count else pad
+        xs = np.arange(lo[0], hi[0], cell_w)
+        ys = np.arange(lo[1], hi[1], cell_h)
+        gx, gy = np.meshgrid(xs, ys)
+        points = np.stack([gx.ravel(), gy.ravel()], axis=1)
+        point_masks = _region_masks(points, c, r, half)
+
+        placed, fits = [], True
+        for mask in np.unique(masks).tolist():
+            elements = np.nonzero(masks == mask)[0]
+            candidates = points[point_masks == mask]
+            take = min(len(elements), len(candidates))
+            if mask in existing and take < len(elements):
+                fits = False
+            if not take:
+                continue
+            # 区域锚点：所属圆心的平均值附近（不属于任何集合的元素放在下方）
+            if mask:
+                anchor = c[(mask & bits) > 0].mean(axis=0)
+            else:
+                anchor = np.array([(lo[0] + hi[0]) / 2, hi[1]])
+            order = np.argsort(((candidates - anchor) ** 2).sum(axis=1), kind="stable")
+            placed.append((elements[:take], candidates[order[:take]]))
+        # 区域容量不足时整体放大重试；仍放不下的元素由调用方兜底
+        if fits or attempt == MAX_RETRIES - 1:
+            break
+        scale *= GROWTH
+
+    for elements, chosen in placed:
+        for idx, point in zip(elements.tolist(), chosen.tolist()):
+            positions[idx] = (point[0], point[1])
+    return c, r, positions
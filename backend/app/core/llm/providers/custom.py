@@ -4,13 +4,18 @@
 """
 from typing import Optional, Iterator
 from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import generate_from_stream
 from langchain_core.callbacks import CallbackManagerForLLMRun
 from langchain_core.messages import BaseMessage, AIMessageChunk
-from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 import httpx
 import json
 
 
+# LangChain 消息类型 -> OpenAI 兼容接口的角色
+_ROLES = {"human": "user", "ai": "assistant"}
+
+
 class CustomLLM(BaseChatModel):
     """自定义 LLM 实现（OpenAI 兼容）"""
     
@@ -30,8 +35,18 @@ class CustomLLM(BaseChatModel):
         stop: Optional[list[str]] = None,
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: any,
+    ) -> ChatResult:
+        """生成响应（合并流式块）"""
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+    
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: any,
     ) -> Iterator[ChatGenerationChunk]:
-        """生成响应"""
+        """流式生成响应"""
         url = f"{self.base_url.rstrip('/')}/chat/completions"
         
         # 转换消息格式
@@ -39,7 +54,7 @@ class CustomLLM(BaseChatModel):
         for msg in messages:
             if hasattr(msg, "content"):
                 formatted_messages.append({
-                    "role": msg.__class__.__name__.lower().replace("message", ""),
+                    "role": _ROLES.get(msg.type, msg.type),
                     "content": msg.content
                 })
         
@@ -51,6 +66,9 @@ class CustomLLM(BaseChatModel):
             "max_tokens": self.max_tokens,
             "stream": True,
         }
+        # 结构化输出（app.core.llm.structured.bind_schema 绑定的 response_format）
+        if kwargs.get("response_format"):
+            payload["response_format"] = kwargs["response_format"]
         
         headers = {
             "Authorization": f"Bearer {self.api_key}",
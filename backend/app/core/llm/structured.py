@@ -0,0 +1,216 @@
+"""
+结构化输出 - 用 JSON Schema 约束规划与结构生成的输出
+
+默认模式下，规划和结构生成依赖正则从自由文本中提取 JSON，解析失败时重试或回退。
+开启结构化输出后，通过各提供商的原生机制直接约束输出格式：
+- OpenAI / Mistral / Qwen / Ollama / 自定义（OpenAI 兼容接口）：response_format = json_schema
+- Anthropic：强制调用一个以 schema 为参数的工具（tool use），输出即工具参数
+其余提供商（如 Google）不支持时返回 None，调用方使用普通模式。
+
+schema 按严格模式生成（strict_schema）：每个对象 additionalProperties=false、所有字段必填，
+可选字段可为 null；解析结果中的 null 字段会被去掉（drop_nulls）。
+"""
+import json
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import Runnable
+
+from app.models.request import LLMProvider
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    schema = dict(schema, type=[schema["type"], "null"])
+    if "enum" in schema:
+        schema["enum"] = schema["enum"] + [None]
+    return schema
+
+
+def strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    转换为严格模式的 JSON Schema（OpenAI strict 的要求）
+
+    每个对象禁止多余字段、所有字段都列入 required，原本可选的字段改为可为 null
+    """
+    schema = dict(schema)
+    if schema.get("type") == "object":
+        required = set(schema.get("required", []))
+        properties = {}
+        for key, sub in schema.get("properties", {}).items():
+            sub = strict_schema(sub)
+            properties[key] = sub if key in required else _nullable(sub)
+        schema["properties"] = properties
+        schema["required"] = list(properties)
+        schema["additionalProperties"] = False
+    elif schema.get("type") == "array" and "items" in schema:
+        schema["items"] = strict_schema(schema["items"])
+    return schema
+
+
+def drop_nulls(value: Any) -> Any:
+    """递归去掉对象中值为 null 的字段（严格模式下未填的可选字段）"""
+    if isinstance(value, dict):
+        return {k: drop_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value]
+    return value
+
+
+_NODE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "label": {"type": "string"},
+        "shape": {"type": "string", "enum": ["rectangle", "ellipse", "diamond", "text"]},
+        "group": {"type": "string"},
+    },
+    "required": ["id", "label"],
+}
+
+_EDGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "from": {"type": "string"},
+        "to": {"type": "string"},
+        "label": {"type": "string"},
+    },
+    "required": ["from", "to"],
+}
+
+# 结构生成：{type, nodes, edges}
+STRUCTURE_SCHEMA: Dict[str, Any] = strict_schema({
+    "type": "object",
+    "properties": {
+        "type": {"type": "string"},
+        "nodes": {"type": "array", "items": _NODE_SCHEMA},
+        "edges": {"type": "array", "items": _EDGE_SCHEMA},
+    },
+    "required": ["type", "nodes", "edges"],
+})
+
+# 规划：与 PlannerAgent 提示词中要求的字段一致
+PLAN_SCHEMA: Dict[str, Any] = strict_schema({
+    "type": "object",
+    "properties": {
+        "analysis": {"type": "string"},
+        "chart_type": {"type": "string"},
+        "elements": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "content": {"type": "string"},
+                    "position_hint": {"type": "string"},
+                    "action": {"type": "string", "enum": ["keep", "add", "modify"]},
+                },
+                "required": ["type", "content"],
+            },
+        },
+        "relationships": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "from": {"type": "string"},
+                    "to": {"type": "string"},
+                    "type": {"type": "string"},
+                    "action": {"type": "string", "enum": ["keep", "add"]},
+                },
+                "required": ["from", "to"],
+            },
+        },
+        "layout": {"type": "string"},
+        # 严格模式不允许任意对象，样式建议限定为颜色与尺寸两段说明
+        "style": {
+            "type": "object",
+            "properties": {
+                "colors": {"type": "string"},
+                "sizes": {"type": "string"},
+            },
+        },
+    },
+    "required": ["analysis", "chart_type", "elements", "relationships"],
+})
+
+_JSON_SCHEMA_PROVIDERS = (
+    LLMProvider.OPENAI,
+    LLMProvider.MISTRAL,
+    LLMProvider.QWEN,
+    LLMProvider.OLLAMA,
+    LLMProvider.CUSTOM,
+)
+
+
+def bind_schema(
+    llm: BaseLanguageModel,
+    provider: LLMProvider,
+    name: str,
+    schema: Dict[str, Any],
+    description: str = ""
+) -> Optional[Runnable]:
+    """
+    把 JSON Schema 绑定到 LLM
+
+    Args:
+        llm: LLMFactory 创建的实例
+        provider: 提供商
+        name: schema / 工具名（字母、数字、下划线）
+        schema: JSON Schema
+        description: 工具描述（Anthropic）
+
+    Returns:
+        绑定后的 Runnable；提供商不支持时返回 None
+    """
+    if provider in _JSON_SCHEMA_PROVIDERS:
+        return llm.bind(response_format={
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": schema, "strict": True},
+        })
+    if provider == LLMProvider.ANTHROPIC:
+        tool = {"name": name, "description": description or name, "input_schema": schema}
+        return llm.bind_tools([tool], tool_choice={"type": "tool", "name": name})
+    return None
+
+
+def chunk_text(chunk: Any) -> str:
+    """
+    流式块中的输出文本：普通文本内容，或工具调用参数的 JSON 片段（Anthropic tool use）
+    """
+    tool_chunks = getattr(chunk, "tool_call_chunks", None)
+    if tool_chunks:
+        return "".join(tc.get("args") or "" for tc in tool_chunks)
+    content = getattr(chunk, "content", None)
+    if content is None and isinstance(chunk, dict):
+        content = chunk.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        # 内容块列表：只取文本块（工具参数已由 tool_call_chunks 给出）
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+            if not isinstance(block, dict) or block.get("type") == "text"
+        )
+    return ""
+
+
+def structured_result(message: Any) -> Optional[Dict[str, Any]]:
+    """
+    非流式响应的结构化结果：工具调用参数，或 JSON 文本内容
+
+    Returns:
+        解析出的对象；无法解析时返回 None（调用方回退到文本提取）
+    """
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        args = tool_calls[0].get("args")
+        return drop_nulls(args) if isinstance(args, dict) else None
+    content = chunk_text(message).strip()
+    if not content:
+        return None
+    try:
+        result = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return drop_nulls(result) if isinstance(result, dict) else None
@@ -5,10 +5,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from loguru import logger
+import asyncio
 import sys
 
 from app.config import settings
-from app.api.v1 import generate, models, config
+from app.api.v1 import generate, models, config, render
+from app.core.excalidraw.library import get_catalog
 
 # 配置日志
 logger.remove()
@@ -40,6 +42,16 @@ app.add_middleware(
 app.include_router(generate.router, prefix="/api/v1", tags=["生成"])
 app.include_router(models.router, prefix="/api/v1", tags=["模型"])
 app.include_router(config.router, prefix="/api/v1", tags=["配置"])
+app.include_router(render.router, prefix="/api/v1", tags=["渲染"])
+
+
+@app.on_event("startup")
+async def load_library_index():
+    """启动时加载图标库索引（库文件有变化时重新生成），不让首个请求同步解析数 MB 的库文件"""
+    try:
+        await asyncio.to_thread(get_catalog().load)
+    except Exception as e:
+        logger.warning(f"图标库索引加载失败，图标替换不可用: {e}")
 
 
 @app.get("/")
@@ -2,7 +2,7 @@
 请求数据模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict, Any
+from typing import Optional, Literal, Dict, Any, List
 from enum import Enum
 
 
@@ -81,11 +81,42 @@ class GenerateRequest(BaseModel):
     stream: bool = True
     use_mcp: bool = Field(False, alias="useMcp")
     mcp_context: Optional[Dict[str, Any]] = Field(None, alias="mcpContext")
+    layout_algorithm: Optional[str] = Field(None, alias="layoutAlgorithm")  # 指定布局算法（如 stress），为空时自动选择
+    layout_constraints: Optional[Dict[str, Any]] = Field(None, alias="layoutConstraints")  # 布局约束 {pinned: {id: {x, y}}, constraints: [...]}
+    edge_bundling: bool = Field(False, alias="edgeBundling")  # 合并重边并按分组或布局走廊捆绑连线（连线密集的图）
+    lod_budget: Optional[int] = Field(None, alias="lodBudget")  # 元素预算，超出时把簇折叠为摘要节点（为空时不折叠）
+    lod_method: Literal["auto", "group", "subtree", "label_propagation"] = Field("auto", alias="lodMethod")  # 簇检测方式：auto / group / subtree / label_propagation
+    response_mode: Literal["full", "patch"] = Field("full", alias="responseMode")  # full：完整代码；patch：返回相对 currentCode 的补丁
+    output_format: Literal["skeleton", "scene"] = Field("skeleton", alias="outputFormat")  # skeleton：元素骨架；scene：完整的 .excalidraw 场景（客户端无需转换）
+    use_library_icons: bool = Field(False, alias="useLibraryIcons")  # 标签匹配到图标库（如 S3、Kafka）的节点绘制为图标
+    structure_format: Literal["json", "lines"] = Field("json", alias="structureFormat")  # 结构输出协议：json：单个 JSON 对象；lines：每行一个节点 / 边，逐行解析
+    structured_output: bool = Field(False, alias="structuredOutput")  # 用 JSON Schema 约束规划与结构输出（OpenAI response_format / Anthropic tool use）
     
     class Config:
         populate_by_name = True
 
 
+class ConstraintUpdateRequest(BaseModel):
+    """布局约束微调请求：只调整固定点 / 对齐 / 顺序约束，不重新生成结构"""
+    layout_id: str = Field(..., alias="layoutId")  # 生成响应 layout_metrics.layout_id
+    add: Optional[List[Dict[str, Any]]] = None  # 新增约束 [{type: align | order, axis, nodes[, gap]}]
+    remove: Optional[List[Dict[str, Any]]] = None  # 移除的约束（与添加时相同）
+    pinned: Optional[Dict[str, Optional[Dict[str, float]]]] = None  # 固定点 {节点 ID: {x, y}}，值为 null 时取消固定
+    current_code: Optional[str] = Field(None, alias="currentCode")  # patch 模式下的对比基准
+    response_mode: Literal["full", "patch"] = Field("full", alias="responseMode")  # full：完整代码；patch：返回相对 currentCode 的补丁
+    output_format: Literal["skeleton", "scene"] = Field("skeleton", alias="outputFormat")  # skeleton：元素骨架；scene：完整的 .excalidraw 场景
+    
+    class Config:
+        populate_by_name = True
+
+
+class RenderRequest(BaseModel):
+    """SVG 渲染请求"""
+    code: str
+    width: Optional[int] = None  # 输出宽度（缩略图），为空时按原始尺寸
+    background: Optional[str] = None  # 背景色，为空时为白色
+
+
 class ModelListRequest(BaseModel):
     """模型列表请求"""
     type: LLMProvider
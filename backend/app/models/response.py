@@ -25,11 +25,13 @@ class GenerateChunk(BaseModel):
 
 class GenerateResponse(BaseModel):
     """生成响应（非流式）"""
-    code: str
+    code: Optional[str] = None  # patch 模式下为空
+    patch: Optional[Dict[str, Any]] = None  # 相对 currentCode 的补丁 {added, removed, changed[, order]}
     elements_count: int
     optimized: bool
     validation_passed: bool
     errors: Optional[List[str]] = None
+    layout_metrics: Optional[Dict[str, Any]] = None  # 布局算法选择、图统计与耗时
 
 
 class ConfigResponse(BaseModel):
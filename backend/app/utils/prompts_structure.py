@@ -95,8 +95,77 @@ def get_structure_system_prompt() -> str:
 记住：先进行简单的思维链分析，然后输出被 ```json 包裹的结构数据。不要输出坐标！"""
 
 
-def get_structure_user_prompt(user_input: str, chart_type: str, plan: Dict[str, Any] = None) -> str:
-    """获取结构生成用户提示词"""
+def get_structure_lines_system_prompt() -> str:
+    """获取结构生成系统提示词（逐行输出协议：每行一个节点或一条边，可逐行解析）"""
+    return """## 任务
+
+根据用户需求，生成图表的**逻辑结构**（节点和边），不包含任何坐标信息。
+
+## 输出格式
+
+逐行输出，**每行一条记录**，字段之间用竖线 `|` 分隔：
+
+```
+T 图表类型
+N 节点ID|节点文本|形状|分组|键=值...
+E 起始节点ID|目标节点ID|连接标签|键=值...
+```
+
+- `T`：图表类型（flowchart, mindmap, orgchart, tree, network 等），放在第一行
+- `N`：节点。形状为 rectangle, ellipse, diamond, text 之一；形状和分组可以省略（省略时为 rectangle、不分组）
+- `E`：边。连接标签可以省略
+- 末尾的 `键=值` 字段可选，列表值用分号 `;` 分隔：
+  - 节点：`kind`（entity / class / interface / abstract_class）、`attributes`、`methods`、`pk`、`stereotype`、`sets`（韦恩图中元素所属的集合 ID）
+  - 边：`kind`（如 inheritance, implementation）
+- 文本中不要出现竖线 `|`；需要换行时写 `\\n`
+- 不要输出代码块标记、注释或其他任何内容
+
+## 重要规则
+
+1. **先输出全部节点（N 行），再输出全部边（E 行）**
+2. **无坐标**：绝对不要包含坐标信息
+3. **确保节点 ID 唯一**，边的两端必须引用已输出的节点 ID
+4. **分组**：属于同一逻辑模块（如"后端服务"、"数据库集群"）的节点使用相同的分组
+5. **保持结构线性且清晰**：避免复杂的网状结构、长距离跳转和不必要的循环依赖
+6. **韦恩图 (venn)**：集合的形状为 ellipse，元素为 rectangle 或 text；不要输出边；元素用 `sets=集合ID;集合ID` 标明所属集合；使用规划中的具体内容，不要用"集合1"之类的代号
+7. **ER 图 / 类图**：实体或类写 `kind=entity`（或 class 等），字段写在 `attributes=` 中，主键写在 `pk=`，方法写在 `methods=`；继承关系的边写 `kind=inheritance`
+
+## 形状选择指南
+
+- **rectangle**: 普通步骤、模块、组件
+- **ellipse**: 开始/结束节点
+- **diamond**: 判断/决策节点
+- **text**: 纯文本节点（少用）
+
+## 示例
+
+用户输入："画一个简单的登录流程"
+
+输出：
+T flowchart
+N start|开始|ellipse
+N input|输入用户名密码|rectangle
+N validate|验证信息|diamond
+N success|登录成功|ellipse
+N fail|登录失败|ellipse
+E start|input
+E input|validate
+E validate|success|验证通过
+E validate|fail|验证失败
+
+ER 图中的实体写作：
+N user|用户|rectangle||kind=entity|attributes=id: int;name: string|pk=id
+
+记住：只输出 T / N / E 行，不要输出坐标！"""
+
+
+def get_structure_user_prompt(
+    user_input: str,
+    chart_type: str,
+    plan: Dict[str, Any] = None,
+    output_format: str = "json"
+) -> str:
+    """获取结构生成用户提示词（output_format：json / lines）"""
     prompt_parts = []
     
     # 添加图表类型说明
@@ -129,7 +198,10 @@ def get_structure_user_prompt(user_input: str, chart_type: str, plan: Dict[str,
     
     # 添加用户输入
     prompt_parts.append(f"\n用户需求：\n{user_input}")
-    prompt_parts.append("\n请生成图表的逻辑结构（节点和边），只输出 JSON，不要包含坐标信息。")
+    if output_format == "lines":
+        prompt_parts.append("\n请生成图表的逻辑结构（节点和边），只输出 T / N / E 行，不要包含坐标信息。")
+    else:
+        prompt_parts.append("\n请生成图表的逻辑结构（节点和边），只输出 JSON，不要包含坐标信息。")
     
     return "\n".join(prompt_parts)
 
@@ -0,0 +1,66 @@
+"""
+ExcalidrawBuilder 测试：按 ID 建索引，构建耗时随边数线性增长
+"""
+import gc
+import random
+import time
+
+import pytest
+
+from app.core.excalidraw.builder import ExcalidrawBuilder
+
+_SHAPES = ["rectangle", "ellipse", "diamond", "rectangle"]
+
+
+def _synthetic_graph(n_nodes: int, n_edges: int, seed: int = 0):
+    rng = random.Random(seed)
+    nodes = [
+        {"id": f"n{i}", "label": f"Node {i}", "shape": _SHAPES[i % len(_SHAPES)],
+         "x": (i % 50) * 220.0, "y": (i // 50) * 140.0, "width": 160.0, "height": 80.0}
+        for i in range(n_nodes)
+    ]
+    edges = []
+    while len(edges) < n_edges:
+        a, b = rng.randrange(n_nodes), rng.randrange(n_nodes)
+        if a != b:
+            edges.append({"from": f"n{a}", "to": f"n{b}"})
+    return {"type": "flowchart", "nodes": nodes, "edges": edges}, nodes, edges
+
+
+def _build_seconds(n_nodes: int, n_edges: int) -> float:
+    structure, nodes, edges = _synthetic_graph(n_nodes, n_edges)
+    builder = ExcalidrawBuilder()
+    best = float("inf")
+    gc.disable()  # 排除 GC 停顿对规模比值的干扰
+    try:
+        for _ in range(3):
+            start = time.perf_counter()
+            builder.build_elements(structure, nodes, edges)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def test_iter_elements_yields_nodes_then_arrows():
+    structure, nodes, edges = _synthetic_graph(20, 30)
+    elements = list(ExcalidrawBuilder().iter_elements(structure, nodes, edges))
+    arrows = [el for el in elements if el["type"] == "arrow"]
+    assert len(arrows) == len(edges)
+    first_arrow = next(i for i, el in enumerate(elements) if el["type"] == "arrow")
+    assert all(el["type"] == "arrow" for el in elements[first_arrow:])
+    # 模板只被浅拷贝：形状的 label 样式展开到各自的字典中，互不影响
+    shapes = [el for el in elements if el["type"] == "rectangle"]
+    shapes[0]["label"]["fontSize"] = 99
+    assert shapes[1]["label"]["fontSize"] != 99
+    assert ExcalidrawBuilder._template("rectangle", ExcalidrawBuilder().theme_type)["label"]["fontSize"] != 99
+
+
+@pytest.mark.slow
+def test_benchmark_build_scales_linearly():
+    small = _build_seconds(2000, 4000)
+    large = _build_seconds(8000, 16000)
+    print(f"\n2000 节点 / 4000 边: {small * 1000:.0f} ms\n8000 节点 / 16000 边: {large * 1000:.0f} ms")
+    assert small < 1.0
+    # 规模扩大 4 倍：O(N + E log E) 约 4~5 倍，O(N·E) 则约 16 倍
+    assert large / small < 8
@@ -0,0 +1,84 @@
+"""
+连线合并与边捆绑测试
+"""
+from app.core.excalidraw.builder import ExcalidrawBuilder
+from app.core.layout.bundling import bundle_edges, merge_parallel_edges
+
+
+def _node(node_id, x, y, **extra):
+    return {"id": node_id, "label": node_id, "x": x, "y": y, "width": 120, "height": 60, **extra}
+
+
+def test_duplicates_merge_with_combined_label():
+    merged = merge_parallel_edges([
+        {"from": "a", "to": "b", "label": "读"},
+        {"from": "a", "to": "b", "label": "写"},
+        {"from": "a", "to": "b", "label": "读"},
+    ])
+    assert merged == [{"from": "a", "to": "b", "label": "读 / 写", "count": 3}]
+
+
+def test_unlabeled_reverse_edges_fold_into_bidirectional():
+    merged = merge_parallel_edges([{"from": "a", "to": "b"}, {"from": "b", "to": "a"}, {"from": "a", "to": "b"}])
+    assert merged == [{"from": "a", "to": "b", "count": 3, "bidirectional": True}]
+
+
+def test_labeled_or_restyled_reverse_edges_stay_separate():
+    labeled = merge_parallel_edges([
+        {"from": "a", "to": "b", "label": "request"},
+        {"from": "b", "to": "a", "label": "response"},
+    ])
+    assert [(e["from"], e["to"], e["label"]) for e in labeled] == [("a", "b", "request"), ("b", "a", "response")]
+    assert not any(e.get("bidirectional") for e in labeled)
+
+    one_labeled = merge_parallel_edges([{"from": "a", "to": "b"}, {"from": "b", "to": "a", "label": "ack"}])
+    assert len(one_labeled) == 2
+
+    styled = merge_parallel_edges([{"from": "a", "to": "b"}, {"from": "b", "to": "a", "style": "dashed"}])
+    assert len(styled) == 2 and styled[1]["style"] == "dashed"
+
+    # 同向但样式不同的重边同样保留
+    assert len(merge_parallel_edges([{"from": "a", "to": "b"}, {"from": "a", "to": "b", "style": "dashed"}])) == 2
+
+
+def test_bundling_reduces_arrow_elements():
+    nodes = [_node("a", 0, 0), _node("b", 400, 0), _node("c", 0, 200)]
+    edges = [
+        {"from": "a", "to": "b", "label": "x"},
+        {"from": "a", "to": "b", "label": "y"},
+        {"from": "b", "to": "a"},
+        {"from": "a", "to": "b"},
+        {"from": "a", "to": "c"},
+    ]
+    bundled, stats = bundle_edges(nodes, edges)
+    assert stats["edges_before"] == 5 and stats["edges_after"] == 3
+    assert stats["elements_saved"] == 2
+
+    structure = {"type": "dataflow", "nodes": nodes, "edges": edges}
+    builder = ExcalidrawBuilder()
+    before = builder.build_elements(structure, nodes, edges)
+    after = builder.build_elements(structure, nodes, bundled)
+    assert len(before) - len(after) == stats["elements_saved"]
+    assert sum(el["type"] == "arrow" for el in after) == 3
+
+
+def test_ungrouped_corridor_shares_spine():
+    # 左右两列节点，没有 group：按布局坐标落入两个走廊单元
+    left = [_node(f"l{i}", 0, i * 80) for i in range(3)]
+    right = [_node(f"r{i}", 1200, i * 80) for i in range(3)]
+    edges = [{"from": f"l{i}", "to": f"r{i}"} for i in range(3)] + [{"from": "r0", "to": "l2"}]
+    bundled, stats = bundle_edges(left + right, edges)
+    assert stats["bundles"] == 1 and stats["bundled_edges"] == 4
+    spines = {tuple(e["waypoints"]) for e in bundled if e["from"].startswith("l")}
+    assert len(spines) == 1
+    reverse = next(e for e in bundled if e["from"] == "r0")
+    assert reverse["waypoints"] == list(next(iter(spines)))[::-1]
+
+
+def test_grouped_nodes_bundle_by_group():
+    nodes = [_node(f"a{i}", i * 500, 0, group="api") for i in range(3)] + \
+            [_node(f"d{i}", i * 500, 900, group="db") for i in range(3)]
+    edges = [{"from": f"a{i}", "to": f"d{(i + 1) % 3}"} for i in range(3)]
+    bundled, stats = bundle_edges(nodes, edges)
+    assert stats["bundles"] == 1
+    assert len({tuple(e["waypoints"]) for e in bundled}) == 1
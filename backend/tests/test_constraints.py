@@ -0,0 +1,63 @@
+"""
+布局约束求解与增量更新测试
+"""
+from app.core.layout.constraints import ConstraintSolver, LayoutSessionStore
+from app.core.layout.engine import LayoutEngine
+
+
+def _structure():
+    nodes = [{"id": f"n{i}", "label": f"服务 {i}"} for i in range(6)]
+    edges = [{"from": "n0", "to": f"n{i}"} for i in range(1, 6)]
+    return {"type": "flowchart", "nodes": nodes, "edges": edges}
+
+
+def _centers(nodes):
+    return {n["id"]: (n["x"] + n["width"] / 2, n["y"] + n["height"] / 2) for n in nodes}
+
+
+def test_align_and_pin_in_layout():
+    structure = _structure()
+    structure["constraints"] = [{"type": "align", "axis": "y", "nodes": ["n1", "n2", "n3"]}]
+    structure["pinned"] = {"n5": {"x": 1000, "y": 50}}
+    nodes = LayoutEngine().layout(structure, "flowchart")
+    centers = _centers(nodes)
+    assert abs(centers["n1"][1] - centers["n2"][1]) < 1e-6
+    assert abs(centers["n2"][1] - centers["n3"][1]) < 1e-6
+    n5 = next(n for n in nodes if n["id"] == "n5")
+    assert (n5["x"], n5["y"]) == (1000, 50)
+
+
+def test_update_constraints_only_moves_affected_nodes():
+    engine = LayoutEngine()
+    nodes = engine.layout(_structure(), "flowchart")
+    before = _centers(nodes)
+
+    updated = engine.update_constraints(nodes, add=[{"type": "order", "axis": "x", "nodes": ["n4", "n1"]}])
+    after = _centers(updated)
+    for node_id in ("n0", "n2", "n3", "n5"):
+        assert after[node_id] == before[node_id]
+    assert after["n1"][0] > after["n4"][0]
+
+    # 再次微调复用同一个求解器：取消刚才的约束，节点回到原位
+    restored = engine.update_constraints(updated, remove=[{"type": "order", "axis": "x", "nodes": ["n4", "n1"]}])
+    assert _centers(restored) == before
+
+
+def test_solver_pin_can_be_released():
+    nodes = [{"id": "a", "x": 0, "y": 0, "width": 100, "height": 50}]
+    solver = ConstraintSolver(nodes, pinned={"a": {"x": 300}})
+    solver.solve()
+    assert solver.apply(nodes)[0]["x"] == 300
+    solver.pin("a", None)
+    assert solver.solve() == {"a"}
+    assert solver.apply(nodes)[0]["x"] == 0
+
+
+def test_session_store_evicts_least_recent():
+    store = LayoutSessionStore(capacity=2)
+    store.put("a", {"n": 1})
+    store.put("b", {"n": 2})
+    store.get("a")
+    store.put("c", {"n": 3})
+    assert store.get("b") is None
+    assert store.get("a") == {"n": 1}
@@ -0,0 +1,78 @@
+"""
+批量布局测试
+"""
+import copy
+
+import pytest
+
+from app.core.layout import engine as engine_module
+from app.core.layout.engine import BATCH_PARALLEL_MIN, LayoutEngine
+from app.core.layout.templates import TemplateStore
+
+
+def _structures():
+    """拓扑互不相同的结构（避免批内命中布局模板）"""
+    structures = []
+    for n in range(2, 16):
+        nodes = [{"id": f"n{i}", "label": f"步骤 {i}"} for i in range(n)]
+        edges = [{"from": f"n{i}", "to": f"n{i + 1}"} for i in range(n - 1)]
+        structures.append({"type": "flowchart", "nodes": nodes, "edges": edges})
+    for n in range(3, 13):
+        nodes = [{"id": "hub", "label": "中心"}] + [{"id": f"l{i}", "label": f"叶子 {i}"} for i in range(n)]
+        edges = [{"from": "hub", "to": f"l{i}"} for i in range(n)]
+        structures.append({"type": "tree", "nodes": nodes, "edges": edges})
+    for n in range(3, 11):
+        nodes = [{"id": f"c{i}", "label": f"服务 {i}"} for i in range(n)]
+        edges = [{"from": f"c{i}", "to": f"c{(i + 1) % n}"} for i in range(n)]
+        structures.append({"type": "network", "nodes": nodes, "edges": edges})
+    structures.append({"type": "flowchart", "nodes": [], "edges": []})
+    return structures
+
+
+@pytest.fixture(autouse=True)
+def _fresh_templates(monkeypatch):
+    monkeypatch.setattr(engine_module, "TEMPLATE_STORE", TemplateStore())
+    monkeypatch.setattr(engine_module, "_worker_engine", None)
+
+
+def _expected(structures):
+    engine = LayoutEngine()
+    expected = []
+    for structure in structures:
+        engine.last_metrics = {}
+        nodes = engine.layout(copy.deepcopy(structure), "auto")
+        expected.append((nodes, engine.last_metrics))
+    engine_module.TEMPLATE_STORE = TemplateStore()
+    return expected
+
+
+def _assert_same(results, expected):
+    assert len(results) == len(expected)
+    for result, (nodes, metrics) in zip(results, expected):
+        assert result["error"] is None
+        assert result["nodes"] == nodes
+        strip = lambda m: {k: v for k, v in m.items() if k != "elapsed_ms"}  # noqa: E731
+        assert strip(result["metrics"]) == strip(metrics)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_batch_matches_single_layout(max_workers):
+    structures = _structures()
+    assert len(structures) >= BATCH_PARALLEL_MIN
+    expected = _expected(structures)
+    results = LayoutEngine().layout_many(copy.deepcopy(structures), "auto", max_workers=max_workers)
+    _assert_same(results, expected)
+
+
+def test_batch_computes_stats_once(monkeypatch):
+    structures = _structures()[:6]
+    calls = []
+    original = engine_module.compute_graph_stats
+
+    def counting(nodes, edges):
+        calls.append(len(nodes))
+        return original(nodes, edges)
+
+    monkeypatch.setattr(engine_module, "compute_graph_stats", counting)
+    LayoutEngine().layout_many(copy.deepcopy(structures), "auto", max_workers=1)
+    assert len(calls) == len(structures)
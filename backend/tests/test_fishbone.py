@@ -0,0 +1,64 @@
+"""
+鱼骨图布局测试
+"""
+from itertools import combinations
+
+from app.core.layout.engine import LayoutEngine
+from app.core.layout.fishbone import fishbone_layout
+
+
+def _boxes_overlap(a, b):
+    return (
+        a["x"] < b["x"] + b["width"] and b["x"] < a["x"] + a["width"]
+        and a["y"] < b["y"] + b["height"] and b["y"] < a["y"] + a["height"]
+    )
+
+
+def _boxes(centers, sizes):
+    return [
+        {"x": x - w / 2, "y": y - h / 2, "width": w, "height": h}
+        for (x, y), (w, h) in zip(centers, sizes)
+    ]
+
+
+def test_bones_alternate_and_causes_stack_toward_the_category():
+    sizes = [(160, 60)] * 9
+    # 鱼头 0；类别 1、2、3；原因 4、5（5 为 4 的子原因）、6、7、8
+    bones = [(1, [(4, 1), (5, 2)]), (2, [(6, 1)]), (3, [(7, 1), (8, 1)])]
+    centers, segments = fishbone_layout(sizes, 0, bones)
+
+    head_x = centers[0][0]
+    assert all(x < head_x for x, _ in centers[1:])
+    # 先上后下交替；第三根大骨在更左侧的下一组
+    assert centers[1][1] < 0 < centers[2][1] and centers[3][1] < 0
+    assert centers[3][0] < min(centers[1][0], centers[2][0])
+    # 原因沿大骨由内向外堆叠，类别在末端
+    assert abs(centers[4][1]) < abs(centers[5][1]) < abs(centers[1][1])
+    assert abs(centers[7][1]) < abs(centers[8][1]) < abs(centers[3][1])
+    # 子原因的短线更长（更靠左）
+    assert centers[5][0] < centers[4][0]
+    # 第一条线段是主骨，从尾部到鱼头
+    x1, y1, x2, y2 = segments[0]
+    assert y1 == y2 == 0 and x2 == 0 and x1 <= min(x for x, _ in centers)
+
+    for a, b in combinations(_boxes(centers, sizes), 2):
+        assert not _boxes_overlap(a, b)
+
+
+def test_engine_finds_head_and_places_disconnected_nodes_below():
+    nodes = [{"id": n, "label": n, "width": 120, "height": 50} for n in (
+        "c1", "r1", "r2", "问题", "c2", "r3", "孤立"
+    )]
+    edges = [
+        {"from": "r1", "to": "c1"}, {"from": "r2", "to": "c1"}, {"from": "c1", "to": "问题"},
+        {"from": "r3", "to": "c2"}, {"from": "c2", "to": "问题"},
+    ]
+    result = LayoutEngine()._fishbone_layout(nodes, edges)
+    placed = {node["id"]: node for node in result if node.get("shape") != "line"}
+    bones = [node for node in result if node.get("shape") == "line"]
+
+    assert set(placed) == {node["id"] for node in nodes}
+    assert placed["问题"]["x"] == max(node["x"] for node in placed.values())
+    assert bones and bones[0]["strokeWidth"] == 4
+    lowest = max(node["y"] + node["height"] for key, node in placed.items() if key != "孤立")
+    assert placed["孤立"]["y"] > lowest
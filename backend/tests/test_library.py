@@ -0,0 +1,70 @@
+"""
+图标库测试
+"""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from app.core.excalidraw.library import LibraryCatalog  # noqa: E402
+
+
+def _icon(name):
+    return {
+        "name": name,
+        "elements": [
+            {"type": "rectangle", "x": 10, "y": 20, "width": 40, "height": 30, "seed": 1},
+            {"type": "text", "x": 10, "y": 55, "width": 40, "height": 10, "text": name},
+        ],
+    }
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    library_dir = tmp_path / "libraries"
+    library_dir.mkdir()
+    names = ["S3", "Lambda", "API Gateway", "Service", "Server", "Email",
+             "Client VPN", "Quantum Ledger Database", "Managed Streaming for Apache Kafka"]
+    with open(library_dir / "aws.excalidrawlib", "w", encoding="utf-8") as f:
+        json.dump({"type": "excalidrawlib", "version": 2, "libraryItems": [_icon(n) for n in names]}, f)
+    return LibraryCatalog(library_dir, tmp_path / "index")
+
+
+def _name(catalog, label):
+    found = catalog.find(label)
+    return None if found is None else catalog.name(found)
+
+
+@pytest.mark.parametrize("label,expected", [
+    ("S3", "S3"),
+    ("Amazon S3", "S3"),
+    ("AWS Lambda", "Lambda"),
+    ("api-gateway", "API Gateway"),
+    ("Public API Gateway", "API Gateway"),
+])
+def test_find_matches_whole_label_or_dominant_keyword(catalog, label, expected):
+    assert _name(catalog, label) == expected
+
+
+@pytest.mark.parametrize("label", [
+    "Database", "Client", "Order Service", "Web Server", "Send Email", "订单服务",
+])
+def test_find_rejects_loose_matches(catalog, label):
+    assert catalog.find(label) is None
+
+
+def test_index_is_built_once_without_leftover_temp_files(catalog):
+    catalog.load()
+    files = sorted(os.listdir(catalog.index_dir))
+    assert files == ["library-index.json", "library.bin"]
+    elements, width, height = catalog.item(catalog.find("S3"))
+    # 与图标名称相同的标题文本被去掉
+    assert (width, height) == (40, 30)
+    assert min(el["x"] for el in elements) == 0 and "seed" not in elements[0]
+
+    reopened = LibraryCatalog(catalog.library_dir, catalog.index_dir)
+    mtime = os.stat(catalog.index_dir / "library.bin").st_mtime_ns
+    reopened.load()
+    assert os.stat(catalog.index_dir / "library.bin").st_mtime_ns == mtime
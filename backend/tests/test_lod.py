@@ -0,0 +1,35 @@
+"""
+LOD 折叠测试
+"""
+from app.core.layout.lod import collapse_structure, element_count
+
+
+def _services_tree(subtrees: int, leaves: int):
+    nodes = [{"id": "root", "label": "Root"}]
+    edges = []
+    for t in range(subtrees):
+        nodes.append({"id": f"s{t}", "label": "Service"})
+        edges.append({"from": "root", "to": f"s{t}"})
+        for j in range(leaves):
+            nodes.append({"id": f"s{t}-{j}", "label": f"leaf {j}"})
+            edges.append({"from": f"s{t}", "to": f"s{t}-{j}"})
+    return {"type": "tree", "nodes": nodes, "edges": edges}
+
+
+def test_clusters_with_same_label_collapse_separately():
+    structure = _services_tree(5, 40)
+    collapsed, stats = collapse_structure(structure, 60)
+    assert stats is not None
+    assert stats["elements_before"] == 411
+    assert element_count(collapsed) <= 60
+    # 五个同名子树各自折叠为一个摘要节点
+    assert len(stats["summaries"]) == 5
+    assert {s["name"] for s in stats["summaries"]} == {"Service"}
+    assert len({s["id"] for s in stats["summaries"]}) == 5
+
+
+def test_under_budget_is_untouched():
+    structure = _services_tree(2, 3)
+    collapsed, stats = collapse_structure(structure, 1000)
+    assert stats is None
+    assert collapsed is structure
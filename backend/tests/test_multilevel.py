@@ -0,0 +1,68 @@
+"""
+多层级力导向布局测试
+"""
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.layout.multilevel import multilevel_layout
+
+
+def _random_graph(n: int, m: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n, m), rng.integers(0, n, m)
+
+
+def test_layout_shape_and_finite():
+    src, dst = _random_graph(500, 750)
+    pos = multilevel_layout(500, src, dst, ideal_length=100)
+    assert pos.shape == (500, 2)
+    assert np.isfinite(pos).all()
+
+
+def test_layout_is_reproducible():
+    src, dst = _random_graph(800, 1200)
+    first = multilevel_layout(800, src, dst, seed=7)
+    second = multilevel_layout(800, src, dst, seed=7)
+    assert np.array_equal(first, second)
+
+
+def test_components_do_not_overlap():
+    # 两个互不连通的环 + 若干孤立节点
+    ring = np.arange(100)
+    src = np.concatenate([ring, ring + 100])
+    dst = np.concatenate([(ring + 1) % 100, (ring + 1) % 100 + 100])
+    pos = multilevel_layout(210, src, dst, ideal_length=10)
+
+    a, b = pos[:100], pos[100:200]
+    separated_x = a[:, 0].max() < b[:, 0].min() or b[:, 0].max() < a[:, 0].min()
+    separated_y = a[:, 1].max() < b[:, 1].min() or b[:, 1].max() < a[:, 1].min()
+    assert separated_x or separated_y
+    # 孤立节点彼此不重叠
+    isolated = pos[200:]
+    assert len({tuple(p) for p in isolated.round(3).tolist()}) == 10
+
+
+@pytest.mark.slow
+def test_star_graph_is_fast():
+    # 太阳系合并会把星型图收缩成一个簇，延拓时叶子需要按簇的规模展开，否则细化时点对数暴涨
+    n = 5000
+    start = time.perf_counter()
+    pos = multilevel_layout(n, np.zeros(n - 1, dtype=int), np.arange(1, n), ideal_length=1.0)
+    elapsed = time.perf_counter() - start
+    assert np.ptp(pos, axis=0).min() > 10
+    assert elapsed < 2.0, f"5k 叶子的星型图布局耗时 {elapsed:.2f}s"
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("seed", [0, 1])
+def test_10k_nodes_within_a_few_seconds(seed):
+    src, dst = _random_graph(10000, 15000, seed)
+    multilevel_layout(200, *_random_graph(200, 300))  # 预热 NumPy
+    start = time.perf_counter()
+    pos = multilevel_layout(10000, src, dst, ideal_length=250)
+    elapsed = time.perf_counter() - start
+    assert pos.shape == (10000, 2)
+    assert elapsed < 3.0, f"10k 节点 / 15k 边布局耗时 {elapsed:.2f}s"
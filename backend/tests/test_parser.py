@@ -0,0 +1,143 @@
+"""
+LLM 输出解析测试：repair_json 的修复结果必须始终是合法 JSON，且耗时随输入线性增长
+"""
+import json
+import random
+import time
+
+import pytest
+
+from app.core.excalidraw.parser import find_json_start, parse_code, repair_json
+
+# 手工整理的疑难输入
+CORPUS = [
+    '[{"type":"text","text":"say "yes", then"}]',
+    '[{"type":"text","text":"a "b" c","x":1}]',
+    '[{"type":"text","text":"say "yes", "x":1}]',
+    '[{"type":"rectangle" "x": 1}]',
+    '[{"type":{"a":1}},{"type":["text"]}]',
+    '[{"type":"rectangle","x" 1, y 2}]',
+    '[{"type":"rectangle","x":1,,}',
+    '[{"type":"text","text":"a", [1, 2], "x":3}]',
+    '[{"type":"text","text":"\\q \\u12 \\u0041"}]',
+    '[{"type":"text","text":"line\nbreak\ttab"}]',
+    '[{"type":"rectangle","x":1},"id":"r2","type":"ellipse"}]',
+    '[{"type":"rectangle","x":1}}]]',
+    '[{"type":"rectangle","x":1},{"type":"text","text":"cut',
+    '<think>先想想 [x]</think>```json\n[{"type":"ellipse"}]\n```',
+    '{"elements":[{"type":"diamond"}],"appState":{',
+    '[{"type":"text","text":"\\',
+    '[{"a":{"b":[{"c":',
+]
+
+
+def _element(rng):
+    words = ["say", '"yes"', "a,b", "{x}", "[1]", "路径", "c:d", "\\", "\n", "then"]
+    return {
+        "id": f"e{rng.randrange(100)}",
+        "type": rng.choice(["rectangle", "text", "arrow"]),
+        "x": rng.uniform(-1000, 1000),
+        "y": rng.randrange(500),
+        "text": " ".join(rng.choice(words) for _ in range(rng.randrange(4))),
+        "points": [[0, 0], [rng.randrange(10), 1.5]],
+        "customData": {"k": [True, None]},
+    }
+
+
+def _mutate(rng, text):
+    """截断、删字符、插入语法字符、去掉转义、删冒号或逗号、重复片段"""
+    noise = ['"', "{", "}", "[", "]", ",", ":", " ", "\\", "\n", "a", "1", "null", "-", "é"]
+    for _ in range(rng.randrange(1, 4)):
+        op, i = rng.randrange(6), rng.randrange(len(text) + 1)
+        if op == 0:
+            text = text[:i]
+        elif op == 1:
+            text = text[:i] + text[i + 1:]
+        elif op == 2:
+            text = text[:i] + rng.choice(noise) + text[i:]
+        elif op == 3:
+            text = text.replace('\\"', '"', rng.choice([1, -1]))
+        elif op == 4:
+            text = text.replace(rng.choice([":", ","]), " ", 1)
+        else:
+            text = text[:i] + text[i:i + 20] * 2 + text[i + 20:]
+    return text
+
+
+def _fuzz_corpus(seed, size):
+    rng = random.Random(seed)
+    for _ in range(size):
+        doc = json.dumps([_element(rng) for _ in range(rng.randrange(1, 4))], ensure_ascii=rng.random() < 0.5)
+        yield _mutate(rng, doc)
+
+
+def _assert_repairs_to_json(text):
+    start = find_json_start(text)
+    if start < 0:
+        return
+    for candidate in repair_json(text, start):
+        if candidate is not None:
+            json.loads(candidate)
+    assert isinstance(json.loads(parse_code(text)), list)
+
+
+def test_unescaped_quotes_inside_text():
+    elements = json.loads(parse_code('[{"type":"text","text":"say "yes", then"}]'))
+    assert elements == [{"type": "text", "text": 'say "yes", then'}]
+
+
+def test_missing_colon_is_inserted():
+    # 裸键后直接跟值
+    repaired, _ = repair_json('[{type "arrow", "x": 1, points [[0, 0]], width 5}]')
+    assert json.loads(repaired) == [{"type": "arrow", "x": 1, "points": [[0, 0]], "width": 5}]
+
+
+def test_container_in_key_position_is_dropped():
+    repaired, _ = repair_json('[{"type":"line","x":1, [1, {"a": 2}], "y":3}]')
+    assert json.loads(repaired) == [{"type": "line", "x": 1, "y": 3}]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_corpus_repairs_to_valid_json(text):
+    _assert_repairs_to_json(text)
+
+
+def test_fuzz_corpus_repairs_to_valid_json():
+    for text in _fuzz_corpus(seed=0, size=3000):
+        _assert_repairs_to_json(text)
+
+
+def test_valid_documents_are_unchanged():
+    rng = random.Random(1)
+    for _ in range(500):
+        doc = json.dumps([_element(rng) for _ in range(3)], ensure_ascii=rng.random() < 0.5)
+        repaired, _ = repair_json(doc)
+        assert json.loads(repaired) == json.loads(doc)
+
+
+def _llm_output(nbytes):
+    """带思考标签、代码块、未转义引号且被截断的元素数组"""
+    element = {"type": "text", "x": 1.5, "y": 2, "width": 100, "height": 20, "text": 'say "yes", then {x} [1]'}
+    count = nbytes // len(json.dumps(element))
+    body = json.dumps([dict(element, id=f"e{i}") for i in range(count)], ensure_ascii=False)
+    return "<think>先规划布局</think>\n```json\n" + body.replace('\\"', '"')[:-5]
+
+
+@pytest.mark.slow
+def test_benchmark_parse_scales_linearly():
+    def seconds(text):
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            parse_code(text)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    small, large = _llm_output(256 * 1024), _llm_output(1024 * 1024)
+    small_s, large_s = seconds(small), seconds(large)
+    print(f"\n256 KB: {small_s * 1000:.0f} ms\n1 MB:   {large_s * 1000:.0f} ms")
+    elements = json.loads(parse_code(large))
+    assert elements[0]["text"] == 'say "yes", then {x} [1]'
+    # 输入扩大 4 倍，耗时应接近 4 倍
+    assert large_s / small_s < 6
+    assert large_s < 3.0
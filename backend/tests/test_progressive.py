@@ -0,0 +1,27 @@
+"""
+渐进式布局测试
+"""
+from app.core.layout.progressive import ROW_SIZE, ProgressiveLayout
+
+
+def _measure(node):
+    return 100.0, 50.0
+
+
+def test_numeric_ids_are_placed_as_strings():
+    layout = ProgressiveLayout(_measure)
+    assert layout.add([{"id": 1, "label": "A"}, {"id": 2, "label": "B"}, {"label": "无 ID"}]) == 2
+    assert [n["id"] for n in layout.nodes()] == ["1", "2"]
+    # 字符串与数字形式的同一 ID 不会重复放置
+    assert layout.add([{"id": "1", "label": "A"}]) == 0
+    edges = layout.edges([{"from": 1, "to": "2"}, {"from": 1, "to": 3}])
+    assert edges == [{"from": "1", "to": "2"}]
+
+
+def test_placed_nodes_never_move():
+    layout = ProgressiveLayout(_measure)
+    layout.add([{"id": f"n{i}"} for i in range(ROW_SIZE)])
+    first = [(n["x"], n["y"]) for n in layout.nodes()]
+    layout.add([{"id": "late"}])
+    assert [(n["x"], n["y"]) for n in layout.nodes()][:ROW_SIZE] == first
+    assert layout.nodes()[-1]["y"] > first[0][1]
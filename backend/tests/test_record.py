@@ -0,0 +1,76 @@
+"""
+记录（分栏）节点测试 - ER 实体 / UML 类
+"""
+import copy
+
+from app.core.agents.structure_stream import StructureLineParser
+from app.core.layout.engine import LayoutEngine
+from app.core.layout.record import fold_attributes, record_sections
+
+
+def test_entity_sections_mark_primary_keys():
+    node = {
+        "id": "user", "label": "用户", "kind": "entity",
+        "props": {"attributes": ["id: int", {"name": "email", "type": "string", "pk": True}, "name"], "pk": ["id"]},
+    }
+    header, sections = record_sections(node)
+    assert header == ["用户"]
+    # 实体没有方法时只有属性栏
+    assert sections == [["PK id: int", "PK email: string", "name"]]
+
+
+def test_class_sections_and_stereotype():
+    header, sections = record_sections({"id": "s", "label": "Shape", "kind": "interface"})
+    assert header == ["«interface»", "Shape"]
+    assert sections == [[], []]
+    header, sections = record_sections({
+        "id": "c", "label": "Circle", "kind": "class",
+        "props": {"methods": ["area()"], "stereotype": "entity"},
+    })
+    assert header == ["«entity»", "Circle"] and sections == [[], ["area()"]]
+    assert record_sections({"id": "x", "label": "普通节点"}) is None
+
+
+def test_line_protocol_props_reach_the_record():
+    parser = StructureLineParser()
+    parser.feed("N order|订单|rectangle||kind=entity|attributes=id: int;total: decimal|pk=id\n")
+    parser.close()
+    assert record_sections(parser.nodes[0]) == (["订单"], [["PK id: int", "total: decimal"]])
+
+
+def test_attribute_nodes_fold_into_their_single_owner():
+    nodes = [
+        {"id": "user", "label": "用户", "kind": "entity"},
+        {"id": "order", "label": "订单", "kind": "entity"},
+        {"id": "uid", "label": "id", "kind": "attribute", "props": {"type": "int", "pk": True}},
+        {"id": "shared", "label": "created_at", "kind": "attribute"},
+    ]
+    edges = [
+        {"from": "user", "to": "uid"},
+        {"from": "user", "to": "shared"}, {"from": "order", "to": "shared"},
+        {"from": "user", "to": "order", "label": "下单"},
+    ]
+    original = copy.deepcopy(nodes)
+    folded, remaining = fold_attributes(nodes, edges)
+    assert nodes == original
+    assert [node["id"] for node in folded] == ["user", "order", "shared"]
+    assert folded[0]["props"]["attributes"] == [{"name": "id", "type": "int", "pk": True}]
+    assert {(e["from"], e["to"]) for e in remaining} == {("user", "shared"), ("order", "shared"), ("user", "order")}
+
+
+def test_record_layout_puts_parents_above_and_rows_apart():
+    nodes = [
+        {"id": "animal", "label": "Animal", "kind": "abstract_class", "props": {"methods": ["speak()"]}},
+        {"id": "dog", "label": "Dog", "kind": "class",
+         "props": {"attributes": ["name: str", "age: int", "owner: Person"], "methods": ["speak()"]}},
+        {"id": "cat", "label": "Cat", "kind": "class"},
+    ]
+    edges = [
+        {"from": "dog", "to": "animal", "kind": "inheritance"},
+        {"from": "cat", "to": "animal", "kind": "inheritance"},
+    ]
+    placed = {node["id"]: node for node in LayoutEngine()._record_layout(nodes, edges)}
+    animal, dog, cat = placed["animal"], placed["dog"], placed["cat"]
+    assert dog["height"] > cat["height"]
+    assert dog["y"] == cat["y"] >= animal["y"] + animal["height"]
+    assert "record" in dog
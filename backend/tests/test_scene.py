@@ -0,0 +1,70 @@
+"""
+原生场景输出测试：skeleton -> 完整的 .excalidraw 元素
+"""
+from app.core.excalidraw.builder import ExcalidrawBuilder
+from app.core.excalidraw.scene import to_scene, to_scene_elements
+
+
+def _elements():
+    nodes = [
+        {"id": "a", "label": "开始", "shape": "ellipse", "x": 0.0, "y": 0.0, "width": 160.0, "height": 80.0},
+        {"id": "b", "label": "处理", "shape": "rectangle", "x": 0.0, "y": 200.0, "width": 160.0, "height": 80.0},
+        {"id": "c", "label": "判断", "shape": "diamond", "x": 300.0, "y": 200.0, "width": 160.0, "height": 80.0},
+    ]
+    edges = [{"from": "a", "to": "b", "label": "下一步"}, {"from": "b", "to": "c"}, {"from": "a", "to": "c"}]
+    structure = {"type": "flowchart", "nodes": nodes, "edges": edges}
+    return ExcalidrawBuilder().build_elements(structure, nodes, edges)
+
+
+def _refs(element, kind):
+    return {ref["id"] for ref in element.get("boundElements") or [] if ref["type"] == kind}
+
+
+def test_bindings_are_symmetric():
+    elements = to_scene_elements(_elements())
+    by_id = {element["id"]: element for element in elements}
+    assert len(by_id) == len(elements)
+
+    texts = [e for e in elements if e["type"] == "text" and e.get("containerId")]
+    arrows = [e for e in elements if e["type"] == "arrow"]
+    assert texts and arrows
+
+    # containerId <-> 容器 boundElements(text)
+    for text in texts:
+        assert text["id"] in _refs(by_id[text["containerId"]], "text")
+    for element in elements:
+        for text_id in _refs(element, "text"):
+            assert by_id[text_id]["containerId"] == element["id"]
+
+    # startBinding / endBinding <-> 形状 boundElements(arrow)
+    for arrow in arrows:
+        for key in ("startBinding", "endBinding"):
+            assert arrow[key] is not None
+            assert arrow["id"] in _refs(by_id[arrow[key]["elementId"]], "arrow")
+    for element in elements:
+        for arrow_id in _refs(element, "arrow"):
+            arrow = by_id[arrow_id]
+            assert element["id"] in (arrow["startBinding"]["elementId"], arrow["endBinding"]["elementId"])
+
+
+def test_labels_follow_their_container():
+    elements = to_scene_elements(_elements())
+    by_id = {element["id"]: element for element in elements}
+    for index, element in enumerate(elements):
+        if element["type"] == "text" and element.get("containerId"):
+            container = by_id[element["containerId"]]
+            if container["type"] != "arrow":
+                # 绑定文本紧跟在容器之后，并在容器内水平居中
+                assert elements[index - 1]["id"] == container["id"]
+                assert abs(
+                    element["x"] + element["width"] / 2 - (container["x"] + container["width"] / 2)
+                ) < 1e-6
+    assert not any(key in element for element in elements for key in ("label", "start", "end"))
+
+
+def test_scene_is_deterministic():
+    first, second = to_scene(_elements()), to_scene(_elements())
+    assert first == second
+    assert first["type"] == "excalidraw" and first["version"] == 2
+    for element in first["elements"]:
+        assert isinstance(element["seed"], int) and isinstance(element["versionNonce"], int)
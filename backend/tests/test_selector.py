@@ -0,0 +1,59 @@
+"""
+布局算法选择器测试
+"""
+from app.core.layout.selector import (
+    LAYOUT_REGISTRY,
+    compute_graph_stats,
+    get_layout_spec,
+    select_layout,
+)
+
+
+def _graph(n, pairs):
+    return [{"id": i} for i in range(n)], [{"from": a, "to": b} for a, b in pairs]
+
+
+def test_tree_stats():
+    stats = compute_graph_stats(*_graph(5, [(0, 1), (0, 2), (1, 3), (1, 4)]))
+    assert stats.is_forest and stats.is_dag
+    assert (stats.node_count, stats.edge_count) == (5, 4)
+    assert stats.max_degree == 3
+    assert (stats.component_count, stats.largest_component) == (1, 5)
+
+
+def test_dag_and_cycle_stats():
+    diamond = compute_graph_stats(*_graph(4, [(0, 1), (0, 2), (1, 3), (2, 3)]))
+    assert not diamond.is_forest and diamond.is_dag
+    cycle = compute_graph_stats(*_graph(3, [(0, 1), (1, 2), (2, 0)]))
+    assert not cycle.is_forest and not cycle.is_dag
+
+
+def test_components_ignore_dangling_edges_and_duplicate_ids():
+    nodes, edges = _graph(5, [(0, 1), (2, 3), (3, "missing")])
+    stats = compute_graph_stats(nodes + [{"id": 0}], edges)
+    assert stats.node_count == 5 and stats.edge_count == 2
+    assert (stats.component_count, stats.largest_component) == (3, 2)
+
+
+def test_chart_type_selects_dedicated_layout():
+    stats = compute_graph_stats(*_graph(5, [(0, 1), (0, 2), (1, 3), (1, 4)]))
+    assert select_layout(stats, "mindmap")[0] == "radial"
+    assert select_layout(stats, "venn")[0] == "venn"
+    assert select_layout(stats, "tree")[0] == "hierarchical"
+
+
+def test_unsuitable_or_unknown_chart_type_falls_back_to_general_layouts():
+    # 完全图：太稠密，分层布局不适用
+    stats = compute_graph_stats(*_graph(10, [(i, j) for i in range(10) for j in range(i + 1, 10)]))
+    name, reason = select_layout(stats, "flowchart")
+    assert name == "force" and "不适用" in reason
+    name, reason = select_layout(stats, "foo")
+    assert name == "force" and "无专用布局" in reason
+    assert get_layout_spec(name).general
+
+
+def test_every_selection_is_registered():
+    for n, pairs in ((1, []), (5, [(0, 1), (1, 2)]), (6, [(i, (i + 1) % 6) for i in range(6)])):
+        stats = compute_graph_stats(*_graph(n, pairs))
+        for chart_type in ("auto", "flowchart", "network", "concept", "er", "fishbone", None):
+            assert select_layout(stats, chart_type)[0] in LAYOUT_REGISTRY
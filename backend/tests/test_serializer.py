@@ -0,0 +1,73 @@
+"""
+元素流水线测试：元素列表在构建 -> 箭头优化 -> 验证之间直接传递，只在响应边界序列化一次
+"""
+import json
+import random
+import time
+
+import pytest
+
+from app.core.agents.validator import ValidatorAgent
+from app.core.excalidraw.builder import ExcalidrawBuilder
+from app.core.excalidraw.optimizer import optimize_arrow_elements
+from app.core.excalidraw.serializer import dumps_elements
+
+
+def _synthetic_graph(n_nodes: int, n_edges: int, seed: int = 0):
+    rng = random.Random(seed)
+    nodes = [
+        {"id": f"n{i}", "label": f"Node {i}", "x": (i % 50) * 220.0, "y": (i // 50) * 140.0,
+         "width": 160.0, "height": 80.0}
+        for i in range(n_nodes)
+    ]
+    edges = [{"from": f"n{rng.randrange(n_nodes)}", "to": f"n{rng.randrange(n_nodes)}"} for _ in range(n_edges)]
+    edges = [e for e in edges if e["from"] != e["to"]]
+    return {"type": "flowchart", "nodes": nodes, "edges": edges}, nodes, edges
+
+
+def _single_pass(structure, nodes, edges):
+    elements = ExcalidrawBuilder().build_elements(structure, nodes, edges)
+    elements = optimize_arrow_elements(elements, reassign_ports=False)
+    valid, _ = ValidatorAgent().validate_elements(elements)
+    return valid, dumps_elements(elements)
+
+
+def _four_round_trips(structure, nodes, edges):
+    """改造前的流水线：构建、箭头优化各自 dumps(indent=2)，优化、验证、计数各自 loads"""
+    code = json.dumps(ExcalidrawBuilder().build_elements(structure, nodes, edges), indent=2, ensure_ascii=False)
+    code = json.dumps(optimize_arrow_elements(json.loads(code), reassign_ports=False), indent=2, ensure_ascii=False)
+    valid, _ = ValidatorAgent().validate_elements(json.loads(code))
+    len(json.loads(code))
+    return valid, code
+
+
+def test_single_pass_output_matches_round_trips():
+    graph = _synthetic_graph(60, 120)
+    valid, compact = _single_pass(*graph)
+    legacy_valid, legacy = _four_round_trips(*graph)
+    assert valid and legacy_valid
+    assert "\n" not in compact
+    # 元素 ID 基于内容生成，两条流水线的结果逐元素一致
+    assert json.loads(compact) == json.loads(legacy)
+
+
+@pytest.mark.slow
+def test_benchmark_single_pass_saves_cpu_and_bytes():
+    graph = _synthetic_graph(2000, 4000)
+
+    def cpu(fn):
+        best = float("inf")
+        for _ in range(3):
+            start = time.process_time()
+            _, code = fn(*graph)
+            best = min(best, time.process_time() - start)
+        return best, len(code.encode("utf-8"))
+
+    single_cpu, single_bytes = cpu(_single_pass)
+    legacy_cpu, legacy_bytes = cpu(_four_round_trips)
+    print(
+        f"\n单次序列化: {single_cpu * 1000:.0f} ms CPU, {single_bytes} 字节"
+        f"\n四次往返:   {legacy_cpu * 1000:.0f} ms CPU, {legacy_bytes} 字节"
+    )
+    assert single_cpu < legacy_cpu
+    assert single_bytes < legacy_bytes * 0.7
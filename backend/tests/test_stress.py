@@ -0,0 +1,64 @@
+"""
+稀疏应力布局测试
+"""
+from itertools import combinations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.layout.stress import stress_layout
+
+
+def _grid(k):
+    src, dst = [], []
+    for i in range(k):
+        for j in range(k):
+            if i + 1 < k:
+                src.append(i * k + j)
+                dst.append((i + 1) * k + j)
+            if j + 1 < k:
+                src.append(i * k + j)
+                dst.append(i * k + j + 1)
+    return np.array(src), np.array(dst)
+
+
+def test_shape_and_trivial_graphs():
+    assert stress_layout(0, np.array([]), np.array([])).shape == (0, 2)
+    assert stress_layout(1, np.array([]), np.array([])).tolist() == [[0.0, 0.0]]
+    src, dst = _grid(6)
+    pos = stress_layout(36, src, dst, ideal_length=100)
+    assert pos.shape == (36, 2)
+    assert np.isfinite(pos).all()
+
+
+def test_path_edges_have_ideal_length():
+    n = 30
+    pos = stress_layout(n, np.arange(n - 1), np.arange(1, n), ideal_length=100)
+    lengths = np.linalg.norm(np.diff(pos, axis=0), axis=1)
+    assert np.allclose(lengths, 100, rtol=0.01)
+
+
+def test_euclidean_distance_follows_graph_distance():
+    k = 10
+    pos = stress_layout(k * k, *_grid(k))
+    graph, euclid = [], []
+    for a, b in combinations(range(k * k), 2):
+        graph.append(abs(a // k - b // k) + abs(a % k - b % k))
+        euclid.append(np.linalg.norm(pos[a] - pos[b]))
+    assert np.corrcoef(graph, euclid)[0, 1] > 0.95
+
+
+def test_components_do_not_overlap():
+    # 两条三节点链 + 一个孤立点，自环被忽略
+    src, dst = np.array([0, 1, 3, 4, 6]), np.array([1, 2, 4, 5, 6])
+    pos = stress_layout(7, src, dst, ideal_length=100)
+    parts = [pos[[0, 1, 2]], pos[[3, 4, 5]], pos[[6]]]
+    for a, b in combinations(parts, 2):
+        gap = min(np.linalg.norm(p - q) for p in a for q in b)
+        assert gap >= 50
+
+
+def test_layout_is_reproducible():
+    src, dst = _grid(8)
+    assert np.array_equal(stress_layout(64, src, dst, seed=3), stress_layout(64, src, dst, seed=3))
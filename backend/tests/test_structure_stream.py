@@ -0,0 +1,111 @@
+"""
+逐行结构协议解析测试
+"""
+import pytest
+from pydantic import ValidationError
+
+from app.core.agents.structure_stream import FALLBACK_TEXT_MAX, StructureLineParser, StructureStreamParser
+from app.models.request import GenerateRequest
+
+
+def _parse(text):
+    parser = StructureLineParser()
+    parser.feed(text)
+    parser.close()
+    return parser
+
+
+@pytest.mark.parametrize("line", [
+    "N a|Order Service||backend",
+    "N a|Order Service|backend",
+    "N a|Order Service|database|backend",
+])
+def test_group_is_read_without_a_known_shape(line):
+    node = _parse(line + "\n").nodes[0]
+    assert node == {"id": "a", "label": "Order Service", "shape": "rectangle", "group": "backend"}
+
+
+def test_positional_fields():
+    nodes = _parse("N s|开始|ellipse\nN d|判断|diamond|core\nN x|A|B|ellipse|g\n").nodes
+    assert nodes[0] == {"id": "s", "label": "开始", "shape": "ellipse"}
+    assert nodes[1] == {"id": "d", "label": "判断", "shape": "diamond", "group": "core"}
+    # 文本中误用的竖线拼回文本
+    assert nodes[2] == {"id": "x", "label": "A|B", "shape": "ellipse", "group": "g"}
+
+
+def test_record_fields():
+    parser = _parse(
+        "T er\n"
+        "N user|用户|rectangle||kind=entity|attributes=id: int;name: string|pk=id\n"
+        "N base|Base||model|kind=abstract_class|methods=save();load(path)|stereotype=abstract\n"
+        "E user|base|kind=inheritance\n"
+        "E user|base|ratio=1:n\n"
+    )
+    user, base = parser.nodes
+    assert user["kind"] == "entity" and "group" not in user
+    assert user["props"] == {"attributes": ["id: int", "name: string"], "pk": ["id"]}
+    assert base["group"] == "model" and base["kind"] == "abstract_class"
+    assert base["props"] == {"methods": ["save()", "load(path)"], "stereotype": "abstract"}
+    assert parser.edges[0] == {"from": "user", "to": "base", "kind": "inheritance"}
+    # 未知的键按连接标签处理
+    assert parser.edges[1] == {"from": "user", "to": "base", "label": "ratio=1:n"}
+
+
+def test_venn_sets():
+    parser = _parse(
+        "T venn\n"
+        "N fly|会飞|ellipse\n"
+        "N mammal|哺乳动物|ellipse\n"
+        "N bat|蝙蝠|text|sets=fly;mammal\n"
+    )
+    assert parser.fields["type"] == "venn"
+    assert parser.nodes[2]["sets"] == ["fly", "mammal"]
+
+
+def _feed_chars(parser, text):
+    for c in text:
+        parser.feed(c)
+    parser.close()
+    return parser
+
+
+def test_escaped_keys_are_decoded():
+    text = '{"typ\\u0065": "tree", "n\\u006fdes": [{"id": "a"}], "a\\"b": 1, "edges": []}'
+    whole = StructureStreamParser()
+    whole.feed(text)
+    # 逐字符喂入：转义序列被切在块之间
+    for parser in (whole, _feed_chars(StructureStreamParser(), text)):
+        assert parser.nodes == [{"id": "a"}]
+        assert parser.fields["type"] == "tree"
+        assert parser.fields['a"b'] == 1
+
+
+def test_fallback_text_is_released_once_nodes_parse():
+    parser = StructureStreamParser()
+    parser.feed('说明 {"nodes": [{"id": "a"}')
+    assert parser.text() == ""
+    parser.feed(', {"id": "b"}]}')
+    assert parser.text() == ""
+
+    parser = StructureLineParser()
+    parser.feed("好的\n")
+    assert parser.text() == "好的\n"
+    parser.feed("N a|A\n")
+    assert parser.text() == ""
+
+
+def test_fallback_text_is_bounded():
+    parser = StructureStreamParser()
+    chunk = "x" * 1000
+    for _ in range(FALLBACK_TEXT_MAX // len(chunk) + 10):
+        parser.feed(chunk)
+    assert len(parser.text()) == FALLBACK_TEXT_MAX
+
+
+def test_mode_fields_reject_unknown_values():
+    config = {"name": "test", "type": "openai", "baseUrl": "http://localhost", "apiKey": "k", "model": "m"}
+    request = GenerateRequest(config=config, userInput="x", structureFormat="lines", responseMode="patch")
+    assert request.structure_format == "lines" and request.response_mode == "patch"
+    for field in ("structureFormat", "lodMethod", "responseMode", "outputFormat"):
+        with pytest.raises(ValidationError):
+            GenerateRequest(config=config, userInput="x", **{field: "bogus"})
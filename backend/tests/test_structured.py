@@ -0,0 +1,149 @@
+"""
+结构化输出测试：本地桩服务器记录请求体，检查各提供商原生的 schema 约束字段
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from app.core.agents.structure_stream import StructureStreamParser  # noqa: E402
+from app.core.llm.providers.custom import CustomLLM  # noqa: E402
+from app.core.llm.providers.ollama import create_ollama_llm  # noqa: E402
+from app.core.llm.structured import (  # noqa: E402
+    PLAN_SCHEMA,
+    STRUCTURE_SCHEMA,
+    bind_schema,
+    structured_result,
+)
+from app.models.request import LLMProvider  # noqa: E402
+
+STRUCTURE = {
+    "type": "flowchart",
+    "nodes": [{"id": "a", "label": "开始", "shape": "ellipse", "group": None}],
+    "edges": [],
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 /chat/completions 与 Anthropic 的 /messages，回复固定的结构"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, content_type: str, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        content = json.dumps(STRUCTURE, ensure_ascii=False)
+        if self.path.endswith("/messages"):
+            self._send("application/json", json.dumps({
+                "id": "msg", "type": "message", "role": "assistant", "model": body["model"],
+                "content": [{"type": "tool_use", "id": "tool", "name": body["tools"][0]["name"], "input": STRUCTURE}],
+                "stop_reason": "tool_use", "usage": {"input_tokens": 1, "output_tokens": 1},
+            }).encode())
+        elif body.get("stream"):
+            chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": None}]}
+            done = dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self._send("text/event-stream", (
+                f"data: {json.dumps(chunk)}\n\ndata: {json.dumps(done)}\n\ndata: [DONE]\n\n"
+            ).encode())
+        else:
+            self._send("application/json", json.dumps({
+                "id": "c", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }).encode())
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def _openai_compatible(provider, base_url):
+    if provider == LLMProvider.OLLAMA:
+        return create_ollama_llm("llama3", base_url)
+    if provider == LLMProvider.CUSTOM:
+        return CustomLLM(model="custom", api_key="key", base_url=base_url)
+    return ChatOpenAI(model="gpt-4o-mini", api_key="key", base_url=base_url)
+
+
+@pytest.mark.parametrize("provider", [LLMProvider.OPENAI, LLMProvider.OLLAMA, LLMProvider.CUSTOM])
+def test_response_format_in_request_body(stub, provider):
+    server, base_url = stub
+    llm = bind_schema(_openai_compatible(provider, base_url), provider, "diagram_structure", STRUCTURE_SCHEMA)
+    result = structured_result(llm.invoke([("system", "只输出结构"), ("user", "画一个流程图")]))
+
+    body = server.requests[-1]
+    assert body["response_format"] == {
+        "type": "json_schema",
+        "json_schema": {"name": "diagram_structure", "schema": STRUCTURE_SCHEMA, "strict": True},
+    }
+    assert [m["role"] for m in body["messages"]] == ["system", "user"]
+    # 严格模式下未填的可选字段为 null，结果中被去掉
+    assert result["nodes"] == [{"id": "a", "label": "开始", "shape": "ellipse"}]
+
+
+def test_streamed_structure_drops_null_fields(stub):
+    server, base_url = stub
+    llm = bind_schema(_openai_compatible(LLMProvider.OPENAI, base_url), LLMProvider.OPENAI,
+                      "diagram_structure", STRUCTURE_SCHEMA)
+    parser = StructureStreamParser()
+    for chunk in llm.stream([("user", "画一个流程图")]):
+        parser.feed(chunk.content)
+    parser.close()
+    assert server.requests[-1]["stream"] is True
+    assert parser.nodes == [{"id": "a", "label": "开始", "shape": "ellipse"}]
+
+
+def test_anthropic_forces_schema_tool(stub):
+    pytest.importorskip("langchain_anthropic")
+    from langchain_anthropic import ChatAnthropic
+
+    server, base_url = stub
+    llm = ChatAnthropic(model="claude-test", api_key="key", base_url=base_url.rsplit("/v1", 1)[0])
+    bound = bind_schema(llm, LLMProvider.ANTHROPIC, "diagram_structure", STRUCTURE_SCHEMA, "输出图表的节点和边")
+    result = structured_result(bound.invoke([("user", "画一个流程图")]))
+
+    body = server.requests[-1]
+    assert body["tools"] == [{
+        "name": "diagram_structure", "description": "输出图表的节点和边", "input_schema": STRUCTURE_SCHEMA,
+    }]
+    assert body["tool_choice"] == {"type": "tool", "name": "diagram_structure"}
+    assert result["nodes"][0] == {"id": "a", "label": "开始", "shape": "ellipse"}
+
+
+def test_unsupported_provider_returns_none():
+    assert bind_schema(object(), LLMProvider.GOOGLE, "diagram_plan", PLAN_SCHEMA) is None
+
+
+@pytest.mark.parametrize("schema", [STRUCTURE_SCHEMA, PLAN_SCHEMA])
+def test_schemas_are_strict(schema):
+    def check(node):
+        if node.get("type") == "object" or "object" in node.get("type", []):
+            assert node["additionalProperties"] is False
+            assert sorted(node["required"]) == sorted(node["properties"])
+            for sub in node["properties"].values():
+                check(sub)
+        if "items" in node:
+            check(node["items"])
+
+    check(schema)
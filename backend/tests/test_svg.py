@@ -0,0 +1,104 @@
+"""
+SVG 渲染测试
+"""
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.core.excalidraw import svg as svg_module
+from app.core.excalidraw.builder import ExcalidrawBuilder
+from app.core.excalidraw.scene import to_scene_elements
+from app.core.excalidraw.svg import SvgCache, render_svg, scene_hash, write_svg
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def _elements(label="处理 <A&B>"):
+    nodes = [
+        {"id": "a", "label": "开始", "shape": "ellipse", "x": 0.0, "y": 0.0, "width": 160.0, "height": 80.0},
+        {"id": "b", "label": label, "shape": "rectangle", "x": 0.0, "y": 200.0, "width": 160.0, "height": 80.0},
+        {"id": "c", "label": "判断", "shape": "diamond", "x": 300.0, "y": 200.0, "width": 160.0, "height": 80.0},
+    ]
+    edges = [{"from": "a", "to": "b", "label": "下一步"}, {"from": "b", "to": "c"}]
+    structure = {"type": "flowchart", "nodes": nodes, "edges": edges}
+    return ExcalidrawBuilder().build_elements(structure, nodes, edges)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    store = SvgCache()
+    monkeypatch.setattr(svg_module, "SVG_CACHE", store)
+    return store
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """统计实际渲染（未命中缓存）的次数"""
+    calls = []
+    original = svg_module.iter_svg
+
+    def counting(elements, **options):
+        calls.append(options)
+        return original(elements, **options)
+
+    monkeypatch.setattr(svg_module, "iter_svg", counting)
+    return calls
+
+
+def _texts(svg):
+    root = ET.fromstring(svg)
+    return ["".join(node.itertext()) for node in root.iter(f"{SVG_NS}text")]
+
+
+def test_renders_well_formed_svg_with_escaped_labels(cache):
+    svg = render_svg(_elements())
+    root = ET.fromstring(svg)
+    assert root.tag == f"{SVG_NS}svg"
+    texts = _texts(svg)
+    for label in ("开始", "处理 <A&B>", "判断", "下一步"):
+        assert texts.count(label) == 1
+
+
+def test_scene_elements_render_each_label_once(cache):
+    texts = _texts(render_svg(to_scene_elements(_elements())))
+    for label in ("开始", "处理 <A&B>", "判断", "下一步"):
+        assert texts.count(label) == 1
+
+
+def test_cache_hits_skip_rendering(cache, renders):
+    elements = _elements()
+    first = render_svg(elements)
+    assert render_svg(_elements()) == first
+    assert len(renders) == 1
+    # 渲染选项或元素内容不同即为不同的场景
+    render_svg(elements, width=200)
+    render_svg(_elements(label="另一个"))
+    assert len(renders) == 3
+    render_svg(elements, width=200)
+    assert len(renders) == 3
+    assert scene_hash(elements) != scene_hash(elements, width=200)
+
+
+def test_oversized_svg_is_not_cached(cache, renders, monkeypatch):
+    monkeypatch.setattr(svg_module, "SVG_CACHE_MAX_BYTES", 100)
+    elements = _elements()
+    assert render_svg(elements) == render_svg(elements)
+    assert len(renders) == 2
+
+
+def test_cache_is_lru():
+    store = SvgCache(capacity=2)
+    store.put("a", "<svg/>")
+    store.put("b", "<svg/>")
+    assert store.get("a") is not None
+    store.put("c", "<svg/>")
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def test_write_svg_matches_render(cache):
+    elements = _elements()
+    fp = io.StringIO()
+    write_svg(elements, fp, background="#000000")
+    assert fp.getvalue() == render_svg(elements, background="#000000")
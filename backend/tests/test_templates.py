@@ -0,0 +1,80 @@
+"""
+布局模板（WL 结构哈希）测试
+"""
+from app.core.layout import engine as engine_module
+from app.core.layout.engine import LayoutEngine
+from app.core.layout.templates import TemplateStore, structure_key
+
+
+def _graph(ids, pairs, width=160, height=60):
+    nodes = [{"id": i, "label": f"节点 {i}", "width": width, "height": height} for i in ids]
+    return nodes, [{"from": a, "to": b} for a, b in pairs]
+
+
+def _placed(nodes, step=100.0):
+    return [{**node, "x": i * step, "y": i * step / 2} for i, node in enumerate(nodes)]
+
+
+def test_relabelled_and_reordered_graph_hits_with_matching_roles():
+    nodes, edges = _graph(["a", "b", "c", "d"], [("a", "b"), ("a", "c"), ("c", "d")])
+    store = TemplateStore()
+    store.store(structure_key(nodes, edges, "tree", "hierarchical"), nodes, _placed(nodes))
+
+    # 同一棵树：换 ID、换节点和边的顺序
+    other_nodes, other_edges = _graph(["w", "z", "y", "x"], [("y", "w"), ("x", "z"), ("x", "y")])
+    skey = structure_key(other_nodes, other_edges, "tree", "hierarchical")
+    result = store.lookup(skey, other_nodes)
+    assert result is not None and store.hits == 1
+    assert [node["id"] for node in result] == ["w", "z", "y", "x"]
+    # 结构角色对应：根 x <-> a，有子节点的 y <-> c，叶子 w <-> d，叶子 z <-> b
+    original = {node["id"]: (node["x"], node["y"]) for node in _placed(nodes)}
+    by_id = {node["id"]: (node["x"], node["y"]) for node in result}
+    for mine, theirs in (("x", "a"), ("y", "c"), ("w", "d"), ("z", "b")):
+        assert by_id[mine] == original[theirs]
+
+
+def test_wl_collision_is_rejected_by_edge_set():
+    # 两个有向三元环与一个有向六元环：WL 颜色完全相同，但不同构
+    two_triangles = _graph(range(6), [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)])
+    hexagon = _graph(range(6), [(i, (i + 1) % 6) for i in range(6)])
+    first = structure_key(*two_triangles, "network", "force")
+    second = structure_key(*hexagon, "network", "force")
+    assert first.key == second.key
+    assert first.edges != second.edges
+
+    store = TemplateStore()
+    store.store(first, two_triangles[0], _placed(two_triangles[0]))
+    assert store.lookup(second, hexagon[0]) is None
+    assert store.misses == 1
+
+
+def test_key_depends_on_size_bucket_chart_type_and_algorithm():
+    base = structure_key(*_graph("abc", [("a", "b"), ("b", "c")]), "flowchart", "hierarchical")
+    assert base.key == structure_key(*_graph("xyz", [("x", "y"), ("y", "z")], width=170), "flowchart", "hierarchical").key
+    assert base.key != structure_key(*_graph("abc", [("a", "b"), ("b", "c")], width=400), "flowchart", "hierarchical").key
+    assert base.key != structure_key(*_graph("abc", [("a", "b"), ("b", "c")]), "tree", "hierarchical").key
+    assert base.key != structure_key(*_graph("abc", [("a", "b"), ("b", "c")]), "flowchart", "force").key
+
+
+def test_store_is_lru():
+    store = TemplateStore(capacity=2)
+    graphs = [_graph(range(n), [(i, i + 1) for i in range(n - 1)]) for n in (2, 3, 4)]
+    keys = [structure_key(*graph, "flowchart", "hierarchical") for graph in graphs]
+    for skey, (nodes, _) in zip(keys[:2], graphs[:2]):
+        store.store(skey, nodes, _placed(nodes))
+    assert store.lookup(keys[0], graphs[0][0]) is not None  # 2 节点的模板变为最近使用
+    store.store(keys[2], graphs[2][0], _placed(graphs[2][0]))
+    assert store.lookup(keys[1], graphs[1][0]) is None
+    assert store.lookup(keys[0], graphs[0][0]) is not None
+
+
+def test_engine_reuses_template_for_relabelled_structure(monkeypatch):
+    monkeypatch.setattr(engine_module, "TEMPLATE_STORE", TemplateStore())
+    engine = LayoutEngine()
+    nodes, edges = _graph("abcd", [("a", "b"), ("b", "c"), ("b", "d")])
+    first = engine.layout({"nodes": nodes, "edges": edges}, "flowchart")
+    assert engine.last_metrics["template_hit"] is False
+    nodes, edges = _graph("pqrs", [("p", "q"), ("q", "r"), ("q", "s")])
+    second = engine.layout({"nodes": nodes, "edges": edges}, "flowchart")
+    assert engine.last_metrics["template_hit"] is True
+    assert [(n["x"], n["y"]) for n in second] == [(n["x"], n["y"]) for n in first]
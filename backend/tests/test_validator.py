@@ -0,0 +1,48 @@
+"""
+验证测试：流式读取只解码校验用到的字段，跳过的字段仍须是合法 JSON
+"""
+import json
+
+import pytest
+
+from app.core.agents.validator import ValidatorAgent
+from app.core.excalidraw.scene_stream import iter_scene_elements
+
+ELEMENT = {
+    "id": "a", "type": "line", "x": 1, "y": 2, "width": 3.5, "height": -4e2,
+    "points": [[0, 0], [1, 2]], "roundness": None, "locked": False,
+    "customData": {"note": "括号 ]} 在字符串里", "list": [1, {"b": 'x"]'}]},
+}
+SCENE = json.dumps({
+    "type": "excalidraw", "version": 2,
+    "elements": [ELEMENT],
+    "appState": {"gridSize": None, "viewBackgroundColor": "#fff"},
+    "files": {"img": {"dataURL": "data:image/png;base64," + "A" * 1000}},
+}, ensure_ascii=False)
+
+
+def test_valid_scene_passes():
+    assert ValidatorAgent().validate(SCENE) == (True, [])
+    assert ValidatorAgent().validate(json.dumps([ELEMENT])) == (True, [])
+
+
+def test_skipped_fields_are_not_decoded():
+    elements = list(iter_scene_elements(SCENE, {"id", "type"}))
+    assert elements == [{"id": "a", "type": "line"}]
+
+
+@pytest.mark.parametrize("broken", [
+    SCENE.replace("[[0, 0], [1, 2]]", "[[0, 0}, [1, 2]]"),      # 括号类型不配对
+    SCENE.replace('"locked": false', '"locked": fals'),          # 非法字面量
+    SCENE.replace('"locked": false', '"locked": '),              # 缺少值
+    SCENE.replace('"version": 2', '"version": two'),             # 元素数组之外的字段
+    SCENE.replace('"width": 3.5', '"width": 3.5.1'),
+    SCENE.replace('"viewBackgroundColor": "#fff"}', '"viewBackgroundColor": "#fff"]'),
+    SCENE.replace('"appState"', '"appState" {"x": 1}, "y"'),
+    SCENE + " trailing",
+    SCENE[:-10],                                                 # 截断
+])
+def test_broken_skipped_values_are_rejected(broken):
+    valid, errors = ValidatorAgent().validate(broken)
+    assert not valid
+    assert errors[0].startswith("JSON 格式错误")
@@ -0,0 +1,78 @@
+"""
+韦恩图布局测试
+"""
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.layout.engine import LayoutEngine
+from app.core.layout.venn import distance_for_overlap, lens_area, venn_layout
+
+CELL = (120.0, 60.0)
+
+
+def _region(point, centers, radii):
+    """以 point 为中心的格子框所在区域的位掩码，压在圆边界上时返回 None"""
+    mask = 0
+    half = np.array(CELL) / 2
+    for i, (center, r) in enumerate(zip(centers, radii)):
+        offset = np.abs(np.array(point) - center)
+        if ((offset + half) ** 2).sum() <= r * r:
+            mask |= 1 << i
+        elif (np.maximum(offset - half, 0) ** 2).sum() < r * r:
+            return None
+    return mask
+
+
+def test_overlap_distance_inverts_lens_area():
+    for r1, r2, target in ((100, 100, 5000), (150, 80, 12000), (120, 60, 100)):
+        d = distance_for_overlap(r1, r2, target)
+        assert lens_area(r1, r2, d) == pytest.approx(target, rel=1e-6)
+    assert lens_area(100, 50, 10) == pytest.approx(math.pi * 50 ** 2)
+    assert lens_area(100, 50, 200) == 0.0
+
+
+@pytest.mark.parametrize("set_count, memberships", [
+    (2, [0b01] * 4 + [0b10] * 3 + [0b11] * 2),
+    (3, [0b001, 0b010, 0b100, 0b011, 0b101, 0b110, 0b111, 0b111, 0b001, 0b001]),
+    (2, [0b01, 0b10, 0b00]),
+])
+def test_elements_land_in_their_membership_region(set_count, memberships):
+    centers, radii, positions = venn_layout(set_count, memberships, CELL)
+    assert all(position is not None for position in positions)
+    for mask, position in zip(memberships, positions):
+        assert _region(position, centers, radii) == mask
+
+
+def test_disjoint_sets_do_not_overlap():
+    centers, radii, _ = venn_layout(2, [0b01, 0b10], CELL)
+    assert np.linalg.norm(centers[0] - centers[1]) >= radii[0] + radii[1]
+
+
+def test_engine_reads_memberships_from_edges_and_node_fields():
+    structure = {
+        "type": "venn",
+        "nodes": [
+            {"id": "fly", "label": "会飞", "shape": "ellipse"},
+            {"id": "mammal", "label": "哺乳动物", "shape": "ellipse"},
+            {"id": "bat", "label": "蝙蝠", "shape": "text", "sets": ["fly", "mammal"]},
+            {"id": "eagle", "label": "鹰", "shape": "text", "group": "会飞"},
+            {"id": "dog", "label": "狗", "shape": "text"},
+        ],
+        "edges": [{"from": "mammal", "to": "dog"}],
+    }
+    placed = {node["id"]: node for node in LayoutEngine().layout(structure, "venn")}
+    circles = {key: placed[key] for key in ("fly", "mammal")}
+
+    def inside(node_id, set_id):
+        node, circle = placed[node_id], circles[set_id]
+        r = circle["width"] / 2
+        cx, cy = circle["x"] + r, circle["y"] + r
+        px, py = node["x"] + node["width"] / 2, node["y"] + node["height"] / 2
+        return math.hypot(px - cx, py - cy) < r
+
+    assert inside("bat", "fly") and inside("bat", "mammal")
+    assert inside("eagle", "fly") and not inside("eagle", "mammal")
+    assert inside("dog", "mammal") and not inside("dog", "fly")
@@ -35,6 +35,8 @@ export default function Home() {
   const [isModifyMode, setIsModifyMode] = useState(false); // 是否为修改模式
   const [isCodeEditorOpen, setIsCodeEditorOpen] = useState(false); // 代码编辑器悬浮窗开关
   const syncCodeTimeoutRef = useRef(null); // 用于防抖同步代码
+  // 后端返回的原始场景（未经前端处理），以及据此显示在编辑器中的代码；修改模式下据此发送 currentCode
+  const backendSceneRef = useRef({ code: null, shown: null });
 
   // Load config on mount and when config modal closes
   const loadConfigs = async () => {
@@ -651,7 +653,11 @@ export default function Home() {
 
       // 判断是否为修改模式：如果有已生成的代码，且用户没有明确要求新建，则使用修改模式
       const shouldUseModifyMode = isModifyMode && generatedCode && generatedCode.trim().length > 0;
-      const currentCodeForRequest = shouldUseModifyMode ? generatedCode : null;
+      // 用户没有手动编辑过时发送后端原始场景，使后端的补丁与自己上一轮的输出对比
+      const backendScene = backendSceneRef.current;
+      const currentCodeForRequest = shouldUseModifyMode
+        ? (backendScene.code && generatedCode === backendScene.shown ? backendScene.code : generatedCode)
+        : null;
 
       // 添加用户消息到对话历史
       const userMsg = {
@@ -662,7 +668,7 @@ export default function Home() {
       setConversationHistory(prev => [...prev, userMsg]);
 
       // Call backend API with streaming
-      const { generateChart } = await import('@/lib/api-client');
+      const { generateChart, applyScenePatch } = await import('@/lib/api-client');
       const response = await generateChart({
         config,
         userInput: textInput,
@@ -670,6 +676,7 @@ export default function Home() {
         image: imageData,
         currentCode: currentCodeForRequest, // 只在修改模式下传递当前代码
         stream: true,
+        responseMode: shouldUseModifyMode ? 'patch' : 'full', // 修改模式下只接收补丁
       });
 
       if (!response.ok) {
@@ -710,6 +717,7 @@ export default function Home() {
       const decoder = new TextDecoder();
       let accumulatedCode = '';
       let buffer = '';
+      let receivedDone = false;
 
       while (true) {
         const { done, value } = await reader.read();
@@ -757,18 +765,24 @@ export default function Home() {
                 setGeneratedCode(processedCode);
               }
               
+              // 处理 partial 事件 - 结构生成期间的临时布局预览（最终以 done 为准）
+              if (currentEvent === 'partial' && data.code) {
+                tryParseAndApply(data.code);
+              }
+
               // 处理 done 事件 - 后端返回的最终优化代码
-              if (currentEvent === 'done' && data.code) {
+              if (currentEvent === 'done' && (data.code || data.patch)) {
                 setGenerationProgress({ message: '完成！', progress: 100 });
-                accumulatedCode = data.code;
+                // patch 模式：后端只返回相对当前场景的增删改
+                accumulatedCode = data.patch
+                  ? applyScenePatch(currentCodeForRequest, data.patch)
+                  : data.code;
                 const processedCode = postProcessExcalidrawCode(accumulatedCode);
+                // 后端已完成布局与箭头端口分配，不再经过前端的箭头优化（否则端口分散会被还原到边中点）
                 setGeneratedCode(processedCode);
                 tryParseAndApply(processedCode);
-                
-                // 后端已经优化，但前端可以再次优化以确保最佳效果
-                const optimizedCode = optimizeExcalidrawCode(processedCode);
-                setGeneratedCode(optimizedCode);
-                tryParseAndApply(optimizedCode);
+                backendSceneRef.current = { code: accumulatedCode, shown: processedCode };
+                receivedDone = true;
                 
                 // 添加AI响应到对话历史
                 const aiMsg = {
@@ -797,8 +811,8 @@ export default function Home() {
         }
       }
 
-      // 如果流式响应中没有收到 done 事件，手动处理
-      if (accumulatedCode) {
+      // 如果流式响应中没有收到 done 事件，手动处理（此时是未经后端布局的原始输出）
+      if (accumulatedCode && !receivedDone) {
         setGenerationProgress({ message: '完成！', progress: 100 });
         const processedCode = postProcessExcalidrawCode(accumulatedCode);
         tryParseAndApply(processedCode);
@@ -835,6 +849,20 @@ export default function Home() {
       // Code is already post-processed, just extract the array and parse
       const cleanedCode = code.trim();
 
+      // 完整的 .excalidraw 场景（outputFormat=scene）：元素已由后端解析，直接使用
+      if (cleanedCode.startsWith('{')) {
+        try {
+          const scene = JSON.parse(cleanedCode);
+          if (scene && scene.type === 'excalidraw' && Array.isArray(scene.elements)) {
+            setElements(scene.elements);
+            setJsonError(null);
+            return;
+          }
+        } catch (e) {
+          // 不是场景对象，继续按元素数组解析
+        }
+      }
+
       // Extract array from code if wrapped in other text
       const arrayMatch = cleanedCode.match(/\[[\s\S]*\]/);
       if (!arrayMatch) {
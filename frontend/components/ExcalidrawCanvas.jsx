@@ -1101,6 +1101,11 @@ export default function ExcalidrawCanvas({ elements = [], onElementsChange }) {
       return [];
     }
     
+    // 后端已输出完整的场景元素（outputFormat=scene）：跳过 skeleton 转换
+    if (safeElements.every(el => el && typeof el === 'object' && 'seed' in el && 'versionNonce' in el)) {
+      return safeElements;
+    }
+
     if (!convertToExcalidrawElements) {
       console.log('ExcalidrawCanvas: convertToExcalidrawElements not loaded yet');
       return [];
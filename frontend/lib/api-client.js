@@ -7,6 +7,45 @@
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000';
 const API_BASE = `${BACKEND_URL}/api/v1`;
 
+/**
+ * 把后端返回的补丁应用到当前场景代码
+ * @param {string} code - 当前场景代码（JSON 数组）
+ * @param {Object} patch - 补丁 {added, removed, changed[, order]}
+ * @returns {string} 新场景代码
+ */
+export function applyScenePatch(code, patch) {
+  // 当前场景可能是元素数组，也可能是完整的 .excalidraw 场景
+  let scene = null;
+  let elements = [];
+  try {
+    const parsed = JSON.parse(code || '');
+    if (Array.isArray(parsed)) {
+      elements = parsed;
+    } else if (parsed && Array.isArray(parsed.elements)) {
+      scene = parsed;
+      elements = parsed.elements;
+    }
+  } catch (e) {
+    const arrayMatch = (code || '').match(/\[[\s\S]*\]/);
+    elements = arrayMatch ? JSON.parse(arrayMatch[0]) : [];
+  }
+  const removed = new Set(patch.removed || []);
+  const changed = new Map((patch.changed || []).map(el => [el.id, el]));
+
+  // 删除、原位替换、追加新增
+  let result = elements
+    .filter(el => !removed.has(el.id))
+    .map(el => changed.get(el.id) || el)
+    .concat(patch.added || []);
+
+  // 顺序（z 轴）有变化时按给定顺序重排
+  if (patch.order) {
+    const byId = new Map(result.map(el => [el.id, el]));
+    result = patch.order.map(id => byId.get(id)).filter(Boolean);
+  }
+  return JSON.stringify(scene ? { ...scene, elements: result } : result, null, 2);
+}
+
 /**
  * 生成图表代码
  * @param {Object} params - 请求参数
@@ -16,9 +55,11 @@ const API_BASE = `${BACKEND_URL}/api/v1`;
  * @param {Object} params.image - 图片数据（可选）
  * @param {string} params.currentCode - 现有代码（可选，用于多轮对话）
  * @param {boolean} params.stream - 是否流式响应（默认 true）
+ * @param {string} params.responseMode - 响应模式：full 完整代码；patch 只返回相对 currentCode 的补丁
+ * @param {string} params.outputFormat - 输出格式：skeleton 元素骨架；scene 完整的 .excalidraw 场景
  * @returns {Promise<Response>} Fetch Response 对象
  */
-export async function generateChart({ config, userInput, chartType = 'auto', image = null, currentCode = null, stream = true }) {
+export async function generateChart({ config, userInput, chartType = 'auto', image = null, currentCode = null, stream = true, responseMode = 'full', outputFormat = 'skeleton' }) {
   const response = await fetch(`${API_BASE}/generate`, {
     method: 'POST',
     headers: {
@@ -37,6 +78,8 @@ export async function generateChart({ config, userInput, chartType = 'auto', ima
         name: image.name,
       } : null,
       stream,
+      responseMode,
+      outputFormat,
       useMcp: false,
       mcpContext: null,
     }),
@@ -50,6 +93,34 @@ export async function generateChart({ config, userInput, chartType = 'auto', ima
   return response;
 }
 
+/**
+ * 只调整布局约束（固定点 / 对齐 / 顺序），不重新生成结构、不重跑布局
+ * @param {Object} params - 请求参数
+ * @param {string} params.layoutId - 生成响应 layout_metrics.layout_id
+ * @param {Array} params.add - 新增约束 [{ type: 'align' | 'order', axis: 'x' | 'y', nodes: [...] }]
+ * @param {Array} params.remove - 移除的约束（与添加时相同）
+ * @param {Object} params.pinned - 固定点 { 节点 ID: { x, y } }，值为 null 时取消固定
+ * @param {string} params.currentCode - 当前场景（patch 模式下的对比基准）
+ * @param {string} params.responseMode - 响应模式：full 完整代码；patch 只返回相对 currentCode 的补丁
+ * @returns {Promise<Object>} 与非流式生成相同的响应 { code | patch, layout_metrics, ... }
+ */
+export async function updateLayoutConstraints({ layoutId, add = null, remove = null, pinned = null, currentCode = null, responseMode = 'full', outputFormat = 'skeleton' }) {
+  const response = await fetch(`${API_BASE}/generate/constraints`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ layoutId, add, remove, pinned, currentCode, responseMode, outputFormat }),
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || errorData.detail || `HTTP ${response.status}`);
+  }
+
+  return response.json();
+}
+
 /**
  * 获取可用模型列表
  * @param {string} type - 提供商类型
@@ -354,6 +354,13 @@ export function optimizeExcalidrawCode(codeString) {
         });
       }
 
+      // Arrows with intermediate waypoints (e.g. bundled edges routed along a shared
+      // trunk by the backend) are already routed; snapping their endpoints would
+      // detach the waypoints from the trunk, so leave them untouched.
+      if (Array.isArray(element.points) && element.points.length > 2) {
+        return element;
+      }
+
       const optimized = { ...element };
       let needsOptimization = false;
 